@@ -0,0 +1,7 @@
+# analytics/
+# Cálculos das páginas, sem widgets nem gráficos: cada módulo recebe a base (já com os filtros
+# globais), o intervalo de meses e as opções da página, e devolve valores e DataFrames numéricos.
+# As páginas (pages/*.py) só formatam e desenham o que vem daqui.
+# O pacote ainda importa o Streamlit: o cubo, o índice de filtros e os snapshots Arrow
+# (utils.cube, utils.filters, utils.backend) ficam em caches st.cache_resource do processo.
+# Fora do servidor (scripts, testes) o Streamlit roda em modo bare e os caches valem para o processo.
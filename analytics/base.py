@@ -0,0 +1,21 @@
+# analytics/base.py
+# Recortes comuns às páginas: anos de comparação e período de meses.
+from utils.backend import register_rows
+
+def comparison_years(anos):
+    """(ano_base, ano_comp): os dois últimos anos presentes; com um só ano, ele nas duas posições."""
+    if len(anos) >= 2:
+        return anos[-2], anos[-1]
+    return anos[-1], anos[-1]
+
+def period(df, mes_ini, mes_fim):
+    """Linhas (ou células do cubo) dos meses mes_ini..mes_fim de todos os anos."""
+    linhas = df["mes"].between(mes_ini, mes_fim)
+    recorte = df[linhas]
+    # Motor Arrow: o recorte é filtrado no snapshot da base/cubo de origem
+    register_rows(recorte, df, linhas.to_numpy())
+    return recorte
+
+def years(df):
+    """Anos válidos presentes na base, em ordem."""
+    return sorted(df["ano"].dropna().unique())
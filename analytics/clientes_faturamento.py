@@ -0,0 +1,241 @@
+# analytics/clientes_faturamento.py
+# Números da página Clientes & Faturamento: tabelas comparativas (ano base x ano comparado)
+# por emissora, executivo, mês e cliente, cada uma com sua linha de total.
+import numpy as np
+import pandas as pd
+
+from analytics.base import comparison_years, period
+from utils.backend import pivot_by_year, pivot_nunique_by_year
+from utils.cube import cube_for
+
+MES_NOMES = {1: "Jan", 2: "Fev", 3: "Mar", 4: "Abr", 5: "Mai", 6: "Jun", 7: "Jul", 8: "Ago", 9: "Set", 10: "Out", 11: "Nov", 12: "Dez"}
+
+def _metrics_split(base_periodo, df_main, group_col, ano_base, ano_comp):
+    """Acrescenta inserções e custo médio unitário de cada ano (Ins_<ano>, Custo_<ano>) por grupo."""
+    piv_ins = pivot_by_year(base_periodo, group_col, "insercoes")
+    piv_fat = pivot_by_year(base_periodo, group_col, "faturamento")
+
+    for ano in [ano_base, ano_comp]:
+        if ano not in piv_ins.columns: piv_ins[ano] = 0.0
+        if ano not in piv_fat.columns: piv_fat[ano] = 0.0
+
+    custo_base = np.where(piv_ins[ano_base] > 0, piv_fat[ano_base] / piv_ins[ano_base], np.nan)
+    custo_comp = np.where(piv_ins[ano_comp] > 0, piv_fat[ano_comp] / piv_ins[ano_comp], np.nan)
+
+    piv_fat = piv_fat.reset_index()
+    piv_ins = piv_ins.reset_index()
+
+    df_metrics = pd.DataFrame({
+        group_col: piv_fat[group_col],
+        f"Ins_{ano_base}": piv_ins[ano_base].values,
+        f"Ins_{ano_comp}": piv_ins[ano_comp].values,
+        f"Custo_{ano_base}": custo_base,
+        f"Custo_{ano_comp}": custo_comp
+    })
+
+    if group_col in df_main.columns:
+        return pd.merge(df_main, df_metrics, on=group_col, how="left")
+    return df_main
+
+def clients_by_emissora(base_periodo, ano_base, ano_comp):
+    """(tabela, total): clientes distintos por emissora em cada ano, com Δ e Δ%."""
+    tabela = pivot_nunique_by_year(base_periodo, "emissora", "cliente").reset_index()
+    for ano in [ano_base, ano_comp]:
+        if ano not in tabela.columns: tabela[ano] = 0
+
+    tabela["Δ"] = tabela[ano_comp] - tabela[ano_base]
+    tabela["Δ%"] = np.where(tabela[ano_base] > 0, (tabela["Δ"] / tabela[ano_base]) * 100, np.nan)
+
+    total = pd.DataFrame()
+    if not tabela.empty:
+        total_A = tabela[ano_base].sum()
+        total_B = tabela[ano_comp].sum()
+        total_delta = total_B - total_A
+        total = pd.DataFrame([{
+            "emissora": "Totalizador",
+            ano_base: total_A,
+            ano_comp: total_B,
+            "Δ": total_delta,
+            "Δ%": (total_delta / total_A * 100) if total_A > 0 else np.nan
+        }])
+    return tabela, total
+
+def revenue_by(base_periodo, group_col, ano_base, ano_comp):
+    """(tabela, total): faturamento por grupo em cada ano, com Δ, Δ%, inserções e custo médio unitário."""
+    tabela = pivot_by_year(base_periodo, group_col, "faturamento").reset_index()
+    for ano in [ano_base, ano_comp]:
+        if ano not in tabela.columns: tabela[ano] = 0.0
+
+    tabela["Δ"] = tabela[ano_comp] - tabela[ano_base]
+    tabela["Δ%"] = np.where(tabela[ano_base] > 0, (tabela["Δ"] / tabela[ano_base]) * 100, np.nan)
+    tabela = _metrics_split(base_periodo, tabela, group_col, ano_base, ano_comp)
+
+    total = pd.DataFrame()
+    if not tabela.empty:
+        tA = tabela[ano_base].sum()
+        tB = tabela[ano_comp].sum()
+        tDelta = tB - tA
+        tInsA = tabela[f"Ins_{ano_base}"].sum()
+        tInsB = tabela[f"Ins_{ano_comp}"].sum()
+        total = pd.DataFrame([{
+            group_col: "Totalizador",
+            ano_base: tA, ano_comp: tB, "Δ": tDelta, "Δ%": (tDelta / tA * 100) if tA > 0 else np.nan,
+            f"Ins_{ano_base}": tInsA, f"Ins_{ano_comp}": tInsB,
+            f"Custo_{ano_base}": tA / tInsA if tInsA > 0 else np.nan,
+            f"Custo_{ano_comp}": tB / tInsB if tInsB > 0 else np.nan
+        }])
+    return tabela, total
+
+def averages_by_emissora(base_periodo):
+    """(tabela, total): faturamento, inserções e clientes por emissora, com médias por cliente."""
+    tabela = base_periodo.groupby("emissora", observed=True).agg(
+        Faturamento=("faturamento", "sum"), Insercoes=("insercoes", "sum"), Clientes=("cliente", "nunique")
+    ).reset_index()
+    tabela["Média Invest./Cliente"] = np.where(tabela["Clientes"] == 0, np.nan, tabela["Faturamento"] / tabela["Clientes"])
+    tabela["Média Inserções/Cliente"] = np.where(tabela["Clientes"] == 0, np.nan, tabela["Insercoes"] / tabela["Clientes"])
+
+    total = pd.DataFrame()
+    if not tabela.empty:
+        tfat = tabela["Faturamento"].sum()
+        tins = tabela["Insercoes"].sum()
+        # Clientes distintos do período inteiro (um cliente pode anunciar em várias emissoras)
+        tcli = base_periodo["cliente"].nunique()
+        total = pd.DataFrame([{
+            "emissora": "Totalizador", "Faturamento": tfat, "Insercoes": tins,
+            "Clientes": tcli,
+            "Média Invest./Cliente": tfat / tcli if tcli > 0 else np.nan,
+            "Média Inserções/Cliente": tins / tcli if tcli > 0 else np.nan
+        }])
+    return tabela, total
+
+def revenue_total_by_emissora(base_periodo):
+    """(tabela, total): faturamento e inserções do período por emissora (maior primeiro) e custo unitário."""
+    tabela = base_periodo.groupby("emissora", as_index=False, observed=True).agg(
+        Faturamento=("faturamento", "sum"), Insercoes=("insercoes", "sum")
+    ).sort_values("Faturamento", ascending=False)
+    tabela["Custo Unitário"] = np.where(tabela["Insercoes"] > 0, tabela["Faturamento"] / tabela["Insercoes"], np.nan)
+
+    total = pd.DataFrame()
+    if not tabela.empty:
+        tf = tabela["Faturamento"].sum()
+        ti = tabela["Insercoes"].sum()
+        total = pd.DataFrame([{"emissora": "Totalizador", "Faturamento": tf, "Insercoes": ti, "Custo Unitário": tf / ti if ti > 0 else np.nan}])
+    return tabela, total
+
+def month_comparison(base_periodo, ano_base, ano_comp):
+    """
+    (tabela, total) mês a mês: Fat./Ins./Custo de cada ano por mês (coluna mes_nome).
+    None se não há meses no período.
+    """
+    base_para_tabela = base_periodo.copy()
+    base_para_tabela["mes_nome"] = base_para_tabela["mes"].map(MES_NOMES)
+
+    piv_fat = base_para_tabela.groupby(["ano", "mes", "mes_nome"])["faturamento"].sum().reset_index().pivot(index=["mes", "mes_nome"], columns="ano", values="faturamento").fillna(0.0)
+    piv_ins = base_para_tabela.groupby(["ano", "mes", "mes_nome"])["insercoes"].sum().reset_index().pivot(index=["mes", "mes_nome"], columns="ano", values="insercoes").fillna(0.0)
+    if piv_fat.empty:
+        return None
+
+    for ano in [ano_base, ano_comp]:
+        if ano not in piv_fat.columns: piv_fat[ano] = 0.0
+        if ano not in piv_ins.columns: piv_ins[ano] = 0.0
+
+    c_base = np.where(piv_ins[ano_base] > 0, piv_fat[ano_base] / piv_ins[ano_base], np.nan)
+    c_comp = np.where(piv_ins[ano_comp] > 0, piv_fat[ano_comp] / piv_ins[ano_comp], np.nan)
+
+    # Se os anos forem iguais, não duplicamos colunas
+    if ano_base == ano_comp:
+        tabela = pd.DataFrame({
+            f"Fat. {ano_base}": piv_fat[ano_base],
+            f"Ins. {ano_base}": piv_ins[ano_base],
+            f"Custo {ano_base}": c_base,
+        }, index=piv_fat.index)
+    else:
+        tabela = pd.DataFrame({
+            f"Fat. {ano_base}": piv_fat[ano_base], f"Fat. {ano_comp}": piv_fat[ano_comp],
+            f"Ins. {ano_base}": piv_ins[ano_base], f"Ins. {ano_comp}": piv_ins[ano_comp],
+            f"Custo {ano_base}": c_base, f"Custo {ano_comp}": c_comp
+        }, index=piv_fat.index)
+    tabela = tabela.sort_index(level="mes")
+
+    # Total: somas de Fat./Ins. e custo recalculado sobre as somas
+    total = {col: tabela[col].sum() for col in tabela.columns if "Custo" not in col}
+    for ano in ([ano_base] if ano_base == ano_comp else [ano_base, ano_comp]):
+        if f"Fat. {ano}" in total:
+            f, i = total[f"Fat. {ano}"], total[f"Ins. {ano}"]
+            total[f"Custo {ano}"] = f / i if i > 0 else np.nan
+
+    return tabela.reset_index(level="mes", drop=True).reset_index(), pd.DataFrame([total])
+
+def client_relation(base_periodo, ano_base, ano_comp):
+    """
+    (tabela, total) por cliente: Fat_<ano>, Ins_<ano>, totais, share do faturamento e Custo_<ano>,
+    ordenada pelo faturamento total (maior primeiro).
+    """
+    t17_fat = pivot_by_year(base_periodo, "cliente", "faturamento")
+    t17_ins = pivot_by_year(base_periodo, "cliente", "insercoes")
+
+    for ano in [ano_base, ano_comp]:
+        if ano not in t17_fat.columns: t17_fat[ano] = 0.0
+        if ano not in t17_ins.columns: t17_ins[ano] = 0.0
+
+    tabela = pd.concat([t17_fat, t17_ins], axis=1)
+    if ano_base == ano_comp:
+        tabela = pd.concat([t17_fat[[ano_base]], t17_ins[[ano_base]]], axis=1)
+        tabela.columns = [f"Fat_{ano_base}", f"Ins_{ano_base}"]
+    else:
+        tabela.columns = [f"Fat_{ano}" for ano in t17_fat.columns] + [f"Ins_{ano}" for ano in t17_ins.columns]
+    tabela = tabela.reset_index()
+
+    cols_fat = [c for c in tabela.columns if c.startswith("Fat_")]
+    cols_ins = [c for c in tabela.columns if c.startswith("Ins_")]
+
+    tabela["Total Fat"] = tabela[cols_fat].sum(axis=1)
+    tabela["Total Ins"] = tabela[cols_ins].sum(axis=1)
+    tgf = tabela["Total Fat"].sum()
+    tabela["Share %"] = (tabela["Total Fat"] / tgf * 100) if tgf > 0 else 0.0
+
+    for cf, ci in zip(cols_fat, cols_ins):
+        yr = cf.split("_")[1]
+        tabela[f"Custo_{yr}"] = np.where(tabela[ci] > 0, tabela[cf] / tabela[ci], np.nan)
+
+    tabela = tabela.sort_values("Total Fat", ascending=False).reset_index(drop=True)
+
+    total = pd.DataFrame()
+    if not tabela.empty:
+        tot_d = {"cliente": "Totalizador", "Share %": 100.0}
+        for c in tabela.columns:
+            if c not in ["cliente", "Share %"] and not c.startswith("Custo_"):
+                tot_d[c] = tabela[c].sum()
+        for cf, ci in zip(cols_fat, cols_ins):
+            yr = cf.split("_")[1]
+            f, i = tot_d[cf], tot_d[ci]
+            tot_d[f"Custo_{yr}"] = f / i if i > 0 else np.nan
+        total = pd.DataFrame([tot_d])
+    return tabela, total
+
+def compute(df, mes_ini, mes_fim):
+    """
+    Retorna None se a base não tem anos válidos; senão um dict com ano_base, ano_comp e,
+    para cada tabela da página, o par (tabela, total) numérico:
+    clientes_emissora, faturamento_emissora, faturamento_executivo, medias_emissora,
+    faturamento_total_emissora, mes_a_mes (None se vazio) e relacao_clientes.
+    """
+    # Agregações sobre o cubo (utils.cube): mesmas somas da base, com muito menos linhas
+    cubo = cube_for(df)
+    anos = sorted(cubo["ano"].dropna().unique())
+    if not anos:
+        return None
+    ano_base, ano_comp = comparison_years(anos)
+    base_periodo = period(cubo, mes_ini, mes_fim)
+
+    return {
+        "ano_base": ano_base,
+        "ano_comp": ano_comp,
+        "clientes_emissora": clients_by_emissora(base_periodo, ano_base, ano_comp),
+        "faturamento_emissora": revenue_by(base_periodo, "emissora", ano_base, ano_comp),
+        "faturamento_executivo": revenue_by(base_periodo, "executivo", ano_base, ano_comp),
+        "medias_emissora": averages_by_emissora(base_periodo),
+        "faturamento_total_emissora": revenue_total_by_emissora(base_periodo),
+        "mes_a_mes": month_comparison(base_periodo, ano_base, ano_comp),
+        "relacao_clientes": client_relation(base_periodo, ano_base, ano_comp),
+    }
@@ -0,0 +1,201 @@
+# analytics/cruzamentos_intersecoes.py
+# Números da página Cruzamentos & Interseções: clientes exclusivos, compartilhados e ausentes
+# por emissora, top compartilhados, matriz de interseção e custo unitário por emissora.
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+
+from analytics.base import period
+
+# Ordem de exibição das emissoras na lista de compartilhamento
+EMISSORAS_ORDEM = ["Difusora", "Novabrasil", "Th+ Prime", "Thathi Tv"]
+
+def _presence(base_periodo):
+    """(agg, pres_pivot): somas por cliente x emissora e presença (faturamento > 0) em pivô."""
+    agg = base_periodo.groupby(["cliente", "emissora"], as_index=False, observed=True).agg(
+        faturamento=("faturamento", "sum"),
+        insercoes=("insercoes", "sum")
+    )
+    agg["presenca"] = np.where(agg["faturamento"] > 0, 1, 0)
+    pres_pivot = agg.pivot_table(index="cliente", columns="emissora", values="presenca", fill_value=0, observed=True)
+    return agg, pres_pivot
+
+def _coverage_tables(agg, pres_pivot):
+    """(exclusivos, compartilhados, ausentes): uma linha por emissora, ordenadas por faturamento."""
+    emissoras = sorted(agg["emissora"].unique())
+    emis_count = pres_pivot.sum(axis=1)
+    exclusivos_mask = emis_count == 1
+    compartilhados_mask = emis_count >= 2
+    todos_clientes = set(agg["cliente"].unique())
+    fat_total_geral = agg["faturamento"].sum()
+
+    excl_info, comp_info, ausentes_info = [], [], []
+    for emis in emissoras:
+        # Exclusivos: clientes presentes só nesta emissora
+        cli_excl = pres_pivot.loc[exclusivos_mask & (pres_pivot[emis] == 1)].index
+        dados_excl = agg[(agg["cliente"].isin(cli_excl)) & (agg["emissora"] == emis)]
+        fat_excl = dados_excl["faturamento"].sum()
+
+        # Compartilhados: clientes desta emissora presentes em 2+ emissoras
+        cli_comp = pres_pivot.loc[compartilhados_mask & (pres_pivot[emis] == 1)].index
+        dados_comp = agg[(agg["cliente"].isin(cli_comp)) & (agg["emissora"] == emis)]
+        fat_comp = dados_comp["faturamento"].sum()
+
+        # Ausentes: clientes do período que não anunciaram nesta emissora
+        clientes_emis = set(agg[agg["emissora"] == emis]["cliente"].unique())
+        lista_ausentes = list(todos_clientes - clientes_emis)
+        dados_ausentes = agg[agg["cliente"].isin(lista_ausentes)]
+        fat_ausente = dados_ausentes["faturamento"].sum()
+
+        fat_total_emis = agg[agg["emissora"] == emis]["faturamento"].sum()
+
+        excl_info.append({
+            "Emissora": emis,
+            "Clientes Exclusivos": len(cli_excl),
+            "Faturamento Exclusivo": fat_excl,
+            "Inserções Exclusivas": dados_excl["insercoes"].sum(),
+            "% Faturamento": (fat_excl / fat_total_emis * 100) if fat_total_emis > 0 else 0
+        })
+        comp_info.append({
+            "Emissora": emis,
+            "Clientes Compartilhados": len(cli_comp),
+            "Faturamento Compartilhado": fat_comp,
+            "Inserções Compartilhadas": dados_comp["insercoes"].sum(),
+            "% Faturamento": (fat_comp / fat_total_emis * 100) if fat_total_emis > 0 else 0
+        })
+        ausentes_info.append({
+            "Emissora": emis,
+            "Clientes Ausentes": len(lista_ausentes),
+            "Faturamento Perdido (Oportunidade)": fat_ausente,
+            "Inserções Perdidas": dados_ausentes["insercoes"].sum(),
+            "% Share Perdido": (fat_ausente / fat_total_geral * 100) if fat_total_geral > 0 else 0
+        })
+
+    def _com_total(info, prefixo_cli, col_fat, col_ins, col_pct, pct_total):
+        tabela = pd.DataFrame(info)
+        total = pd.DataFrame()
+        if not tabela.empty:
+            tabela = tabela.sort_values(col_fat, ascending=False).reset_index(drop=True)
+            total = pd.DataFrame([{
+                "Emissora": "Totalizador",
+                prefixo_cli: tabela[prefixo_cli].sum(),
+                col_fat: tabela[col_fat].sum(),
+                col_ins: tabela[col_ins].sum(),
+                col_pct: pct_total(tabela[col_fat].sum())
+            }])
+        return tabela, total
+
+    # % do total: parte do faturamento geral; ausentes não têm % agregado
+    pct_geral = lambda fat: (fat / fat_total_geral * 100) if fat_total_geral > 0 else np.nan
+    return (
+        _com_total(excl_info, "Clientes Exclusivos", "Faturamento Exclusivo", "Inserções Exclusivas", "% Faturamento", pct_geral),
+        _com_total(comp_info, "Clientes Compartilhados", "Faturamento Compartilhado", "Inserções Compartilhadas", "% Faturamento", pct_geral),
+        _com_total(ausentes_info, "Clientes Ausentes", "Faturamento Perdido (Oportunidade)", "Inserções Perdidas", "% Share Perdido", lambda fat: np.nan),
+    )
+
+def _top_shared(base_periodo, pres_pivot, share_clients_idx, n=20):
+    """(tabela, total): top n clientes compartilhados por faturamento, com a lista das emissoras."""
+    order_map = {name.lower(): i for i, name in enumerate(EMISSORAS_ORDEM)}
+
+    def get_emissoras_str(row):
+        emis_ativas = row.index[row == 1].tolist()
+        emis_ativas.sort(key=lambda x: (order_map.get(x.lower(), 999), x))
+        return ", ".join(emis_ativas)
+
+    df_emis_list = pres_pivot.loc[share_clients_idx].apply(get_emissoras_str, axis=1)
+
+    tabela = (base_periodo[base_periodo["cliente"].isin(share_clients_idx)]
+              .groupby("cliente", as_index=False, observed=True)
+              .agg(faturamento=("faturamento", "sum"), insercoes=("insercoes", "sum"))
+              .sort_values("faturamento", ascending=False)
+              .head(n))
+    tabela["emissoras_compartilhadas"] = tabela["cliente"].map(df_emis_list)
+
+    total = pd.DataFrame()
+    if not tabela.empty:
+        total = pd.DataFrame([{
+            "cliente": "Totalizador",
+            "faturamento": tabela["faturamento"].sum(),
+            "insercoes": tabela["insercoes"].sum(),
+            "emissoras_compartilhadas": ""
+        }])
+    return tabela, total
+
+def intersection_matrix(agg, pres_pivot, metric):
+    """
+    Matriz emissora x emissora: clientes em comum ("Clientes"), ou a soma do menor valor entre
+    as duas emissoras por cliente em comum ("Faturamento" / qualquer outro valor: inserções).
+    A diagonal traz o total da emissora. None se há menos de 2 emissoras.
+    """
+    emis_list = sorted(list(pres_pivot.columns))
+    if len(emis_list) < 2:
+        return None
+
+    mat_raw = pd.DataFrame(0.0, index=emis_list, columns=emis_list)
+    if metric == "Clientes":
+        for a, b in combinations(emis_list, 2):
+            comuns = ((pres_pivot[a] == 1) & (pres_pivot[b] == 1)).sum()
+            mat_raw.loc[a, b] = comuns
+            mat_raw.loc[b, a] = comuns
+        for e in emis_list: mat_raw.loc[e, e] = (pres_pivot[e] == 1).sum()
+        return mat_raw
+
+    medida = "faturamento" if metric == "Faturamento" else "insercoes"
+    val_pivot = agg.pivot_table(index="cliente", columns="emissora", values=medida, fill_value=0.0, observed=True)
+    for a, b in combinations(emis_list, 2):
+        menor = np.minimum(val_pivot[a], val_pivot[b])
+        vlr = menor[menor > 0].sum()
+        mat_raw.loc[a, b] = vlr
+        mat_raw.loc[b, a] = vlr
+    for e in emis_list: mat_raw.loc[e, e] = val_pivot[e].sum()
+    return mat_raw
+
+def _unit_cost(base_periodo, agg, share_clients_idx):
+    """(tabela, total): custo unitário de cada cliente compartilhado por emissora; total = média."""
+    df_cost = agg[agg["cliente"].isin(share_clients_idx)].copy()
+    # Sem inserções, o custo unitário é o próprio faturamento
+    df_cost["custo_unit"] = np.where(
+        df_cost["insercoes"] > 0,
+        df_cost["faturamento"] / df_cost["insercoes"],
+        df_cost["faturamento"]
+    )
+    pivot_cost = df_cost.pivot_table(index="cliente", columns="emissora", values="custo_unit", observed=True)
+    pivot_cost = pivot_cost.reindex(columns=sorted(agg["emissora"].unique()))
+
+    # Clientes do maior para o menor faturamento no período
+    client_ranking = base_periodo.groupby("cliente", observed=True)["faturamento"].sum()
+    pivot_cost["_sort_val"] = pivot_cost.index.map(client_ranking)
+    pivot_cost = pivot_cost.sort_values("_sort_val", ascending=False).drop(columns="_sort_val")
+
+    mean_values = pivot_cost.mean(numeric_only=True)
+    total_row_data = {"cliente": "Totalizador"}
+    for col in pivot_cost.columns:
+        total_row_data[col] = mean_values[col]
+    return pivot_cost.reset_index(), pd.DataFrame([total_row_data])
+
+def compute(df, mes_ini, mes_fim, metric="Clientes"):
+    """
+    Retorna None se o período não tem dados; senão um dict com os pares (tabela, total)
+    exclusivos, compartilhados e ausentes; top_compartilhados e custo_unitario (None sem
+    clientes compartilhados); e matriz (métrica 'metric'; None com menos de 2 emissoras).
+    """
+    base_periodo = period(df, mes_ini, mes_fim)
+    if base_periodo.empty:
+        return None
+
+    agg, pres_pivot = _presence(base_periodo)
+    exclusivos, compartilhados, ausentes = _coverage_tables(agg, pres_pivot)
+
+    compartilhados_mask = pres_pivot.sum(axis=1) >= 2
+    share_clients_idx = pres_pivot[compartilhados_mask].index
+    tem_compartilhados = compartilhados_mask.any()
+
+    return {
+        "exclusivos": exclusivos,
+        "compartilhados": compartilhados,
+        "ausentes": ausentes,
+        "top_compartilhados": _top_shared(base_periodo, pres_pivot, share_clients_idx) if tem_compartilhados else None,
+        "matriz": intersection_matrix(agg, pres_pivot, metric),
+        "custo_unitario": _unit_cost(base_periodo, agg, share_clients_idx) if tem_compartilhados else None,
+    }
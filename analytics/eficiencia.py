@@ -0,0 +1,113 @@
+# analytics/eficiencia.py
+# Números da página Eficiência: KPIs de yield, matriz preço x volume por cliente/emissora
+# e resumo anual de faturamento, inserções e yield por emissora.
+import numpy as np
+import pandas as pd
+
+from analytics.base import comparison_years, period, years
+from utils.cube import cube_for
+
+# Ano usado nas colunas do resumo quando a base não tem nenhum ano válido
+ANO_FALLBACK = 2024
+
+def _positive(base_periodo):
+    """Células com faturamento > 0 (medidas do cubo só das linhas positivas)."""
+    return base_periodo[base_periodo["linhas_pos"] > 0].assign(
+        faturamento=lambda d: d["faturamento_pos"], insercoes=lambda d: d["insercoes_pos"]
+    )
+
+def annual_summary(base_periodo, anos):
+    """
+    (tabela, total) por emissora: Faturamento_<ano>, Insercoes_<ano> e Yield_<ano> para cada ano
+    em 'anos', do maior para o menor yield do último ano. Total: somas e yield recalculado.
+    """
+    grp_ano = base_periodo.groupby(["emissora", "ano"], observed=True).agg(
+        Faturamento=("faturamento", "sum"),
+        Insercoes=("insercoes", "sum")
+    ).unstack(fill_value=0)
+
+    # Flatten nas colunas (Faturamento_2024, Insercoes_2025, etc.)
+    grp_ano.columns = [f"{col[0]}_{col[1]}" for col in grp_ano.columns]
+    grp_ano = grp_ano.reset_index()
+
+    for ano in anos:
+        if f"Faturamento_{ano}" not in grp_ano.columns: grp_ano[f"Faturamento_{ano}"] = 0.0
+        if f"Insercoes_{ano}" not in grp_ano.columns: grp_ano[f"Insercoes_{ano}"] = 0.0
+
+    for ano in anos:
+        grp_ano[f"Yield_{ano}"] = np.where(grp_ano[f"Insercoes_{ano}"] > 0, grp_ano[f"Faturamento_{ano}"] / grp_ano[f"Insercoes_{ano}"], 0.0)
+
+    # Ordena pelo Yield do último ano (ou do único)
+    sort_year = anos[-1]
+    if f"Yield_{sort_year}" in grp_ano.columns:
+        grp_ano = grp_ano.sort_values(f"Yield_{sort_year}", ascending=False)
+
+    total = pd.DataFrame()
+    if not grp_ano.empty:
+        total_row = {"emissora": "Totalizador"}
+        for ano in anos:
+            sum_fat = grp_ano[f"Faturamento_{ano}"].sum()
+            sum_ins = grp_ano[f"Insercoes_{ano}"].sum()
+            total_row[f"Faturamento_{ano}"] = sum_fat
+            total_row[f"Insercoes_{ano}"] = sum_ins
+            total_row[f"Yield_{ano}"] = sum_fat / sum_ins if sum_ins > 0 else 0
+        total = pd.DataFrame([total_row])
+    return grp_ano, total
+
+def efficiency_matrix(df, mes_ini, mes_fim, ano=None):
+    """
+    Pontos da matriz preço x volume (ano None = consolidado): um por cliente x emissora com
+    Faturamento, Insercoes e Custo_Medio (só quem tem inserções), e as medianas dos eixos.
+    """
+    base_analise = _positive(period(cube_for(df), mes_ini, mes_fim))
+    if ano is not None:
+        base_analise = base_analise[base_analise["ano"] == ano]
+
+    pontos = base_analise.groupby(["cliente", "emissora"], as_index=False, observed=True).agg(
+        Faturamento=("faturamento", "sum"),
+        Insercoes=("insercoes", "sum")
+    )
+    pontos["Custo_Medio"] = pontos["Faturamento"] / pontos["Insercoes"].replace(0, 1)
+    pontos = pontos[pontos["Insercoes"] > 0]
+    return {
+        "pontos": pontos,
+        "mediana_insercoes": pontos["Insercoes"].median(),
+        "mediana_custo": pontos["Custo_Medio"].median(),
+    }
+
+def compute(df, mes_ini, mes_fim):
+    """
+    Retorna None se o período não tem faturamento positivo; senão um dict com:
+    ano_base, ano_comp, anos_resumo (anos das colunas do resumo), anos (opções da matriz),
+    kpis (custo médio global, inserções médias por cliente, total de inserções) e
+    resumo_emissoras (tabela, total) de annual_summary.
+    """
+    # Agregações sobre o cubo (utils.cube): mesmas somas da base, com muito menos linhas
+    cubo = cube_for(df)
+    anos_global = years(cubo)
+    ano_base, ano_comp = comparison_years(anos_global) if anos_global else (ANO_FALLBACK, ANO_FALLBACK)
+
+    base_periodo = period(cubo, mes_ini, mes_fim)
+    base_analise = _positive(base_periodo)
+    if base_analise.empty:
+        return None
+
+    total_fat = base_analise["faturamento"].sum()
+    total_ins = base_analise["insercoes"].sum()
+    total_cli = base_analise["cliente"].nunique()
+
+    # Sem duplicar colunas quando ano base e comparado são o mesmo
+    anos_resumo = sorted(list(set([ano_base, ano_comp])))
+    return {
+        "ano_base": ano_base,
+        "ano_comp": ano_comp,
+        "anos_resumo": anos_resumo,
+        "anos": sorted(base_analise["ano"].dropna().unique()),
+        "kpis": {
+            # Yield global (preço por 1 inserção) e média de inserções por cliente
+            "custo_medio_global": (total_fat / total_ins) if total_ins > 0 else 0,
+            "media_ins_cli": (total_ins / total_cli) if total_cli > 0 else 0,
+            "total_ins": total_ins,
+        },
+        "resumo_emissoras": annual_summary(base_periodo, anos_resumo),
+    }
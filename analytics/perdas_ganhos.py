@@ -0,0 +1,125 @@
+# analytics/perdas_ganhos.py
+# Números da página Perdas & Ganhos: clientes que saíram/entraram entre o ano base e o
+# ano comparado, saldos e variações de faturamento/inserções por cliente e por emissora.
+import numpy as np
+import pandas as pd
+
+from analytics.base import comparison_years, period, years
+from utils.backend import pivot_by_year
+
+def _client_totals(base, clientes):
+    """(tabela, total): faturamento e inserções dos clientes na base, maior faturamento primeiro."""
+    tabela = (base[base["cliente"].isin(clientes)]
+              .groupby("cliente", as_index=False, observed=True)
+              .agg(faturamento=("faturamento", "sum"), insercoes=("insercoes", "sum"))
+              .sort_values("faturamento", ascending=False)
+              .reset_index(drop=True))
+    total = pd.DataFrame()
+    if not tabela.empty:
+        total = pd.DataFrame([{
+            "cliente": "Totalizador",
+            "faturamento": tabela["faturamento"].sum(),
+            "insercoes": tabela["insercoes"].sum()
+        }])
+    return tabela, total
+
+def variation_table(base_periodo, groupby_col, label_col, ano_base, ano_comp):
+    """
+    (tabela, total) de variação por grupo: Fat_/Ins_ de cada ano, "# Fat", "Δ%" e "Δ Ins",
+    da maior perda para o maior ganho. Funciona também com ano_base == ano_comp.
+    """
+    # Motor das agregações configurável (utils.backend: pandas ou Arrow multi-thread)
+    piv_fat = pivot_by_year(base_periodo, groupby_col, "faturamento")
+    piv_ins = pivot_by_year(base_periodo, groupby_col, "insercoes")
+
+    # Garante alinhamento de índices (caso algum cliente tenha só em um ano e o unstack ignore)
+    combined_index = piv_fat.index.union(piv_ins.index)
+
+    # .get() evita KeyError se o ano não existir e permite repetir o mesmo ano (ex: 2025 e 2025)
+    df_var = pd.DataFrame(index=combined_index)
+    df_var[f"Fat_{ano_base}"] = piv_fat.get(ano_base, 0.0)
+    df_var[f"Fat_{ano_comp}"] = piv_fat.get(ano_comp, 0.0)
+    df_var[f"Ins_{ano_base}"] = piv_ins.get(ano_base, 0.0)
+    df_var[f"Ins_{ano_comp}"] = piv_ins.get(ano_comp, 0.0)
+
+    df_var["# Fat"] = df_var[f"Fat_{ano_comp}"] - df_var[f"Fat_{ano_base}"]
+    df_var["Δ%"] = np.where(df_var[f"Fat_{ano_base}"] > 0, (df_var["# Fat"] / df_var[f"Fat_{ano_base}"]) * 100, np.nan)
+    df_var["Δ Ins"] = df_var[f"Ins_{ano_comp}"] - df_var[f"Ins_{ano_base}"]
+
+    df_var = df_var.reset_index().rename(columns={groupby_col: label_col})
+    df_var = df_var.sort_values("# Fat", ascending=True)
+
+    total = pd.DataFrame()
+    if not df_var.empty:
+        total_fat_a = df_var[f"Fat_{ano_base}"].sum()
+        total_fat_b = df_var[f"Fat_{ano_comp}"].sum()
+        total_ins_a = df_var[f"Ins_{ano_base}"].sum()
+        total_ins_b = df_var[f"Ins_{ano_comp}"].sum()
+        total = pd.DataFrame([{
+            label_col: "Totalizador",
+            f"Fat_{ano_base}": total_fat_a,
+            f"Fat_{ano_comp}": total_fat_b,
+            "# Fat": total_fat_b - total_fat_a,
+            "Δ%": (total_fat_b - total_fat_a) / total_fat_a * 100 if total_fat_a > 0 else np.nan,
+            f"Ins_{ano_base}": total_ins_a,
+            f"Ins_{ano_comp}": total_ins_b,
+            "Δ Ins": total_ins_b - total_ins_a
+        }])
+    return df_var, total
+
+def compute(df, mes_ini, mes_fim):
+    """
+    Retorna None se a base não tem anos válidos; senão um dict com ano_base, ano_comp,
+    perdas/ganhos (listas de clientes), kpis (valores, inserções, custos médios e saldos)
+    e os pares (tabela, total) tabela_perdas, tabela_ganhos, variacao_clientes, variacao_emissoras.
+    """
+    anos = years(df)
+    if not anos:
+        return None
+    ano_base, ano_comp = comparison_years(anos)
+
+    base_periodo = period(df, mes_ini, mes_fim)
+    baseA = base_periodo[base_periodo["ano"] == ano_base]
+    baseB = base_periodo[base_periodo["ano"] == ano_comp]
+
+    # Perdas: clientes só no ano base; ganhos: clientes só no ano comparado
+    cliA = set(baseA["cliente"].unique())
+    cliB = set(baseB["cliente"].unique())
+    lista_perdas = sorted(list(cliA - cliB))
+    lista_ganhos = sorted(list(cliB - cliA))
+
+    dados_perdas = baseA[baseA["cliente"].isin(lista_perdas)]
+    val_perdas = dados_perdas["faturamento"].sum()
+    ins_perdas = dados_perdas["insercoes"].sum()
+
+    dados_ganhos = baseB[baseB["cliente"].isin(lista_ganhos)]
+    val_ganhos = dados_ganhos["faturamento"].sum()
+    ins_ganhos = dados_ganhos["insercoes"].sum()
+
+    # Custo unitário médio (yield) de cada grupo
+    custo_medio_perdas = (val_perdas / ins_perdas) if ins_perdas > 0 else 0.0
+    custo_medio_ganhos = (val_ganhos / ins_ganhos) if ins_ganhos > 0 else 0.0
+
+    vazio = (pd.DataFrame(), pd.DataFrame())
+    return {
+        "ano_base": ano_base,
+        "ano_comp": ano_comp,
+        "perdas": lista_perdas,
+        "ganhos": lista_ganhos,
+        "kpis": {
+            "val_perdas": val_perdas,
+            "val_ganhos": val_ganhos,
+            "ins_perdas": ins_perdas,
+            "ins_ganhos": ins_ganhos,
+            "custo_medio_perdas": custo_medio_perdas,
+            "custo_medio_ganhos": custo_medio_ganhos,
+            "saldo_financeiro": val_ganhos - val_perdas,
+            "saldo_clientes": len(lista_ganhos) - len(lista_perdas),
+            "saldo_insercoes": ins_ganhos - ins_perdas,
+            "saldo_custo": custo_medio_ganhos - custo_medio_perdas,
+        },
+        "tabela_perdas": _client_totals(baseA, lista_perdas) if lista_perdas else vazio,
+        "tabela_ganhos": _client_totals(baseB, lista_ganhos) if lista_ganhos else vazio,
+        "variacao_clientes": variation_table(base_periodo, "cliente", "Cliente", ano_base, ano_comp),
+        "variacao_emissoras": variation_table(base_periodo, "emissora", "Emissora", ano_base, ano_comp),
+    }
@@ -0,0 +1,50 @@
+# analytics/relatorio_abc.py
+# Números da página Relatório ABC: curva de Pareto dos clientes por faturamento ou inserções.
+import numpy as np
+
+from analytics.base import period
+from utils.cube import cube_for, rollup
+
+# Limites do share acumulado de cada classe (o restante é C)
+LIMITE_A = 0.80
+LIMITE_B = 0.95
+
+def abc_class(acumulado):
+    """Classe ABC a partir do share acumulado (0 a 1)."""
+    if acumulado <= LIMITE_A: return "A"
+    elif acumulado <= LIMITE_B: return "B"
+    return "C"
+
+def compute(df, mes_ini, mes_fim, criterio="Faturamento"):
+    """
+    Retorna None se o período não tem dados; senão um dict com:
+    - tabela: cliente, faturamento, insercoes, share, acumulado, classe e custo_medio,
+      do maior para o menor pelo critério ("Faturamento" ou "Inserções");
+    - resumo: por classe (A, B, C) Qtd_Clientes, Total_Faturamento e Total_Insercoes.
+    """
+    # Agregações sobre o cubo (utils.cube): mesmas somas da base, com muito menos linhas
+    base_periodo = period(cube_for(df), mes_ini, mes_fim)
+    if base_periodo.empty:
+        return None
+
+    df_abc = rollup(base_periodo, ["cliente"])
+    target_col = "faturamento" if criterio == "Faturamento" else "insercoes"
+    df_abc = df_abc.sort_values(target_col, ascending=False).reset_index(drop=True)
+
+    total_target = df_abc[target_col].sum()
+    df_abc["share"] = (df_abc[target_col] / total_target) if total_target > 0 else 0
+    df_abc["acumulado"] = df_abc["share"].cumsum()
+    df_abc["classe"] = df_abc["acumulado"].apply(abc_class)
+    df_abc["custo_medio"] = np.where(
+        df_abc["insercoes"] > 0,
+        df_abc["faturamento"] / df_abc["insercoes"],
+        np.nan
+    )
+
+    resumo = df_abc.groupby("classe").agg(
+        Qtd_Clientes=("cliente", "count"),
+        Total_Faturamento=("faturamento", "sum"),
+        Total_Insercoes=("insercoes", "sum")
+    ).reindex(["A", "B", "C"]).fillna(0)
+
+    return {"tabela": df_abc, "resumo": resumo}
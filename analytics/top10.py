@@ -0,0 +1,57 @@
+# analytics/top10.py
+# Números da página Top 10: ranking de clientes por faturamento, inserções ou eficiência
+# (menor custo unitário), opcionalmente restrito a uma emissora e/ou a um ano.
+import numpy as np
+import pandas as pd
+
+from analytics.base import period
+from utils.cube import cube_for, rollup
+
+# Coluna e direção da ordenação de cada critério
+CRITERIOS = {
+    "Faturamento": ("faturamento", False),
+    "Inserções": ("insercoes", False),
+    "Eficiência": ("custo_unitario", True),
+}
+
+def selector_options(df, mes_ini, mes_fim):
+    """(emissoras, anos) presentes no período, para os seletores da página."""
+    base_periodo = period(cube_for(df), mes_ini, mes_fim)
+    return sorted(base_periodo["emissora"].dropna().unique()), sorted(base_periodo["ano"].dropna().unique())
+
+def compute(df, mes_ini, mes_fim, emissora=None, ano=None, criterio="Faturamento", n=10):
+    """
+    Top n clientes pelo critério ("Faturamento", "Inserções" ou "Eficiência"; em Eficiência só
+    entram clientes com inserções). emissora/ano None = consolidado da seleção atual.
+    Retorna (tabela, total): cliente, faturamento, insercoes, custo_unitario e a linha de total.
+    """
+    # Agregações sobre o cubo (utils.cube): mesmas somas da base, com muito menos linhas
+    base = period(cube_for(df), mes_ini, mes_fim)
+    if emissora is not None:
+        base = base[base["emissora"] == emissora]
+    if ano is not None:
+        base = base[base["ano"] == ano]
+
+    tabela = rollup(base, ["cliente"])
+    tabela["custo_unitario"] = np.where(
+        tabela["insercoes"] > 0,
+        tabela["faturamento"] / tabela["insercoes"],
+        np.nan
+    )
+
+    col_sort, ascending = CRITERIOS.get(criterio, CRITERIOS["Eficiência"])
+    if col_sort == "custo_unitario":
+        tabela = tabela[tabela["insercoes"] > 0]
+    tabela = tabela.sort_values(col_sort, ascending=ascending).head(n)
+
+    total = pd.DataFrame()
+    if not tabela.empty:
+        tot_fat = tabela["faturamento"].sum()
+        tot_ins = tabela["insercoes"].sum()
+        total = pd.DataFrame([{
+            "cliente": "Totalizador",
+            "faturamento": tot_fat,
+            "insercoes": tot_ins,
+            "custo_unitario": tot_fat / tot_ins if tot_ins > 0 else np.nan
+        }])
+    return tabela, total
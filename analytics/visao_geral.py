@@ -0,0 +1,88 @@
+# analytics/visao_geral.py
+# Números da página Visão Geral: KPIs, evolução mensal, faturamento por emissora/executivo e share.
+import pandas as pd
+
+from analytics.base import comparison_years, period
+from utils.cube import cube_for, rollup
+from utils.format import emissora_label
+
+def top_client(base):
+    """(cliente, faturamento) do maior cliente da base; ("—", 0.0) se vazia."""
+    if base.empty:
+        return "—", 0.0
+    ranking = base.groupby("cliente", observed=True)["faturamento"].sum().sort_values(ascending=False)
+    if ranking.empty:
+        return "—", 0.0
+    return ranking.index[0], ranking.iloc[0]
+
+def emissora_labels(tabela, chaves):
+    """
+    Troca as emissoras pelos rótulos de exibição (emissora_label) e soma as linhas que
+    passam a ter o mesmo nome. Roda sobre as tabelas agregadas (poucas linhas).
+    """
+    if tabela.empty:
+        return tabela
+    rotulos = tabela["emissora"].astype(str).map(emissora_label)
+    return tabela.assign(emissora=rotulos).groupby(chaves, as_index=False, sort=True)["faturamento"].sum()
+
+def compute(df, mes_ini, mes_fim):
+    """
+    Retorna None se a base não tem anos válidos; senão um dict com:
+    ano_base, ano_comp, kpis (totais, deltas, tickets médios e maior cliente por ano),
+    evolucao (ano, meslabel, mes, faturamento, insercoes), emissora e executivo
+    (faturamento por ano, na ordem dos gráficos) e share ({ano: faturamento por emissora}).
+    """
+    # Agregações sobre o cubo (utils.cube): mesmas somas da base, com muito menos linhas
+    cubo = cube_for(df)
+    anos = sorted(cubo["ano"].dropna().unique())
+    if not anos:
+        return None
+    ano_base, ano_comp = comparison_years(anos)
+
+    base_periodo = period(cubo, mes_ini, mes_fim)
+    baseA = base_periodo[base_periodo["ano"] == ano_base]
+    baseB = base_periodo[base_periodo["ano"] == ano_comp]
+
+    # KPIs: totais e ticket médio (faturamento por cliente distinto) de cada ano
+    totalA = float(baseA["faturamento"].sum()) if not baseA.empty else 0.0
+    totalB = float(baseB["faturamento"].sum()) if not baseB.empty else 0.0
+    delta_abs = totalB - totalA
+    cliA = baseA["cliente"].nunique()
+    cliB = baseB["cliente"].nunique()
+    kpis = {
+        "total_base": totalA,
+        "total_comp": totalB,
+        "delta_abs": delta_abs,
+        "delta_pct": (delta_abs / totalA * 100) if totalA > 0.0 else 0,
+        "ticket_base": totalA / cliA if cliA > 0 else 0.0,
+        "ticket_comp": totalB / cliB if cliB > 0 else 0.0,
+        "maior_cliente_base": top_client(baseA),
+        "maior_cliente_comp": top_client(baseB),
+    }
+
+    evolucao = rollup(base_periodo, ["ano", "meslabel", "mes"]).sort_values(["ano", "mes"])
+
+    # Emissoras com os nomes canônicos só nesta página (ordenadas por emissora e ano)
+    emissora = emissora_labels(rollup(base_periodo, ["emissora", "ano"], medidas=["faturamento"]), ["emissora", "ano"])
+
+    share = {}
+    for ano in sorted(base_periodo["ano"].dropna().unique()):
+        por_emissora = base_periodo[base_periodo["ano"] == ano].groupby("emissora", as_index=False, observed=True)["faturamento"].sum()
+        share[ano] = emissora_labels(por_emissora, ["emissora"])
+
+    # Executivos ordenados pelo faturamento total do período (maior primeiro), depois por ano
+    executivo = rollup(base_periodo, ["executivo", "ano"], medidas=["faturamento"])
+    if not executivo.empty:
+        ranking = executivo.groupby("executivo", observed=True)["faturamento"].sum().sort_values(ascending=False).index.tolist()
+        executivo["executivo"] = pd.Categorical(executivo["executivo"], categories=ranking, ordered=True)
+        executivo = executivo.sort_values(["executivo", "ano"])
+
+    return {
+        "ano_base": ano_base,
+        "ano_comp": ano_comp,
+        "kpis": kpis,
+        "evolucao": evolucao,
+        "emissora": emissora,
+        "share": share,
+        "executivo": executivo,
+    }
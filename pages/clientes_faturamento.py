@@ -1,11 +1,11 @@
 # pages/clientes_faturamento.py
 
 import streamlit as st
-import numpy as np
 import pandas as pd
 from utils.format import brl, PALETTE
 from utils.loaders import load_main_base
-from utils.export import create_zip_package 
+from utils.export_jobs import export_panel 
+from analytics.clientes_faturamento import compute
 
 # ==================== FUNÇÕES DE FORMATAÇÃO ====================
 def color_delta(val):
@@ -105,79 +105,20 @@ def render(df, mes_ini, mes_fim, show_labels, show_total, ultima_atualizacao=Non
     st.markdown("<h2 style='text-align: center; color: #003366;'>Clientes & Faturamento</h2>", unsafe_allow_html=True)
     st.markdown("<div style='margin-bottom: 20px;'></div>", unsafe_allow_html=True)
 
-    # Normalização
-    df = df.rename(columns={c: c.lower() for c in df.columns})
+    # Esquema canônico (utils.format.normalize_frame): colunas em minúsculas, prontas para uso
     if "faturamento" not in df.columns:
         st.error("Coluna 'Faturamento' ausente na base.")
         return
-    if "insercoes" not in df.columns:
-        df["insercoes"] = 0.0
 
-    # Anos
-    anos = sorted(df["ano"].dropna().unique())
-    if not anos: st.info("Sem anos válidos."); return
-    if len(anos) >= 2: ano_base, ano_comp = anos[-2], anos[-1]
-    else: ano_base = ano_comp = anos[-1]
-
-    base_periodo = df[df["mes"].between(mes_ini, mes_fim)]
-
-    # Helper de métricas
-    def enrich_with_metrics_split(df_main, group_col):
-        piv_ins = base_periodo.groupby([group_col, "ano"])["insercoes"].sum().unstack(fill_value=0)
-        piv_fat = base_periodo.groupby([group_col, "ano"])["faturamento"].sum().unstack(fill_value=0)
-        
-        for ano in [ano_base, ano_comp]:
-            if ano not in piv_ins.columns: piv_ins[ano] = 0.0
-            if ano not in piv_fat.columns: piv_fat[ano] = 0.0
-            
-        custo_base = np.where(piv_ins[ano_base] > 0, piv_fat[ano_base] / piv_ins[ano_base], np.nan)
-        custo_comp = np.where(piv_ins[ano_comp] > 0, piv_fat[ano_comp] / piv_ins[ano_comp], np.nan)
-        
-        piv_fat = piv_fat.reset_index()
-        piv_ins = piv_ins.reset_index()
-
-        df_metrics = pd.DataFrame({
-            group_col: piv_fat[group_col], 
-            f"Ins_{ano_base}": piv_ins[ano_base].values,
-            f"Ins_{ano_comp}": piv_ins[ano_comp].values,
-            f"Custo_{ano_base}": custo_base,
-            f"Custo_{ano_comp}": custo_comp
-        })
-        
-        if group_col in df_main.columns:
-            df_merged = pd.merge(df_main, df_metrics, on=group_col, how="left")
-        else:
-            df_merged = df_main # Fallback
-            
-        return df_merged
+    # Todos os números vêm de analytics.clientes_faturamento; aqui só formatação e desenho
+    dados = compute(df, mes_ini, mes_fim)
+    if dados is None: st.info("Sem anos válidos."); return
+    ano_base, ano_comp = dados["ano_base"], dados["ano_comp"]
 
     # ==================== 1. CLIENTES POR EMISSORA ====================
     st.subheader("1. Número de Clientes por Emissora (Comparativo)")
-    base_clientes_raw = base_periodo.groupby(["emissora", "ano"])["cliente"].nunique().unstack(fill_value=0).reset_index()
-    for ano in [ano_base, ano_comp]:
-        if ano not in base_clientes_raw.columns: base_clientes_raw[ano] = 0
-
-    base_clientes_raw["Δ"] = base_clientes_raw[ano_comp] - base_clientes_raw[ano_base]
-    base_clientes_raw["Δ%"] = np.where(base_clientes_raw[ano_base] > 0, (base_clientes_raw["Δ"] / base_clientes_raw[ano_base]) * 100, np.nan)
-    
-    # Separa Total
-    df_1_main = base_clientes_raw.copy()
-    df_1_total = pd.DataFrame()
-
-    if not df_1_main.empty:
-        total_A = df_1_main[ano_base].sum()
-        total_B = df_1_main[ano_comp].sum()
-        total_delta = total_B - total_A
-        total_pct = (total_delta / total_A * 100) if total_A > 0 else np.nan
-        
-        # Cria linha total
-        df_1_total = pd.DataFrame([{
-            "emissora": "Totalizador", 
-            ano_base: total_A, 
-            ano_comp: total_B, 
-            "Δ": total_delta, 
-            "Δ%": total_pct
-        }])
+    # Tabela e linha de total separadas
+    df_1_main, df_1_total = (d.copy() for d in dados["clientes_emissora"])
     
     # Prepara Visualização
     df_1_main.insert(0, "#", range(1, len(df_1_main) + 1))
@@ -213,35 +154,7 @@ def render(df, mes_ini, mes_fim, show_labels, show_total, ultima_atualizacao=Non
 
     # ==================== 2. FATURAMENTO POR EMISSORA ====================
     st.subheader("2. Faturamento por Emissora (com Eficiência)")
-    base_emissora_raw = base_periodo.groupby(["emissora", "ano"])["faturamento"].sum().unstack(fill_value=0).reset_index()
-    for ano in [ano_base, ano_comp]:
-        if ano not in base_emissora_raw.columns: base_emissora_raw[ano] = 0.0
-
-    base_emissora_raw["Δ"] = base_emissora_raw[ano_comp] - base_emissora_raw[ano_base]
-    base_emissora_raw["Δ%"] = np.where(base_emissora_raw[ano_base] > 0, (base_emissora_raw["Δ"] / base_emissora_raw[ano_base]) * 100, np.nan)
-    
-    base_emissora_raw = enrich_with_metrics_split(base_emissora_raw, "emissora")
-
-    df_2_main = base_emissora_raw.copy()
-    df_2_total = pd.DataFrame()
-
-    if not df_2_main.empty:
-        tA = df_2_main[ano_base].sum()
-        tB = df_2_main[ano_comp].sum()
-        tDelta = tB - tA
-        tPct = (tDelta / tA * 100) if tA > 0 else np.nan
-        
-        tInsA = df_2_main[f"Ins_{ano_base}"].sum()
-        tInsB = df_2_main[f"Ins_{ano_comp}"].sum()
-        avgCA = tA / tInsA if tInsA > 0 else np.nan
-        avgCB = tB / tInsB if tInsB > 0 else np.nan
-
-        df_2_total = pd.DataFrame([{
-            "emissora": "Totalizador",
-            ano_base: tA, ano_comp: tB, "Δ": tDelta, "Δ%": tPct,
-            f"Ins_{ano_base}": tInsA, f"Ins_{ano_comp}": tInsB,
-            f"Custo_{ano_base}": avgCA, f"Custo_{ano_comp}": avgCB
-        }])
+    df_2_main, df_2_total = (d.copy() for d in dados["faturamento_emissora"])
 
     df_2_main.insert(0, "#", range(1, len(df_2_main) + 1))
     df_2_total.insert(0, "#", ["Total"])
@@ -280,33 +193,7 @@ def render(df, mes_ini, mes_fim, show_labels, show_total, ultima_atualizacao=Non
 
     # ==================== 3. FATURAMENTO POR EXECUTIVO ====================
     st.subheader("3. Faturamento por Executivo (com Eficiência)")
-    tx_raw = base_periodo.groupby(["executivo", "ano"])["faturamento"].sum().unstack(fill_value=0).reset_index()
-    for ano in [ano_base, ano_comp]:
-        if ano not in tx_raw.columns: tx_raw[ano] = 0.0
-    
-    tx_raw["Δ"] = tx_raw[ano_comp] - tx_raw[ano_base]
-    tx_raw["Δ%"] = np.where(tx_raw[ano_base] > 0, (tx_raw["Δ"] / tx_raw[ano_base]) * 100, np.nan)
-    tx_raw = enrich_with_metrics_split(tx_raw, "executivo")
-
-    df_3_main = tx_raw.copy()
-    df_3_total = pd.DataFrame()
-
-    if not df_3_main.empty:
-        tA = df_3_main[ano_base].sum()
-        tB = df_3_main[ano_comp].sum()
-        tDelta = tB - tA
-        tPct = (tDelta / tA * 100) if tA > 0 else np.nan
-        tInsA = df_3_main[f"Ins_{ano_base}"].sum()
-        tInsB = df_3_main[f"Ins_{ano_comp}"].sum()
-        avgCA = tA / tInsA if tInsA > 0 else np.nan
-        avgCB = tB / tInsB if tInsB > 0 else np.nan
-
-        df_3_total = pd.DataFrame([{
-            "executivo": "Totalizador",
-            ano_base: tA, ano_comp: tB, "Δ": tDelta, "Δ%": tPct,
-            f"Ins_{ano_base}": tInsA, f"Ins_{ano_comp}": tInsB,
-            f"Custo_{ano_base}": avgCA, f"Custo_{ano_comp}": avgCB
-        }])
+    df_3_main, df_3_total = (d.copy() for d in dados["faturamento_executivo"])
 
     df_3_main.insert(0, "#", range(1, len(df_3_main) + 1))
     df_3_total.insert(0, "#", ["Total"])
@@ -344,26 +231,7 @@ def render(df, mes_ini, mes_fim, show_labels, show_total, ultima_atualizacao=Non
 
     # ==================== 4. MÉDIAS ====================
     st.subheader("4. Médias por Cliente (Investimento e Inserções)")
-    t16_raw = base_periodo.groupby("emissora").agg(
-        Faturamento=("faturamento", "sum"), Insercoes=("insercoes", "sum"), Clientes=("cliente", "nunique")
-    ).reset_index()
-    t16_raw["Média Invest./Cliente"] = np.where(t16_raw["Clientes"] == 0, np.nan, t16_raw["Faturamento"] / t16_raw["Clientes"])
-    t16_raw["Média Inserções/Cliente"] = np.where(t16_raw["Clientes"] == 0, np.nan, t16_raw["Insercoes"] / t16_raw["Clientes"])
-
-    df_4_main = t16_raw.copy()
-    df_4_total = pd.DataFrame()
-
-    if not df_4_main.empty:
-        tfat = df_4_main["Faturamento"].sum()
-        tins = df_4_main["Insercoes"].sum()
-        tcli = base_periodo["cliente"].nunique()
-        mfat = tfat/tcli if tcli > 0 else np.nan
-        mins = tins/tcli if tcli > 0 else np.nan
-        
-        df_4_total = pd.DataFrame([{
-            "emissora": "Totalizador", "Faturamento": tfat, "Insercoes": tins,
-            "Clientes": tcli, "Média Invest./Cliente": mfat, "Média Inserções/Cliente": mins
-        }])
+    df_4_main, df_4_total = (d.copy() for d in dados["medias_emissora"])
 
     df_4_main.insert(0, "#", range(1, len(df_4_main) + 1))
     df_4_total.insert(0, "#", ["Total"])
@@ -385,19 +253,7 @@ def render(df, mes_ini, mes_fim, show_labels, show_total, ultima_atualizacao=Non
 
     # ==================== 5. FATURAMENTO TOTAL ====================
     st.subheader("5. Faturamento por Emissora (Total)")
-    t15_simple = base_periodo.groupby("emissora", as_index=False).agg(
-        Faturamento=("faturamento", "sum"), Insercoes=("insercoes", "sum")
-    ).sort_values("Faturamento", ascending=False)
-    t15_simple["Custo Unitário"] = np.where(t15_simple["Insercoes"] > 0, t15_simple["Faturamento"] / t15_simple["Insercoes"], np.nan)
-
-    df_5_main = t15_simple.copy()
-    df_5_total = pd.DataFrame()
-
-    if not df_5_main.empty:
-        tf = df_5_main["Faturamento"].sum()
-        ti = df_5_main["Insercoes"].sum()
-        tc = tf/ti if ti > 0 else np.nan
-        df_5_total = pd.DataFrame([{"emissora": "Totalizador", "Faturamento": tf, "Insercoes": ti, "Custo Unitário": tc}])
+    df_5_main, df_5_total = (d.copy() for d in dados["faturamento_total_emissora"])
 
     df_5_main.insert(0, "#", range(1, len(df_5_main)+1))
     df_5_total.insert(0, "#", ["Total"])
@@ -422,54 +278,9 @@ def render(df, mes_ini, mes_fim, show_labels, show_total, ultima_atualizacao=Non
 
     # ==================== 6. COMPARATIVO MÊS A MÊS ====================
     st.subheader("6. Comparativo mês a mês")
-    mes_map = {1: "Jan", 2: "Fev", 3: "Mar", 4: "Abr", 5: "Mai", 6: "Jun", 7: "Jul", 8: "Ago", 9: "Set", 10: "Out", 11: "Nov", 12: "Dez"}
-    base_para_tabela = base_periodo.copy()
-    base_para_tabela["mes_nome"] = base_para_tabela["mes"].map(mes_map)
-    
-    piv_fat = base_para_tabela.groupby(["ano", "mes", "mes_nome"])["faturamento"].sum().reset_index().pivot(index=["mes", "mes_nome"], columns="ano", values="faturamento").fillna(0.0)
-    piv_ins = base_para_tabela.groupby(["ano", "mes", "mes_nome"])["insercoes"].sum().reset_index().pivot(index=["mes", "mes_nome"], columns="ano", values="insercoes").fillna(0.0)
-    
-    if not piv_fat.empty:
-        for ano in [ano_base, ano_comp]:
-            if ano not in piv_fat.columns: piv_fat[ano] = 0.0
-            if ano not in piv_ins.columns: piv_ins[ano] = 0.0
-            
-        c_base = np.where(piv_ins[ano_base] > 0, piv_fat[ano_base] / piv_ins[ano_base], np.nan)
-        c_comp = np.where(piv_ins[ano_comp] > 0, piv_fat[ano_comp] / piv_ins[ano_comp], np.nan)
-        
-        # Se os anos forem iguais, não duplicamos colunas
-        if ano_base == ano_comp:
-            t14_final = pd.DataFrame({
-                f"Fat. {ano_base}": piv_fat[ano_base],
-                f"Ins. {ano_base}": piv_ins[ano_base],
-                f"Custo {ano_base}": c_base,
-            }, index=piv_fat.index)
-        else:
-            t14_final = pd.DataFrame({
-                f"Fat. {ano_base}": piv_fat[ano_base], f"Fat. {ano_comp}": piv_fat[ano_comp],
-                f"Ins. {ano_base}": piv_ins[ano_base], f"Ins. {ano_comp}": piv_ins[ano_comp],
-                f"Custo {ano_base}": c_base, f"Custo {ano_comp}": c_comp
-            }, index=piv_fat.index)
-        
-        t14_final = t14_final.sort_index(level="mes")
-        
-        # Totalizador separado
-        total_row_dict = {}
-        for col in t14_final.columns:
-            if "Custo" not in col: total_row_dict[col] = t14_final[col].sum()
-        
-        if f"Fat. {ano_base}" in total_row_dict:
-            f = total_row_dict[f"Fat. {ano_base}"]
-            i = total_row_dict[f"Ins. {ano_base}"]
-            total_row_dict[f"Custo {ano_base}"] = f/i if i > 0 else np.nan
-             
-        if ano_base != ano_comp and f"Fat. {ano_comp}" in total_row_dict:
-             f = total_row_dict[f"Fat. {ano_comp}"]
-             i = total_row_dict[f"Ins. {ano_comp}"]
-             total_row_dict[f"Custo {ano_comp}"] = f/i if i > 0 else np.nan
-
-        df_6_main = t14_final.reset_index(level="mes", drop=True).reset_index()
-        df_6_total = pd.DataFrame([total_row_dict])
+    if dados["mes_a_mes"] is not None:
+        # Tabela mês a mês e totalizador separado
+        df_6_main, df_6_total = (d.copy() for d in dados["mes_a_mes"])
         
         # Apenas visual
         df_6_main = df_6_main.rename(columns={"mes_nome": "Mês"})
@@ -499,51 +310,7 @@ def render(df, mes_ini, mes_fim, show_labels, show_total, ultima_atualizacao=Non
     # ==================== 7. RELAÇÃO DE CLIENTES ====================
     st.subheader(f"7. Relação de Clientes ({ano_base} vs {ano_comp})")
     
-    t17_fat = base_periodo.groupby(["cliente", "ano"])["faturamento"].sum().unstack(fill_value=0)
-    t17_ins = base_periodo.groupby(["cliente", "ano"])["insercoes"].sum().unstack(fill_value=0)
-    
-    for ano in [ano_base, ano_comp]:
-        if ano not in t17_fat.columns: t17_fat[ano] = 0.0
-        if ano not in t17_ins.columns: t17_ins[ano] = 0.0
-        
-    t17_raw = pd.concat([t17_fat, t17_ins], axis=1)
-    if ano_base == ano_comp:
-         t17_raw = pd.concat([t17_fat[[ano_base]], t17_ins[[ano_base]]], axis=1)
-         t17_raw.columns = [f"Fat_{ano_base}", f"Ins_{ano_base}"]
-    else:
-         t17_raw.columns = [f"Fat_{ano}" for ano in t17_fat.columns] + [f"Ins_{ano}" for ano in t17_ins.columns]
-    
-    t17_raw = t17_raw.reset_index()
-
-    cols_fat = [c for c in t17_raw.columns if c.startswith("Fat_")]
-    cols_ins = [c for c in t17_raw.columns if c.startswith("Ins_")]
-    
-    t17_raw["Total Fat"] = t17_raw[cols_fat].sum(axis=1)
-    t17_raw["Total Ins"] = t17_raw[cols_ins].sum(axis=1)
-    tgf = t17_raw["Total Fat"].sum()
-    t17_raw["Share %"] = (t17_raw["Total Fat"] / tgf * 100) if tgf > 0 else 0.0
-    
-    for cf, ci in zip(cols_fat, cols_ins):
-        yr = cf.split("_")[1]
-        t17_raw[f"Custo_{yr}"] = np.where(t17_raw[ci] > 0, t17_raw[cf] / t17_raw[ci], np.nan)
-
-    t17_raw = t17_raw.sort_values("Total Fat", ascending=False).reset_index(drop=True)
-
-    df_7_main = t17_raw.copy()
-    df_7_total = pd.DataFrame()
-
-    if not df_7_main.empty:
-        tot_d = {"cliente": "Totalizador", "Share %": 100.0}
-        for c in df_7_main.columns:
-            if c not in ["cliente", "Share %"] and not c.startswith("Custo_"):
-                tot_d[c] = df_7_main[c].sum()
-        
-        for cf, ci in zip(cols_fat, cols_ins):
-            yr = cf.split("_")[1]
-            f, i = tot_d[cf], tot_d[ci]
-            tot_d[f"Custo_{yr}"] = f/i if i > 0 else np.nan
-            
-        df_7_total = pd.DataFrame([tot_d])
+    df_7_main, df_7_total = (d.copy() for d in dados["relacao_clientes"])
 
     rename_7 = {"cliente": "Cliente", "Total Fat": "Faturamento Total", "Total Ins": "Inserções Total"}
     for c in df_7_main.columns:
@@ -626,26 +393,19 @@ def render(df, mes_ini, mes_fim, show_labels, show_total, ultima_atualizacao=Non
                 st.error("Selecione pelo menos um item.")
                 return
 
-            try:
-                def get_filter_string():
-                    f = st.session_state 
-                    ano_ini = f.get("filtro_ano_ini", "N/A")
-                    ano_fim = f.get("filtro_ano_fim", "N/A")
-                    emis = ", ".join(f.get("filtro_emis", ["Todas"]))
-                    execs = ", ".join(f.get("filtro_execs", ["Todos"]))
-                    meses = ", ".join(f.get("filtro_meses_lista", ["Todos"]))
-                    clientes = ", ".join(f.get("filtro_clientes", ["Todos"])) if f.get("filtro_clientes") else "Todos"
-                    
-                    return (f"Período (Ano): {ano_ini} a {ano_fim} | Meses: {meses} | "
-                            f"Emissoras: {emis} | Executivos: {execs} | Clientes: {clientes}")
-
-                filtro_str = get_filter_string()
-                zip_data = create_zip_package(tables_to_export, filtro_str, excel_filename="Dashboard_Clientes_Faturamento.xlsx")
-                st.download_button("Clique para baixar", data=zip_data, file_name="Dashboard_Clientes_Faturamento.zip", mime="application/zip", on_click=lambda: st.session_state.update(show_clientes_export=False), type="secondary")
-            except Exception as e:
-                st.error(f"Erro ao gerar ZIP: {e}")
-
-            if st.button("Cancelar", key="cancel_export", type="secondary"):
-                st.session_state.show_clientes_export = False
-                st.rerun()
+            def get_filter_string():
+                f = st.session_state 
+                ano_ini = f.get("filtro_ano_ini", "N/A")
+                ano_fim = f.get("filtro_ano_fim", "N/A")
+                emis = ", ".join(f.get("filtro_emis", ["Todas"]))
+                execs = ", ".join(f.get("filtro_execs", ["Todos"]))
+                meses = ", ".join(f.get("filtro_meses_lista", ["Todos"]))
+                clientes = ", ".join(f.get("filtro_clientes", ["Todos"])) if f.get("filtro_clientes") else "Todos"
+                
+                return (f"Período (Ano): {ano_ini} a {ano_fim} | Meses: {meses} | "
+                        f"Emissoras: {emis} | Executivos: {execs} | Clientes: {clientes}")
+
+            filtro_str = get_filter_string()
+            export_panel("clientes_faturamento", tables_to_export, filtro_str, "Dashboard_Clientes_Faturamento.xlsx",
+                         "Dashboard_Clientes_Faturamento.zip", "show_clientes_export")
         export_dialog()
\ No newline at end of file
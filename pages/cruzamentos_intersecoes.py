@@ -6,8 +6,8 @@ import numpy as np
 from utils.format import brl, PALETTE
 import plotly.graph_objects as go
 import plotly.express as px
-from itertools import combinations
-from utils.export import create_zip_package 
+from utils.export_jobs import export_panel 
+from analytics.cruzamentos_intersecoes import compute
 
 def format_int(val):
     """Formata inteiros com separador de milhar."""
@@ -58,114 +58,28 @@ def render(df, mes_ini, mes_fim, show_labels, show_total, ultima_atualizacao=Non
     pivot_cost_display = pd.DataFrame() 
     fig_mat = go.Figure() 
 
-    df = df.rename(columns={c: c.lower() for c in df.columns})
-
     if "cliente" not in df.columns or "emissora" not in df.columns or "faturamento" not in df.columns:
         st.error("Colunas obrigatórias 'Cliente', 'Emissora' e 'Faturamento' ausentes.")
         return
-    
-    if "insercoes" not in df.columns:
-        df["insercoes"] = 0.0
 
-    base_periodo = df[df["mes"].between(mes_ini, mes_fim)]
+    # Todos os números vêm de analytics.cruzamentos_intersecoes; aqui só formatação e desenho
+    if "cruzamentos_metric" not in st.session_state: st.session_state.cruzamentos_metric = "Clientes"
+    metric = st.session_state.cruzamentos_metric
+    dados = compute(df, mes_ini, mes_fim, metric)
 
-    if base_periodo.empty:
+    if dados is None:
         st.info("Sem dados para o período selecionado.")
         return
-
-    # Agrupamento Base
-    agg = base_periodo.groupby(["cliente", "emissora"], as_index=False).agg(
-        faturamento=("faturamento", "sum"),
-        insercoes=("insercoes", "sum")
-    )
-    agg["presenca"] = np.where(agg["faturamento"] > 0, 1, 0)
-
-    # Pivôs para cálculos
-    pres_pivot = agg.pivot_table(index="cliente", columns="emissora", values="presenca", fill_value=0)
-    # Garante que todas as emissoras do dataframe filtrado apareçam nas colunas
-    emissoras = sorted(agg["emissora"].unique())
-    
-    # Contagem de Emissoras por Cliente
-    emis_count = pres_pivot.sum(axis=1)
-    
-    # Lista de todos os clientes únicos no período (Mercado Total Filtrado)
-    todos_clientes = set(agg["cliente"].unique())
     
     st.divider()
 
-    # ==================== CÁLCULOS GERAIS ====================
-    exclusivos_mask = emis_count == 1
-    compartilhados_mask = emis_count >= 2
-
-    excl_info, comp_info, ausentes_info = [], [], []
-    fat_total_geral = agg["faturamento"].sum() 
-
-    for emis in emissoras:
-        # --- 1. EXCLUSIVOS ---
-        cli_excl = pres_pivot.loc[exclusivos_mask & (pres_pivot[emis] == 1)].index
-        dados_excl = agg[(agg["cliente"].isin(cli_excl)) & (agg["emissora"] == emis)]
-        
-        fat_excl = dados_excl["faturamento"].sum()
-        ins_excl = dados_excl["insercoes"].sum()
-        
-        # --- 2. COMPARTILHADOS ---
-        cli_comp = pres_pivot.loc[compartilhados_mask & (pres_pivot[emis] == 1)].index
-        dados_comp = agg[(agg["cliente"].isin(cli_comp)) & (agg["emissora"] == emis)]
-        
-        fat_comp = dados_comp["faturamento"].sum()
-        ins_comp = dados_comp["insercoes"].sum()
-        
-        # --- 3. AUSENTES (NOVO) ---
-        clientes_emis = set(agg[agg["emissora"] == emis]["cliente"].unique())
-        lista_ausentes = list(todos_clientes - clientes_emis)
-        dados_ausentes = agg[agg["cliente"].isin(lista_ausentes)]
-        
-        fat_ausente = dados_ausentes["faturamento"].sum()
-        ins_ausente = dados_ausentes["insercoes"].sum()
-        qtd_ausentes = len(lista_ausentes)
-
-        dados_total = agg[agg["emissora"] == emis]
-        fat_total_emis = dados_total["faturamento"].sum()
-        
-        # Appends
-        excl_info.append({
-            "Emissora": emis, 
-            "Clientes Exclusivos": len(cli_excl),
-            "Faturamento Exclusivo": fat_excl, 
-            "Inserções Exclusivas": ins_excl,
-            "% Faturamento": (fat_excl / fat_total_emis * 100) if fat_total_emis > 0 else 0
-        })
-        comp_info.append({
-            "Emissora": emis, 
-            "Clientes Compartilhados": len(cli_comp),
-            "Faturamento Compartilhado": fat_comp, 
-            "Inserções Compartilhadas": ins_comp,
-            "% Faturamento": (fat_comp / fat_total_emis * 100) if fat_total_emis > 0 else 0
-        })
-        ausentes_info.append({
-            "Emissora": emis,
-            "Clientes Ausentes": qtd_ausentes,
-            "Faturamento Perdido (Oportunidade)": fat_ausente,
-            "Inserções Perdidas": ins_ausente,
-            "% Share Perdido": (fat_ausente / fat_total_geral * 100) if fat_total_geral > 0 else 0
-        })
-
     # ==================== 1. EXCLUSIVOS ====================
     st.subheader("1. Clientes Exclusivos por Emissora")
-    df_excl_raw = pd.DataFrame(excl_info) 
+    df_excl_raw, total_row = (d.copy() for d in dados["exclusivos"])
     if not df_excl_raw.empty:
-        df_excl_raw = df_excl_raw.sort_values("Faturamento Exclusivo", ascending=False).reset_index(drop=True)
-        
         # Lógica Totalizador
         if show_total:
-            total_row = {
-                "Emissora": "Totalizador", 
-                "Clientes Exclusivos": df_excl_raw["Clientes Exclusivos"].sum(), 
-                "Faturamento Exclusivo": df_excl_raw["Faturamento Exclusivo"].sum(), 
-                "Inserções Exclusivas": df_excl_raw["Inserções Exclusivas"].sum(),
-                "% Faturamento": (df_excl_raw["Faturamento Exclusivo"].sum() / fat_total_geral * 100) if fat_total_geral > 0 else np.nan
-            }
-            df_excl_raw = pd.concat([df_excl_raw, pd.DataFrame([total_row])], ignore_index=True)
+            df_excl_raw = pd.concat([df_excl_raw, total_row], ignore_index=True)
         
         if show_total:
              df_excl_raw.insert(0, "#", list(range(1, len(df_excl_raw))) + ["Total"])
@@ -184,20 +98,11 @@ def render(df, mes_ini, mes_fim, show_labels, show_total, ultima_atualizacao=Non
 
     # ==================== 2. COMPARTILHADOS ====================
     st.subheader("2. Clientes Compartilhados por Emissora")
-    df_comp_raw = pd.DataFrame(comp_info) 
+    df_comp_raw, total_row = (d.copy() for d in dados["compartilhados"])
     if not df_comp_raw.empty:
-        df_comp_raw = df_comp_raw.sort_values("Faturamento Compartilhado", ascending=False).reset_index(drop=True)
-        
         # Lógica Totalizador
         if show_total:
-            total_row = {
-                "Emissora": "Totalizador", 
-                "Clientes Compartilhados": df_comp_raw["Clientes Compartilhados"].sum(), 
-                "Faturamento Compartilhado": df_comp_raw["Faturamento Compartilhado"].sum(), 
-                "Inserções Compartilhadas": df_comp_raw["Inserções Compartilhadas"].sum(),
-                "% Faturamento": (df_comp_raw["Faturamento Compartilhado"].sum() / fat_total_geral * 100) if fat_total_geral > 0 else np.nan
-            }
-            df_comp_raw = pd.concat([df_comp_raw, pd.DataFrame([total_row])], ignore_index=True)
+            df_comp_raw = pd.concat([df_comp_raw, total_row], ignore_index=True)
         
         if show_total:
              df_comp_raw.insert(0, "#", list(range(1, len(df_comp_raw))) + ["Total"])
@@ -216,21 +121,12 @@ def render(df, mes_ini, mes_fim, show_labels, show_total, ultima_atualizacao=Non
 
     # ==================== 3. AUSENTES (NOVO) ====================
     st.subheader("3. Clientes Ausentes por Emissora (Oportunidade)")
-    df_ausentes_raw = pd.DataFrame(ausentes_info)
+    df_ausentes_raw, total_row = (d.copy() for d in dados["ausentes"])
     
     if not df_ausentes_raw.empty:
-        df_ausentes_raw = df_ausentes_raw.sort_values("Faturamento Perdido (Oportunidade)", ascending=False).reset_index(drop=True)
-        
         # Lógica Totalizador
         if show_total:
-            total_row = {
-                "Emissora": "Totalizador",
-                "Clientes Ausentes": df_ausentes_raw["Clientes Ausentes"].sum(),
-                "Faturamento Perdido (Oportunidade)": df_ausentes_raw["Faturamento Perdido (Oportunidade)"].sum(),
-                "Inserções Perdidas": df_ausentes_raw["Inserções Perdidas"].sum(),
-                "% Share Perdido": np.nan 
-            }
-            df_ausentes_raw = pd.concat([df_ausentes_raw, pd.DataFrame([total_row])], ignore_index=True)
+            df_ausentes_raw = pd.concat([df_ausentes_raw, total_row], ignore_index=True)
         
         if show_total:
              df_ausentes_raw.insert(0, "#", list(range(1, len(df_ausentes_raw))) + ["Total"])
@@ -251,37 +147,11 @@ def render(df, mes_ini, mes_fim, show_labels, show_total, ultima_atualizacao=Non
 
     # ==================== 4. TOP CLIENTES COMPARTILHADOS ====================
     st.subheader("4. Top clientes compartilhados (2+ emissoras)")
-    if compartilhados_mask.any():
-        share_clients_idx = pres_pivot[compartilhados_mask].index
-        
-        custom_order = ["Difusora", "Novabrasil", "Th+ Prime", "Thathi Tv"]
-        order_map = {name.lower(): i for i, name in enumerate(custom_order)}
-
-        def get_emissoras_str(row):
-            emis_ativas = row.index[row == 1].tolist()
-            emis_ativas.sort(key=lambda x: (order_map.get(x.lower(), 999), x))
-            return ", ".join(emis_ativas)
-
-        df_emis_list = pres_pivot.loc[share_clients_idx].apply(get_emissoras_str, axis=1)
-        
-        top_shared_raw = (base_periodo[base_periodo["cliente"].isin(share_clients_idx)]
-                          .groupby("cliente", as_index=False)
-                          .agg(faturamento=("faturamento", "sum"), insercoes=("insercoes", "sum"))
-                          .sort_values("faturamento", ascending=False)
-                          .head(20))
-        
-        top_shared_raw["emissoras_compartilhadas"] = top_shared_raw["cliente"].map(df_emis_list)
+    if dados["top_compartilhados"] is not None:
+        top_shared_raw, total_row = (d.copy() for d in dados["top_compartilhados"])
 
         if not top_shared_raw.empty and show_total:
-            top_shared_raw = pd.concat([
-                top_shared_raw, 
-                pd.DataFrame([{
-                    "cliente": "Totalizador", 
-                    "faturamento": top_shared_raw["faturamento"].sum(),
-                    "insercoes": top_shared_raw["insercoes"].sum(),
-                    "emissoras_compartilhadas": "" 
-                }])
-            ], ignore_index=True)
+            top_shared_raw = pd.concat([top_shared_raw, total_row], ignore_index=True)
         
         if show_total:
              top_shared_raw.insert(0, "#", list(range(1, len(top_shared_raw))) + ["Total"])
@@ -304,9 +174,6 @@ def render(df, mes_ini, mes_fim, show_labels, show_total, ultima_atualizacao=Non
     st.divider()
 
     # ==================== 5. MATRIZ DE INTERSEÇÃO ====================
-    if "cruzamentos_metric" not in st.session_state: st.session_state.cruzamentos_metric = "Clientes"
-    metric = st.session_state.cruzamentos_metric
-    
     btn_label_clientes = "Clientes em comum"
     btn_label_fat = "Faturamento em comum (R$)"
     btn_label_ins = "Inserções em comum (Qtd)"
@@ -317,9 +184,7 @@ def render(df, mes_ini, mes_fim, show_labels, show_total, ultima_atualizacao=Non
     else: metric_label = btn_label_ins
     
     st.subheader(f"5. Interseções entre emissoras (matriz) - {metric_label}")
-    emis_list = sorted(list(pres_pivot.columns))
-    
-    if len(emis_list) < 2:
+    if dados["matriz"] is None:
         st.info("Requer pelo menos 2 emissoras para cruzamento.")
     else:
         col1, col2, col3 = st.columns([1, 1, 1]) 
@@ -341,49 +206,21 @@ def render(df, mes_ini, mes_fim, show_labels, show_total, ultima_atualizacao=Non
                 st.session_state.cruzamentos_metric = "Insercoes"
                 st.rerun() 
 
-        mat_raw = pd.DataFrame(0.0, index=emis_list, columns=emis_list)
-        z_text = None 
-        text_colors_2d = [] 
+        mat_raw = dados["matriz"]
+        z = mat_raw.values
 
         if metric == "Clientes":
-            for a, b in combinations(emis_list, 2):
-                comuns = ((pres_pivot[a] == 1) & (pres_pivot[b] == 1)).sum()
-                mat_raw.loc[a, b] = comuns
-                mat_raw.loc[b, a] = comuns
-            for e in emis_list: mat_raw.loc[e, e] = (pres_pivot[e] == 1).sum()
-            z = mat_raw.values
             hover = "<b>%{y} x %{x}</b><br>Clientes: %{z}<extra></extra>"
             z_text = z.astype(int).astype(str) 
-            max_val = np.nanmax(z) if z.size > 0 else 0
-            text_colors_2d = [['white' if v > max_val * 0.4 else 'black' for v in row] for row in z]
-            
         elif metric == "Faturamento": 
-            val_pivot = agg.pivot_table(index="cliente", columns="emissora", values="faturamento", fill_value=0.0) 
-            for a, b in combinations(emis_list, 2):
-                menor = np.minimum(val_pivot[a], val_pivot[b])
-                vlr = menor[menor > 0].sum()
-                mat_raw.loc[a, b] = vlr
-                mat_raw.loc[b, a] = vlr
-            for e in emis_list: mat_raw.loc[e, e] = val_pivot[e].sum()
-            z = mat_raw.values
             hover = "<b>%{y} x %{x}</b><br>Valor: R$ %{z:,.2f}<extra></extra>"
             z_text = [[format_pt_br_abrev(v) for v in row] for row in z]
-            max_val = np.nanmax(z) if z.size > 0 else 0
-            text_colors_2d = [['white' if v > max_val * 0.4 else 'black' for v in row] for row in z]
-            
         else: 
-            ins_pivot = agg.pivot_table(index="cliente", columns="emissora", values="insercoes", fill_value=0.0)
-            for a, b in combinations(emis_list, 2):
-                menor = np.minimum(ins_pivot[a], ins_pivot[b])
-                vlr = menor[menor > 0].sum()
-                mat_raw.loc[a, b] = vlr
-                mat_raw.loc[b, a] = vlr
-            for e in emis_list: mat_raw.loc[e, e] = ins_pivot[e].sum()
-            z = mat_raw.values
             hover = "<b>%{y} x %{x}</b><br>Inserções: %{z:,.0f}<extra></extra>"
             z_text = [[format_int(v) for v in row] for row in z]
-            max_val = np.nanmax(z) if z.size > 0 else 0
-            text_colors_2d = [['white' if v > max_val * 0.4 else 'black' for v in row] for row in z]
+
+        max_val = np.nanmax(z) if z.size > 0 else 0
+        text_colors_2d = [['white' if v > max_val * 0.4 else 'black' for v in row] for row in z]
 
         fig_mat = go.Figure(data=go.Heatmap(z=z, x=mat_raw.columns, y=mat_raw.index, colorscale="Blues", hovertemplate=hover, showscale=True))
         if show_labels and z_text is not None:
@@ -404,41 +241,11 @@ def render(df, mes_ini, mes_fim, show_labels, show_total, ultima_atualizacao=Non
     # ==================== 6. COMPARATIVO CUSTO UNITÁRIO ====================
     st.subheader("6. Comparativo de Custo Médio Unitário (Clientes Compartilhados)")
     
-    if compartilhados_mask.any():
-        share_clients_idx = pres_pivot[compartilhados_mask].index
-        
-        df_cost = agg[agg["cliente"].isin(share_clients_idx)].copy()
-        
-        # Custo Unitário
-        df_cost["custo_unit"] = np.where(
-            df_cost["insercoes"] > 0,
-            df_cost["faturamento"] / df_cost["insercoes"],
-            df_cost["faturamento"] 
-        )
-        
-        pivot_cost = df_cost.pivot_table(
-            index="cliente", 
-            columns="emissora", 
-            values="custo_unit"
-        )
-        
-        pivot_cost = pivot_cost.reindex(columns=emissoras)
-        
-        # Ordenação
-        client_ranking = base_periodo.groupby("cliente")["faturamento"].sum()
-        pivot_cost["_sort_val"] = pivot_cost.index.map(client_ranking)
-        pivot_cost = pivot_cost.sort_values("_sort_val", ascending=False).drop(columns="_sort_val")
-        
-        # --- CÁLCULO DA LINHA TOTALIZADORA (MÉDIA) ---
-        df_final = pivot_cost.reset_index()
+    if dados["custo_unitario"] is not None:
+        # Linha totalizadora: média do custo unitário por emissora
+        df_final, total_df = dados["custo_unitario"]
         
         if show_total:
-            mean_values = pivot_cost.mean(numeric_only=True)
-            total_row_data = {"cliente": "Totalizador"}
-            for col in pivot_cost.columns:
-                total_row_data[col] = mean_values[col]
-            
-            total_df = pd.DataFrame([total_row_data])
             df_final = pd.concat([df_final, total_df], ignore_index=True)
         
         # --- FORMATAÇÃO ---
@@ -503,27 +310,12 @@ def render(df, mes_ini, mes_fim, show_labels, show_total, ultima_atualizacao=Non
                 st.error("Selecione pelo menos um item.")
                 return
 
-            try:
-                filtro_str = get_filter_string()
-                
-                # Nomes ATUALIZADOS para ZIP e Excel Interno
-                nome_interno_excel = "Dashboard_Cruzamentos_Intersecoes.xlsx"
-                zip_filename = "Dashboard_Cruzamentos_Intersecoes.zip"
-                
-                zip_data = create_zip_package(tables_to_export, filtro_str, excel_filename=nome_interno_excel)
-                
-                st.download_button(
-                    label="Clique para baixar", 
-                    data=zip_data, 
-                    file_name=zip_filename, 
-                    mime="application/zip", 
-                    on_click=lambda: st.session_state.update(show_cruzamentos_export=False), 
-                    type="secondary"
-                )
-            except Exception as e:
-                st.error(f"Erro ao gerar ZIP: {e}")
-
-            if st.button("Cancelar", key="cancel_export", type="secondary"):
-                st.session_state.show_cruzamentos_export = False
-                st.rerun()
+            filtro_str = get_filter_string()
+            
+            # Nomes ATUALIZADOS para ZIP e Excel Interno
+            nome_interno_excel = "Dashboard_Cruzamentos_Intersecoes.xlsx"
+            zip_filename = "Dashboard_Cruzamentos_Intersecoes.zip"
+            
+            export_panel("cruzamentos_intersecoes", tables_to_export, filtro_str, nome_interno_excel, zip_filename,
+                         "show_cruzamentos_export")
         export_dialog()
\ No newline at end of file
@@ -3,9 +3,9 @@
 import streamlit as st
 import plotly.express as px
 import pandas as pd
-import numpy as np
 from utils.format import brl, PALETTE
-from utils.export import create_zip_package 
+from utils.export_jobs import export_panel 
+from analytics.eficiencia import compute, efficiency_matrix
 
 # ==================== ESTILO CSS (CENTRALIZAÇÃO E ALINHAMENTO) ====================
 ST_METRIC_CENTER = """
@@ -67,45 +67,23 @@ def render(df, mes_ini, mes_fim, show_labels, show_total, ultima_atualizacao=Non
     st.markdown("<h2 style='text-align: center; color: #003366;'>Eficiência & KPIs Avançados</h2>", unsafe_allow_html=True)
     st.markdown("<div style='margin-bottom: 20px;'></div>", unsafe_allow_html=True)
 
-    # Normalização e Filtros
-    df = df.rename(columns={c: c.lower() for c in df.columns})
-    
+    # Colunas obrigatórias (esquema canônico já vem normalizado da ingestão)
     if "faturamento" not in df.columns or "cliente" not in df.columns:
         st.error("Colunas obrigatórias ausentes.")
         return
-    
-    if "insercoes" not in df.columns:
-        df["insercoes"] = 0.0
-
-    # Definição dos Anos para lógica de colunas
-    anos_global = sorted(df["ano"].dropna().unique())
-    if len(anos_global) >= 2:
-        ano_base, ano_comp = anos_global[-2], anos_global[-1]
-    elif len(anos_global) == 1:
-        ano_base = ano_comp = anos_global[0]
-    else:
-        ano_base = ano_comp = 2024 # Fallback
 
-    # Filtra período
-    base_periodo = df[df["mes"].between(mes_ini, mes_fim)]
-    
-    # Filtra apenas quem tem faturamento > 0
-    base_analise = base_periodo[base_periodo["faturamento"] > 0].copy()
-
-    if base_analise.empty:
+    # Todos os números vêm de analytics.eficiencia; aqui só formatação e desenho
+    dados = compute(df, mes_ini, mes_fim)
+    if dados is None:
         st.info("Sem dados financeiros para o período.")
         return
+    ano_base, ano_comp = dados["ano_base"], dados["ano_comp"]
 
     # ==================== CÁLCULOS DE KPI (MACRO - CONSOLIDADO) ====================
-    total_fat = base_analise["faturamento"].sum()
-    total_ins = base_analise["insercoes"].sum()
-    total_cli = base_analise["cliente"].nunique()
-    
-    # Yield Global (Preço por 1 Inserção)
-    custo_medio_global = (total_fat / total_ins) if total_ins > 0 else 0
-    
-    # Média de Inserções por Cliente (Substituindo o CPM)
-    media_ins_cli = (total_ins / total_cli) if total_cli > 0 else 0
+    kpis = dados["kpis"]
+    custo_medio_global = kpis["custo_medio_global"]
+    media_ins_cli = kpis["media_ins_cli"]
+    total_ins = kpis["total_ins"]
 
     col1, col2, col3 = st.columns(3)
     col1.metric("Yield Médio (R$ / Inserção)", brl(custo_medio_global), help="Valor médio pago por uma única inserção.")
@@ -118,7 +96,7 @@ def render(df, mes_ini, mes_fim, show_labels, show_total, ultima_atualizacao=Non
     st.subheader("1. Matriz de Eficiência (Preço vs. Volume)")
 
     # Seletor de Ano
-    anos_disponiveis = sorted(base_analise["ano"].dropna().unique())
+    anos_disponiveis = dados["anos"]
     opcoes_ano = ["Consolidado (Seleção Atual)"] + anos_disponiveis
     
     # Default: Último ano da lista (index -1 de anos_disponiveis, mas ajustado para lista completa)
@@ -128,23 +106,10 @@ def render(df, mes_ini, mes_fim, show_labels, show_total, ultima_atualizacao=Non
     ano_sel = col_sel.selectbox("Selecione o Ano:", opcoes_ano, index=default_idx)
 
     # Filtragem Local
-    if ano_sel == "Consolidado (Seleção Atual)":
-        df_matriz = base_analise.copy()
-        titulo_matriz = "Consolidado"
-    else:
-        df_matriz = base_analise[base_analise["ano"] == ano_sel].copy()
-        titulo_matriz = str(ano_sel)
-
-    # Agrupa dados para o Gráfico
-    scatter_data = df_matriz.groupby(["cliente", "emissora"], as_index=False).agg(
-        Faturamento=("faturamento", "sum"),
-        Insercoes=("insercoes", "sum")
-    )
-    
-    # Calcula custo médio
-    scatter_data["Custo_Medio"] = scatter_data["Faturamento"] / scatter_data["Insercoes"].replace(0, 1)
-    # Filtra zeros
-    scatter_data = scatter_data[scatter_data["Insercoes"] > 0]
+    consolidado = ano_sel == "Consolidado (Seleção Atual)"
+    titulo_matriz = "Consolidado" if consolidado else str(ano_sel)
+    matriz = efficiency_matrix(df, mes_ini, mes_fim, None if consolidado else ano_sel)
+    scatter_data = matriz["pontos"]
 
     # Cores
     color_map = {
@@ -173,8 +138,8 @@ def render(df, mes_ini, mes_fim, show_labels, show_total, ultima_atualizacao=Non
         )
         
         # Linhas médias dinâmicas
-        avg_x = scatter_data["Insercoes"].median()
-        avg_y = scatter_data["Custo_Medio"].median()
+        avg_x = matriz["mediana_insercoes"]
+        avg_y = matriz["mediana_custo"]
         
         fig_scatter.add_hline(y=avg_y, line_dash="dot", annotation_text="Preço Médio", annotation_position="bottom right")
         fig_scatter.add_vline(x=avg_x, line_dash="dot", annotation_text="Vol. Médio", annotation_position="top right")
@@ -243,48 +208,13 @@ def render(df, mes_ini, mes_fim, show_labels, show_total, ultima_atualizacao=Non
     # ==================== 2. RESUMO POR EMISSORA (COM DIVISÃO ANUAL) ====================
     st.subheader("2. Resumo de Eficiência por Emissora (Comparativo Anual)")
     
-    # Pivotagem para separar por ano
-    grp_ano = base_periodo.groupby(["emissora", "ano"]).agg(
-        Faturamento=("faturamento", "sum"),
-        Insercoes=("insercoes", "sum")
-    ).unstack(fill_value=0)
-    
-    # Flatten nas colunas (Fat 2024, Fat 2025, etc.)
-    grp_ano.columns = [f"{col[0]}_{col[1]}" for col in grp_ano.columns]
-    grp_ano = grp_ano.reset_index()
-    
-    # Garante colunas dos anos base e comp se não existirem
-    # CORREÇÃO: Evitar duplicidade se anos forem iguais
-    anos_check = sorted(list(set([ano_base, ano_comp])))
-    
-    for ano in anos_check:
-        if f"Faturamento_{ano}" not in grp_ano.columns: grp_ano[f"Faturamento_{ano}"] = 0.0
-        if f"Insercoes_{ano}" not in grp_ano.columns: grp_ano[f"Insercoes_{ano}"] = 0.0
-
-    # Calcula Yield Anual
-    for ano in anos_check:
-        grp_ano[f"Yield_{ano}"] = np.where(grp_ano[f"Insercoes_{ano}"] > 0, grp_ano[f"Faturamento_{ano}"] / grp_ano[f"Insercoes_{ano}"], 0.0)
-
-    # Ordena pelo Yield do último ano (ou ano base se for o único)
-    sort_year = ano_comp if f"Yield_{ano_comp}" in grp_ano.columns else ano_base
-    if f"Yield_{sort_year}" in grp_ano.columns:
-        grp_ano = grp_ano.sort_values(f"Yield_{sort_year}", ascending=False)
+    # Colunas por ano (Faturamento, Inserções e Yield de cada ano do comparativo)
+    anos_check = dados["anos_resumo"]
+    grp_ano, total_row = dados["resumo_emissoras"]
 
     # Totalizador (Condicionado ao botão)
     if not grp_ano.empty and show_total:
-        total_row = {"emissora": "Totalizador"}
-        
-        # Soma para Fat e Ins, Média para Yield (recalculada)
-        for ano in anos_check:
-            sum_fat = grp_ano[f"Faturamento_{ano}"].sum()
-            sum_ins = grp_ano[f"Insercoes_{ano}"].sum()
-            avg_yld = sum_fat / sum_ins if sum_ins > 0 else 0
-            
-            total_row[f"Faturamento_{ano}"] = sum_fat
-            total_row[f"Insercoes_{ano}"] = sum_ins
-            total_row[f"Yield_{ano}"] = avg_yld
-            
-        grp_ano = pd.concat([grp_ano, pd.DataFrame([total_row])], ignore_index=True)
+        grp_ano = pd.concat([grp_ano, total_row], ignore_index=True)
 
     # Display Formatado
     tb_display = grp_ano.copy()
@@ -374,27 +304,11 @@ def render(df, mes_ini, mes_fim, show_labels, show_total, ultima_atualizacao=Non
                 st.error("Selecione pelo menos um item.")
                 return
 
-            try:
-                filtro_str = get_filter_string()
-                
-                # Nomes corretos para ZIP e Excel Interno
-                nome_interno_excel = "Dashboard_Eficiencia.xlsx"
-                zip_filename = "Dashboard_Eficiencia.zip"
-                
-                zip_data = create_zip_package(tables_to_export, filtro_str, excel_filename=nome_interno_excel)
-                
-                st.download_button(
-                    label="Clique para baixar", 
-                    data=zip_data, 
-                    file_name=zip_filename, 
-                    mime="application/zip", 
-                    on_click=lambda: st.session_state.update(show_efi_export=False), 
-                    type="secondary"
-                )
-            except Exception as e:
-                st.error(f"Erro ao gerar ZIP: {e}")
-
-            if st.button("Cancelar", key="cancel_export", type="secondary"):
-                st.session_state.show_efi_export = False
-                st.rerun()
+            filtro_str = get_filter_string()
+            
+            # Nomes corretos para ZIP e Excel Interno
+            nome_interno_excel = "Dashboard_Eficiencia.xlsx"
+            zip_filename = "Dashboard_Eficiencia.zip"
+            
+            export_panel("eficiencia", tables_to_export, filtro_str, nome_interno_excel, zip_filename, "show_efi_export")
         export_dialog()
\ No newline at end of file
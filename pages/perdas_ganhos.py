@@ -3,8 +3,9 @@
 import streamlit as st
 from utils.format import brl
 import pandas as pd
-import numpy as np
-from utils.export import create_zip_package 
+from utils.export_jobs import export_panel 
+from analytics.base import comparison_years, years
+from analytics.perdas_ganhos import compute
 
 # ==================== ESTILO CSS (CENTRALIZAÇÃO E ALINHAMENTO) ====================
 ST_METRIC_CENTER = """
@@ -124,24 +125,14 @@ def render(df, mes_ini, mes_fim, show_labels, show_total, ultima_atualizacao=Non
     var_cli_raw = pd.DataFrame()
     var_emis_raw = pd.DataFrame()
     
-    # Normalização básica
-    df = df.rename(columns={c: c.lower() for c in df.columns})
-    
-    # Garante coluna insercoes
-    if "insercoes" not in df.columns:
-        df["insercoes"] = 0.0
-    
     # ==================== LÓGICA DE ANOS (AUTOMÁTICA) ====================
-    anos = sorted(df["ano"].dropna().unique())
+    anos = years(df)
     
     if not anos:
         st.info("Sem anos válidos na base.")
         return
     
-    if len(anos) >= 2:
-        ano_base, ano_comp = anos[-2], anos[-1]
-    else:
-        ano_base = ano_comp = anos[-1]
+    ano_base, ano_comp = comparison_years(anos)
 
     # ==================== TÍTULO CENTRALIZADO ====================
     st.markdown(
@@ -154,38 +145,20 @@ def render(df, mes_ini, mes_fim, show_labels, show_total, ultima_atualizacao=Non
         st.error("Colunas obrigatórias 'Cliente' e/ou 'Faturamento' ausentes.")
         return
 
-    # Filtra período (Meses) e separa as bases
-    base_periodo = df[df["mes"].between(mes_ini, mes_fim)]
-    baseA = base_periodo[base_periodo["ano"] == ano_base]
-    baseB = base_periodo[base_periodo["ano"] == ano_comp]
-
     # ==================== CÁLCULOS DE CHURN E NOVOS NEGÓCIOS ====================
-    cliA = set(baseA["cliente"].unique())
-    cliB = set(baseB["cliente"].unique())
-    
-    # Listas de Clientes
-    lista_perdas = sorted(list(cliA - cliB))
-    lista_ganhos = sorted(list(cliB - cliA))
-
-    # Valores Perdidos (Saíram em A)
-    dados_perdas = baseA[baseA["cliente"].isin(lista_perdas)]
-    val_perdas = dados_perdas["faturamento"].sum()
-    ins_perdas = dados_perdas["insercoes"].sum()
-    
-    # Valores Ganhos (Entraram em B)
-    dados_ganhos = baseB[baseB["cliente"].isin(lista_ganhos)]
-    val_ganhos = dados_ganhos["faturamento"].sum()
-    ins_ganhos = dados_ganhos["insercoes"].sum()
-
-    # Cálculo do Custo Unitário Médio (Yield)
-    custo_medio_perdas = (val_perdas / ins_perdas) if ins_perdas > 0 else 0.0
-    custo_medio_ganhos = (val_ganhos / ins_ganhos) if ins_ganhos > 0 else 0.0
+    # Todos os números vêm de analytics.perdas_ganhos; aqui só formatação e desenho
+    dados = compute(df, mes_ini, mes_fim)
+    lista_perdas, lista_ganhos = dados["perdas"], dados["ganhos"]
+    kpis = dados["kpis"]
+
+    val_perdas, ins_perdas, custo_medio_perdas = kpis["val_perdas"], kpis["ins_perdas"], kpis["custo_medio_perdas"]
+    val_ganhos, ins_ganhos, custo_medio_ganhos = kpis["val_ganhos"], kpis["ins_ganhos"], kpis["custo_medio_ganhos"]
     
     # Deltas (Saldos)
-    saldo_financeiro = val_ganhos - val_perdas
-    saldo_clientes = len(lista_ganhos) - len(lista_perdas)
-    saldo_insercoes = ins_ganhos - ins_perdas
-    saldo_custo = custo_medio_ganhos - custo_medio_perdas
+    saldo_financeiro = kpis["saldo_financeiro"]
+    saldo_clientes = kpis["saldo_clientes"]
+    saldo_insercoes = kpis["saldo_insercoes"]
+    saldo_custo = kpis["saldo_custo"]
 
     # ==================== CARDS DE SALDO LÍQUIDO (CENTRALIZADOS) ====================
     col_s1, col_s2, col_s3, col_s4 = st.columns(4)
@@ -222,20 +195,11 @@ def render(df, mes_ini, mes_fim, show_labels, show_total, ultima_atualizacao=Non
     # --- Tabela Perdas ---
     st.subheader(f"1. Clientes Perdidos (Saíram de {ano_base})")
     if lista_perdas:
-        df_perdas_raw = (baseA[baseA["cliente"].isin(lista_perdas)]
-                            .groupby("cliente", as_index=False)
-                            .agg(faturamento=("faturamento", "sum"), insercoes=("insercoes", "sum"))
-                            .sort_values("faturamento", ascending=False)
-                            .reset_index(drop=True))
+        df_perdas_raw, total_row = (d.copy() for d in dados["tabela_perdas"])
         
         if not df_perdas_raw.empty:
             # Lógica do Totalizador
             if show_total:
-                total_row = pd.DataFrame([{
-                    "cliente": "Totalizador", 
-                    "faturamento": df_perdas_raw["faturamento"].sum(),
-                    "insercoes": df_perdas_raw["insercoes"].sum()
-                }])
                 df_perdas_raw = pd.concat([df_perdas_raw, total_row], ignore_index=True)
 
         # Adiciona coluna #
@@ -265,20 +229,11 @@ def render(df, mes_ini, mes_fim, show_labels, show_total, ultima_atualizacao=Non
     # --- Tabela Ganhos ---
     st.subheader(f"2. Clientes Novos (Entraram em {ano_comp})")
     if lista_ganhos:
-        df_ganhos_raw = (baseB[baseB["cliente"].isin(lista_ganhos)]
-                            .groupby("cliente", as_index=False)
-                            .agg(faturamento=("faturamento", "sum"), insercoes=("insercoes", "sum"))
-                            .sort_values("faturamento", ascending=False)
-                            .reset_index(drop=True))
+        df_ganhos_raw, total_row = (d.copy() for d in dados["tabela_ganhos"])
         
         if not df_ganhos_raw.empty:
             # Lógica do Totalizador
             if show_total:
-                total_row = pd.DataFrame([{
-                    "cliente": "Totalizador", 
-                    "faturamento": df_ganhos_raw["faturamento"].sum(),
-                    "insercoes": df_ganhos_raw["insercoes"].sum()
-                }])
                 df_ganhos_raw = pd.concat([df_ganhos_raw, total_row], ignore_index=True)
 
         if show_total and not df_ganhos_raw.empty:
@@ -304,56 +259,12 @@ def render(df, mes_ini, mes_fim, show_labels, show_total, ultima_atualizacao=Non
 
     st.divider()
 
-    # CORREÇÃO CRÍTICA: Função refeita para suportar comparação de mesmo ano (2025 vs 2025)
-    def build_variation_table(groupby_col, label_col):
-        # Pivot sem preencher nomes de colunas automaticamente ainda
-        piv_fat = base_periodo.groupby([groupby_col, "ano"])["faturamento"].sum().unstack(fill_value=0)
-        piv_ins = base_periodo.groupby([groupby_col, "ano"])["insercoes"].sum().unstack(fill_value=0)
-        
-        # Garante alinhamento de índices (caso algum cliente tenha só em um ano e o unstack ignore)
-        combined_index = piv_fat.index.union(piv_ins.index)
-        
-        # Constrói o DataFrame manualmente selecionando as séries. 
-        # O uso de .get() evita KeyError se o ano não existir, 
-        # e permite chamar o mesmo ano duas vezes (ex: 2025 e 2025) sem erro de duplicação de colunas no concat.
-        df_var = pd.DataFrame(index=combined_index)
-        
-        df_var[f"Fat_{ano_base}"] = piv_fat.get(ano_base, 0.0)
-        df_var[f"Fat_{ano_comp}"] = piv_fat.get(ano_comp, 0.0)
-        df_var[f"Ins_{ano_base}"] = piv_ins.get(ano_base, 0.0)
-        df_var[f"Ins_{ano_comp}"] = piv_ins.get(ano_comp, 0.0)
-        
-        # Cálculos de Delta
-        df_var["# Fat"] = df_var[f"Fat_{ano_comp}"] - df_var[f"Fat_{ano_base}"]
-        df_var["Δ%"] = np.where(df_var[f"Fat_{ano_base}"] > 0, (df_var["# Fat"] / df_var[f"Fat_{ano_base}"]) * 100, np.nan)
-        df_var["Δ Ins"] = df_var[f"Ins_{ano_comp}"] - df_var[f"Ins_{ano_base}"]
-        
-        df_var = df_var.reset_index().rename(columns={groupby_col: label_col})
-        df_var = df_var.sort_values("# Fat", ascending=True)
-        
-        return df_var
-
     # ==================== VARIAÇÕES (COMPARATIVO DE CARTEIRA) ====================
     st.subheader("3. Variações por Cliente (Faturamento e Inserções)")
     
-    var_cli_raw = build_variation_table("cliente", "Cliente")
+    var_cli_raw, row_total = dados["variacao_clientes"]
 
     if not var_cli_raw.empty and show_total:
-        total_fat_a = var_cli_raw[f"Fat_{ano_base}"].sum()
-        total_fat_b = var_cli_raw[f"Fat_{ano_comp}"].sum()
-        total_ins_a = var_cli_raw[f"Ins_{ano_base}"].sum()
-        total_ins_b = var_cli_raw[f"Ins_{ano_comp}"].sum()
-        
-        row_total = pd.DataFrame([{
-            "Cliente": "Totalizador", 
-            f"Fat_{ano_base}": total_fat_a, 
-            f"Fat_{ano_comp}": total_fat_b, 
-            "# Fat": total_fat_b - total_fat_a, 
-            "Δ%": (total_fat_b - total_fat_a) / total_fat_a * 100 if total_fat_a > 0 else np.nan,
-            f"Ins_{ano_base}": total_ins_a,
-            f"Ins_{ano_comp}": total_ins_b,
-            "Δ Ins": total_ins_b - total_ins_a
-        }])
         var_cli_raw = pd.concat([var_cli_raw, row_total], ignore_index=True)
     
     var_cli_disp = var_cli_raw.copy()
@@ -385,24 +296,9 @@ def render(df, mes_ini, mes_fim, show_labels, show_total, ultima_atualizacao=Non
     # ==================== VARIAÇÕES POR EMISSORA ====================
     st.subheader("4. Variações por Emissora (Faturamento e Inserções)")
     
-    var_emis_raw = build_variation_table("emissora", "Emissora")
+    var_emis_raw, row_total_e = dados["variacao_emissoras"]
     
     if not var_emis_raw.empty and show_total:
-        total_fat_a = var_emis_raw[f"Fat_{ano_base}"].sum()
-        total_fat_b = var_emis_raw[f"Fat_{ano_comp}"].sum()
-        total_ins_a = var_emis_raw[f"Ins_{ano_base}"].sum()
-        total_ins_b = var_emis_raw[f"Ins_{ano_comp}"].sum()
-        
-        row_total_e = pd.DataFrame([{
-            "Emissora": "Totalizador", 
-            f"Fat_{ano_base}": total_fat_a, 
-            f"Fat_{ano_comp}": total_fat_b, 
-            "# Fat": total_fat_b - total_fat_a, 
-            "Δ%": (total_fat_b - total_fat_a) / total_fat_a * 100 if total_fat_a > 0 else np.nan,
-            f"Ins_{ano_base}": total_ins_a,
-            f"Ins_{ano_comp}": total_ins_b,
-            "Δ Ins": total_ins_b - total_ins_a
-        }])
         var_emis_raw = pd.concat([var_emis_raw, row_total_e], ignore_index=True)
         
     var_emis_disp = var_emis_raw.copy().rename(columns=col_map)
@@ -466,26 +362,10 @@ def render(df, mes_ini, mes_fim, show_labels, show_total, ultima_atualizacao=Non
                 st.error("Selecione pelo menos um item.")
                 return
 
-            try:
-                filtro_str = get_filter_string()
-                # Nome fixo para o Excel interno
-                nome_interno_excel = "Dashboard_Perdas_Ganhos.xlsx"
-                zip_filename = "Dashboard_Perdas_Ganhos.zip"
-                
-                zip_data = create_zip_package(tables_to_export, filtro_str, excel_filename=nome_interno_excel)
-                
-                st.download_button(
-                    label="Clique para baixar", 
-                    data=zip_data, 
-                    file_name=zip_filename, 
-                    mime="application/zip", 
-                    on_click=lambda: st.session_state.update(show_perdas_export=False), 
-                    type="secondary"
-                )
-            except Exception as e:
-                st.error(f"Erro ao gerar ZIP: {e}")
-
-            if st.button("Cancelar", key="cancel_export", type="secondary"):
-                st.session_state.show_perdas_export = False
-                st.rerun()
+            filtro_str = get_filter_string()
+            # Nome fixo para o Excel interno
+            nome_interno_excel = "Dashboard_Perdas_Ganhos.xlsx"
+            zip_filename = "Dashboard_Perdas_Ganhos.zip"
+            
+            export_panel("perdas_ganhos", tables_to_export, filtro_str, nome_interno_excel, zip_filename, "show_perdas_export")
         export_dialog()
\ No newline at end of file
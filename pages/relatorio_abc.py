@@ -2,10 +2,10 @@
 
 import streamlit as st
 import pandas as pd
-import numpy as np
 import plotly.express as px
 from utils.format import brl, PALETTE
-from utils.export import create_zip_package 
+from utils.export_jobs import export_panel 
+from analytics.relatorio_abc import compute
 
 # ==================== ESTILO CSS LOCAL (PÁGINA ABC) ====================
 # Ajustes específicos para esta página:
@@ -68,27 +68,22 @@ def render(df, mes_ini, mes_fim, show_labels, show_total, ultima_atualizacao=Non
     # Inicializa variáveis
     fig_pie = None 
 
-    # Normalização
-    df = df.rename(columns={c: c.lower() for c in df.columns})
-    
+    # Colunas obrigatórias (esquema canônico já vem normalizado da ingestão)
     if "cliente" not in df.columns or "faturamento" not in df.columns:
         st.error("Colunas obrigatórias ausentes.")
         return
-    if "insercoes" not in df.columns:
-        df["insercoes"] = 0.0
-
-    # Filtros
-    base_periodo = df[df["mes"].between(mes_ini, mes_fim)]
-    
-    if base_periodo.empty:
-        st.info("Sem dados para o período selecionado.")
-        return
 
     # ==================== SELETOR DE MÉTRICA (CENTRALIZADO) ====================
     if "abc_metric" not in st.session_state:
         st.session_state.abc_metric = "Faturamento"
     
     criterio = st.session_state.abc_metric
+
+    # Curva ABC calculada em analytics.relatorio_abc; aqui só formatação e desenho
+    dados = compute(df, mes_ini, mes_fim, criterio)
+    if dados is None:
+        st.info("Sem dados para o período selecionado.")
+        return
     
     # Layout responsivo: 
     # Usamos colunas vazias nas laterais para centralizar no Desktop.
@@ -115,37 +110,10 @@ def render(df, mes_ini, mes_fim, show_labels, show_total, ultima_atualizacao=Non
     st.divider()
 
     # ==================== CÁLCULO DO ABC ====================
-    df_abc = base_periodo.groupby("cliente", as_index=False).agg(
-        faturamento=("faturamento", "sum"),
-        insercoes=("insercoes", "sum")
-    )
-    
-    target_col = "faturamento" if criterio == "Faturamento" else "insercoes"
-    df_abc = df_abc.sort_values(target_col, ascending=False).reset_index(drop=True)
-    
-    total_target = df_abc[target_col].sum()
-    df_abc["share"] = (df_abc[target_col] / total_target) if total_target > 0 else 0
-    df_abc["acumulado"] = df_abc["share"].cumsum()
-    
-    def definir_classe(acum):
-        if acum <= 0.80: return "A"
-        elif acum <= 0.95: return "B"
-        return "C"
-    
-    df_abc["classe"] = df_abc["acumulado"].apply(definir_classe)
-    
-    df_abc["custo_medio"] = np.where(
-        df_abc["insercoes"] > 0, 
-        df_abc["faturamento"] / df_abc["insercoes"], 
-        np.nan
-    )
+    df_abc = dados["tabela"]
 
     # ==================== KPIs DO TOPO ====================
-    resumo_classes = df_abc.groupby("classe").agg(
-        Qtd_Clientes=("cliente", "count"),
-        Total_Faturamento=("faturamento", "sum"),
-        Total_Insercoes=("insercoes", "sum")
-    ).reindex(["A", "B", "C"]).fillna(0)
+    resumo_classes = dados["resumo"]
     
     c1, c2, c3 = st.columns(3)
     
@@ -301,23 +269,9 @@ def render(df, mes_ini, mes_fim, show_labels, show_total, ultima_atualizacao=Non
                 st.error("Selecione pelo menos um item.")
                 return
 
-            try:
-                filtro_str = get_filter_string()
-                nome_interno_excel = "Dashboard_Relatorio_ABC.xlsx"
-                zip_data = create_zip_package(tables_to_export, filtro_str, excel_filename=nome_interno_excel)
-                
-                st.download_button(
-                    label="Clique para baixar", 
-                    data=zip_data, 
-                    file_name=f"Dashboard_Relatorio_ABC.zip", 
-                    mime="application/zip", 
-                    on_click=lambda: st.session_state.update(show_abc_export=False), 
-                    type="secondary"
-                )
-            except Exception as e:
-                st.error(f"Erro ao gerar ZIP: {e}")
-
-            if st.button("Cancelar", key="cancel_export", type="secondary"):
-                st.session_state.show_abc_export = False
-                st.rerun()
+            filtro_str = get_filter_string()
+            nome_interno_excel = "Dashboard_Relatorio_ABC.xlsx"
+            
+            export_panel("relatorio_abc", tables_to_export, filtro_str, nome_interno_excel, "Dashboard_Relatorio_ABC.zip",
+                         "show_abc_export")
         export_dialog()
\ No newline at end of file
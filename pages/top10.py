@@ -3,10 +3,11 @@
 import streamlit as st
 import plotly.express as px
 from utils.format import brl, PALETTE
-from utils.export import create_zip_package 
+from utils.export_jobs import export_panel 
 import pandas as pd
 import plotly.graph_objects as go
 import numpy as np
+from analytics.top10 import compute, selector_options
 
 def format_pt_br_abrev(val):
     if pd.isna(val): return "R$ 0" 
@@ -79,21 +80,12 @@ def render(df, mes_ini, mes_fim, show_labels, show_total, ultima_atualizacao=Non
     fig = go.Figure() 
     top10_raw_export = pd.DataFrame()
 
-    df = df.rename(columns={c: c.lower() for c in df.columns})
     if "emissora" not in df.columns or "ano" not in df.columns:
         st.error("Colunas 'Emissora' e/ou 'Ano' ausentes.")
         return
-    
-    # Garante Inserções
-    if "insercoes" not in df.columns:
-        df["insercoes"] = 0.0
 
-    # Filtra período (Mês)
-    base_periodo = df[df["mes"].between(mes_ini, mes_fim)]
-    
-    # Listas para os seletores
-    emis_list = sorted(base_periodo["emissora"].dropna().unique())
-    anos_list = sorted(base_periodo["ano"].dropna().unique())
+    # Listas para os seletores (emissoras e anos do período)
+    emis_list, anos_list = selector_options(df, mes_ini, mes_fim)
 
     if not emis_list or not anos_list:
         st.info("Sem dados para selecionar emissora/ano.")
@@ -142,46 +134,18 @@ def render(df, mes_ini, mes_fim, show_labels, show_total, ultima_atualizacao=Non
             st.rerun()
 
     # ==================== LÓGICA DE FILTRAGEM ====================
-    # 1. Filtro de Emissora
-    if emis_sel == "Consolidado (Seleção Atual)":
-        base = base_periodo.copy()
-        cor_grafico = PALETTE[3] # Azul Escuro
-    else:
-        base = base_periodo[base_periodo["emissora"] == emis_sel].copy()
-        cor_grafico = PALETTE[0] # Azul Claro
-
-    # 2. Filtro de Ano
-    if ano_sel != "Consolidado (Seleção Atual)":
-        base = base[base["ano"] == ano_sel]
+    consolidado_emis = emis_sel == "Consolidado (Seleção Atual)"
+    consolidado_ano = ano_sel == "Consolidado (Seleção Atual)"
+    cor_grafico = PALETTE[3] if consolidado_emis else PALETTE[0] # Azul Escuro / Azul Claro
 
     # ==================== PROCESSAMENTO ====================
-    # Agrupa por cliente somando métricas
-    top10_raw = base.groupby("cliente", as_index=False).agg(
-        faturamento=("faturamento", "sum"),
-        insercoes=("insercoes", "sum")
+    # Ranking calculado em analytics.top10; aqui só formatação e desenho
+    top10_raw, total_row = compute(
+        df, mes_ini, mes_fim,
+        emissora=None if consolidado_emis else emis_sel,
+        ano=None if consolidado_ano else ano_sel,
+        criterio=criterio
     )
-    
-    # Calcula Custo Unitário
-    top10_raw["custo_unitario"] = np.where(
-        top10_raw["insercoes"] > 0, 
-        top10_raw["faturamento"] / top10_raw["insercoes"], 
-        np.nan
-    )
-
-    # Ordena pelo critério selecionado
-    if criterio == "Faturamento":
-        col_sort = "faturamento"
-        ascending = False
-    elif criterio == "Inserções":
-        col_sort = "insercoes"
-        ascending = False
-    else: # Eficiência
-        col_sort = "custo_unitario"
-        ascending = True 
-        top10_raw = top10_raw[top10_raw["insercoes"] > 0]
-
-    # Pega Top 10
-    top10_raw = top10_raw.sort_values(col_sort, ascending=ascending).head(10)
 
     if not top10_raw.empty:
         # Tabela com Totalizador para exportação
@@ -189,17 +153,7 @@ def render(df, mes_ini, mes_fim, show_labels, show_total, ultima_atualizacao=Non
         
         # Lógica Totalizador
         if show_total:
-            tot_fat = top10_with_total["faturamento"].sum()
-            tot_ins = top10_with_total["insercoes"].sum()
-            tot_custo = tot_fat / tot_ins if tot_ins > 0 else np.nan
-
-            total_row = {
-                "cliente": "Totalizador", 
-                "faturamento": tot_fat,
-                "insercoes": tot_ins,
-                "custo_unitario": tot_custo
-            }
-            top10_with_total = pd.concat([top10_with_total, pd.DataFrame([total_row])], ignore_index=True)
+            top10_with_total = pd.concat([top10_with_total, total_row], ignore_index=True)
         
         if show_total:
              top10_with_total.insert(0, "#", list(range(1, len(top10_raw) + 1)) + ["Total"])
@@ -322,28 +276,12 @@ def render(df, mes_ini, mes_fim, show_labels, show_total, ultima_atualizacao=Non
                 st.error("Selecione pelo menos um item.")
                 return
 
-            try:
-                filtro_str = get_filter_string()
-                filtro_str += f" | Visão Top 10: {emis_sel} | Critério: {criterio} | Ano Base: {ano_sel}"
-                
-                # NOME DO ARQUIVO EXCEL INTERNO
-                nome_interno_excel = "Dashboard_Top10.xlsx"
-                zip_filename = f"Dashboard_Top10.zip"
-                
-                zip_data = create_zip_package(tables_to_export, filtro_str, excel_filename=nome_interno_excel)
-                
-                st.download_button(
-                    label="Clique para baixar", 
-                    data=zip_data, 
-                    file_name=zip_filename, 
-                    mime="application/zip", 
-                    on_click=lambda: st.session_state.update(show_top10_export=False), 
-                    type="secondary"
-                )
-            except Exception as e:
-                st.error(f"Erro ao gerar ZIP: {e}")
-
-            if st.button("Cancelar", key="cancel_export", type="secondary"):
-                st.session_state.show_top10_export = False
-                st.rerun()
+            filtro_str = get_filter_string()
+            filtro_str += f" | Visão Top 10: {emis_sel} | Critério: {criterio} | Ano Base: {ano_sel}"
+            
+            # NOME DO ARQUIVO EXCEL INTERNO
+            nome_interno_excel = "Dashboard_Top10.xlsx"
+            zip_filename = f"Dashboard_Top10.zip"
+            
+            export_panel("top10", tables_to_export, filtro_str, nome_interno_excel, zip_filename, "show_top10_export")
         export_dialog()
\ No newline at end of file
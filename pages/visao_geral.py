@@ -7,7 +7,8 @@ import pandas as pd
 import plotly.graph_objects as go 
 from plotly.subplots import make_subplots
 import numpy as np
-from utils.export import create_zip_package 
+from utils.export_jobs import export_panel 
+from analytics.visao_geral import compute
 
 # ==================== MAPA DE CORES ====================
 COLOR_MAP = {
@@ -82,21 +83,9 @@ def get_pretty_ticks(max_val, num_ticks=5):
     y_axis_cap = max_y_rounded * 1.05
     return tick_values, tick_texts, y_axis_cap
 
-def get_top_client_info(df_base):
-    """Retorna nome completo, valor e nome abreviado do maior cliente."""
-    if df_base.empty:
-        return "—", 0.0, "—"
-    
-    top_series = df_base.groupby("cliente")["faturamento"].sum().sort_values(ascending=False)
-    if top_series.empty:
-        return "—", 0.0, "—"
-        
-    nome_full = top_series.index[0]
-    valor = top_series.iloc[0]
-    
-    # Trunca nome muito longo para exibição no card (visual), mas mantém full para tooltip
-    nome_display = nome_full[:18] + "..." if len(nome_full) > 18 else nome_full
-    return nome_full, valor, nome_display
+def short_client_name(nome_full):
+    """Trunca nome muito longo para exibição no card (visual); o nome completo vai no tooltip."""
+    return nome_full[:18] + "..." if len(nome_full) > 18 else nome_full
 
 def render(df, mes_ini, mes_fim, show_labels, show_total, ultima_atualizacao=None):
     # Aplica CSS para centralizar os cards e aproximar título/valor
@@ -116,49 +105,20 @@ def render(df, mes_ini, mes_fim, show_labels, show_total, ultima_atualizacao=Non
     figs_share_dict = {}
     
     # ==================== PREPARAÇÃO DE DADOS ====================
-    df = df.rename(columns={c: c.lower() for c in df.columns})
-
-    if "emissora" in df.columns:
-        df["emissora"] = df["emissora"].astype(str).str.strip().str.title()
-        df["emissora"] = df["emissora"].replace({
-            "Thathi": "Thathi Tv",
-            "Th+": "Th+ Prime" 
-        })
-
-    if "insercoes" not in df.columns:
-        df["insercoes"] = 0.0
-
-    if "meslabel" not in df.columns:
-        if "ano" in df.columns and "mes" in df.columns:
-            df["meslabel"] = pd.to_datetime(dict(
-                year=df["ano"].astype(int),
-                month=df["mes"].astype(int),
-                day=1
-            )).dt.strftime("%b/%y")
-        else:
-            df["meslabel"] = ""
-
-    anos = sorted(df["ano"].dropna().unique())
-    if not anos:
+    # Todos os números vêm de analytics.visao_geral; aqui só formatação e desenho
+    dados = compute(df, mes_ini, mes_fim)
+    if dados is None:
         st.info("Sem anos válidos na base.")
         return
-    if len(anos) >= 2:
-        ano_base, ano_comp = anos[-2], anos[-1]
-    else:
-        ano_base = ano_comp = anos[-1]
+    ano_base, ano_comp = dados["ano_base"], dados["ano_comp"]
+    kpis = dados["kpis"]
 
     ano_base_str = str(ano_base)[-2:]
     ano_comp_str = str(ano_comp)[-2:]
-    
-    base_periodo = df[df["mes"].between(mes_ini, mes_fim)]
-    baseA = base_periodo[base_periodo["ano"] == ano_base]
-    baseB = base_periodo[base_periodo["ano"] == ano_comp]
 
     # ==================== KPI LINHA 1: TOTAIS (MACRO) ====================
-    totalA = float(baseA["faturamento"].sum()) if not baseA.empty else 0.0
-    totalB = float(baseB["faturamento"].sum()) if not baseB.empty else 0.0
-    delta_abs = totalB - totalA
-    delta_pct = (delta_abs / totalA * 100) if totalA > 0.0 else 0
+    totalA, totalB = kpis["total_base"], kpis["total_comp"]
+    delta_abs, delta_pct = kpis["delta_abs"], kpis["delta_pct"]
 
     c1, c2, c3, c4 = st.columns(4)
     c1.metric(f"Total {ano_base}", format_pt_br_abrev(totalA))
@@ -167,18 +127,12 @@ def render(df, mes_ini, mes_fim, show_labels, show_total, ultima_atualizacao=Non
     c4.metric(f"Δ % ({ano_comp_str} vs {ano_base_str})", f"{delta_pct:.2f}%" if totalA > 0 else "—")
 
     # ==================== KPI LINHA 2: TICKET MÉDIO E MAIOR CLIENTE ====================
-    # Ticket Médio Base A (Menor Ano)
-    cliA = baseA["cliente"].nunique()
-    tmA = totalA / cliA if cliA > 0 else 0.0
-    
-    # Ticket Médio Base B (Maior Ano)
-    cliB = baseB["cliente"].nunique()
-    tmB = totalB / cliB if cliB > 0 else 0.0
+    tmA, tmB = kpis["ticket_base"], kpis["ticket_comp"]
 
-    # Maior Cliente Base A
-    full_A, val_A, disp_A = get_top_client_info(baseA)
-    # Maior Cliente Base B
-    full_B, val_B, disp_B = get_top_client_info(baseB)
+    # Maior cliente de cada ano (nome completo no tooltip, abreviado no card)
+    full_A, val_A = kpis["maior_cliente_base"]
+    full_B, val_B = kpis["maior_cliente_comp"]
+    disp_A, disp_B = short_client_name(full_A), short_client_name(full_B)
 
     st.markdown("<div style='height: 25px;'></div>", unsafe_allow_html=True) 
     
@@ -208,7 +162,7 @@ def render(df, mes_ini, mes_fim, show_labels, show_total, ultima_atualizacao=Non
     # ==================== GRÁFICO 1: EVOLUÇÃO MENSAL ====================
     st.markdown("<p class='custom-chart-title'>1. Evolução Mensal de Faturamento e Inserções</p>", unsafe_allow_html=True)
     
-    evol_raw = base_periodo.groupby(["ano", "meslabel", "mes"], as_index=False)[["faturamento", "insercoes"]].sum().sort_values(["ano", "mes"])
+    evol_raw = dados["evolucao"]
     
     if not evol_raw.empty:
         fig_evol = make_subplots(specs=[[{"secondary_y": True}]])
@@ -297,12 +251,11 @@ def render(df, mes_ini, mes_fim, show_labels, show_total, ultima_atualizacao=Non
     # ==================== GRÁFICO 2: FATURAMENTO POR EMISSORA ====================
     st.markdown("<p class='custom-chart-title'>2. Faturamento por Emissora (Ano a Ano)</p>", unsafe_allow_html=True)
     
-    base_emis_raw = base_periodo.groupby(["emissora", "ano"], as_index=False)["faturamento"].sum()
+    base_emis_raw = dados["emissora"].copy()
     
     if not base_emis_raw.empty:
-        # Ordenação e concatenação
-        base_emis_raw = base_emis_raw.sort_values(["emissora", "ano"])
-        base_emis_raw["label_x"] = base_emis_raw["emissora"] + " " + base_emis_raw["ano"].astype(str)
+        # Rótulo do eixo: emissora + ano
+        base_emis_raw["label_x"] = base_emis_raw["emissora"].astype(str) + " " + base_emis_raw["ano"].astype(str)
         
         fig_emis = px.bar(
             base_emis_raw, 
@@ -341,12 +294,12 @@ def render(df, mes_ini, mes_fim, show_labels, show_total, ultima_atualizacao=Non
     # ==================== GRÁFICO 3: SHARE DE MERCADO ====================
     st.markdown("<p class='custom-chart-title'>3. Share Faturamento (%)</p>", unsafe_allow_html=True)
     
-    anos_presentes = sorted(base_periodo["ano"].dropna().unique())
+    anos_presentes = list(dados["share"])
     if anos_presentes:
         cols_share = st.columns(len(anos_presentes))
         
         for idx, ano_share in enumerate(anos_presentes):
-            df_share_ano = base_periodo[base_periodo["ano"] == ano_share].groupby("emissora", as_index=False)["faturamento"].sum()
+            df_share_ano = dados["share"][ano_share]
             
             if not df_share_ano.empty:
                 fig_share = px.pie(
@@ -391,12 +344,10 @@ def render(df, mes_ini, mes_fim, show_labels, show_total, ultima_atualizacao=Non
     # ==================== GRÁFICO 4: FATURAMENTO POR EXECUTIVO ====================
     st.markdown("<p class='custom-chart-title'>4. Faturamento por Executivo (Ano a Ano)</p>", unsafe_allow_html=True)
     
-    base_exec_raw = base_periodo.groupby(["executivo", "ano"], as_index=False)["faturamento"].sum()
+    base_exec_raw = dados["executivo"].copy()
     
     if not base_exec_raw.empty:
-        rank_exec = base_exec_raw.groupby("executivo")["faturamento"].sum().sort_values(ascending=False).index.tolist()
-        base_exec_raw["executivo"] = pd.Categorical(base_exec_raw["executivo"], categories=rank_exec, ordered=True)
-        base_exec_raw = base_exec_raw.sort_values(["executivo", "ano"])
+        # Já ordenado pelo ranking de faturamento do executivo (analytics.visao_geral)
         base_exec_raw["label_x"] = base_exec_raw["executivo"].astype(str) + " " + base_exec_raw["ano"].astype(str)
         
         fig_exec = px.bar(
@@ -507,18 +458,10 @@ def render(df, mes_ini, mes_fim, show_labels, show_total, ultima_atualizacao=Non
                 st.error("Selecione pelo menos um item.")
                 return
 
-            try:
-                filtro_str = get_filter_string()
-                # NOME DO ARQUIVO EXCEL INTERNO
-                nome_interno_excel = "Dashboard_Visao_Geral.xlsx"
-                
-                zip_data = create_zip_package(tables_to_export, filtro_str, excel_filename=nome_interno_excel) 
-                
-                st.download_button("Clique para baixar o pacote", data=zip_data, file_name="Dashboard_VisaoGeral.zip", mime="application/zip", on_click=lambda: st.session_state.update(show_visao_geral_export=False), type="secondary")
-            except Exception as e:
-                st.error(f"Erro ao gerar ZIP: {e}")
+            filtro_str = get_filter_string()
+            # NOME DO ARQUIVO EXCEL INTERNO
+            nome_interno_excel = "Dashboard_Visao_Geral.xlsx"
 
-            if st.button("Cancelar", key="cancel_export", type="secondary"):
-                st.session_state.show_visao_geral_export = False
-                st.rerun()
+            export_panel("visao_geral", tables_to_export, filtro_str, nome_interno_excel, "Dashboard_VisaoGeral.zip",
+                         "show_visao_geral_export", label="Clique para baixar o pacote")
         export_dialog()
\ No newline at end of file
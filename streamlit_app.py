@@ -20,9 +20,8 @@ except locale.Error:
         print("AVISO: Não foi possível definir o locale para pt-BR.")
 
 # Importações dos módulos
-from utils.loaders import load_main_base
+from utils.loaders import load_main_base, ingest_upload
 from utils.filters import aplicar_filtros
-from utils.format import normalize_dataframe
 
 # Importação das páginas
 from pages import inicio, visao_geral, clientes_faturamento, perdas_ganhos, cruzamentos_intersecoes, top10, relatorio_abc, eficiencia
@@ -169,24 +168,21 @@ df, ultima_atualizacao = load_main_base()
 
 if df is None or df.empty:
     st.warning("⚠️ Nenhuma base de dados encontrada.")
-    st.info("Por favor, carregue a planilha de vendas (.xlsx) para iniciar.")
+    st.info("Por favor, carregue a base de vendas (.xlsx, .csv, .parquet ou .feather) para iniciar.")
     
     uploaded_file = st.file_uploader(
-        "Selecione o arquivo Excel (.xlsx)", 
-        type=["xlsx"],
+        "Selecione o arquivo (.xlsx, .csv, .parquet, .feather/.arrow)", 
+        type=["xlsx", "csv", "parquet", "feather", "arrow"],
         accept_multiple_files=False
     )
     
     if uploaded_file is not None:
         try:
-            base_dir = os.path.dirname(__file__)
-            data_dir = os.path.join(base_dir, "data")
-            if not os.path.exists(data_dir):
-                os.makedirs(data_dir)
-            
-            save_path = os.path.join(data_dir, "temp_data_uploaded.xlsx")
-            with open(save_path, "wb") as f:
-                f.write(uploaded_file.getbuffer())
+            # Lê direto da memória; a cópia em /data é gravada em segundo plano
+            df_upload, _ = ingest_upload(uploaded_file.getvalue(), uploaded_file.name)
+            if df_upload is None:
+                st.warning("⚠️ Base encontrada, mas sem dados válidos.")
+                st.stop()
 
             st.success("✅ Arquivo carregado. O dashboard será iniciado.")
             st.rerun()
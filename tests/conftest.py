@@ -0,0 +1,11 @@
+# tests/conftest.py
+# Raiz do repositório no sys.path (os módulos são importados como utils.*, analytics.*).
+import os
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if RAIZ not in sys.path:
+    sys.path.insert(0, RAIZ)
+
+# Planilha de exemplo que acompanha o repositório
+PLANILHA_EXEMPLO = os.path.join(RAIZ, "data", "temp_data_uploaded.xlsx")
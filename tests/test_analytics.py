@@ -0,0 +1,344 @@
+# tests/test_analytics.py
+# Números das páginas (analytics/*) sobre uma base pequena e fixa, conferidos à mão.
+# Período padrão dos testes: meses 1..6 (o lançamento de julho/2024 fica de fora).
+# Paridade: as páginas que agregam o cubo (utils.cube) devem dar os mesmos números que os
+# mesmos cálculos feitos direto nas linhas da base.
+import numpy as np
+import pandas as pd
+import pytest
+
+from analytics import clientes_faturamento, cruzamentos_intersecoes, eficiencia, perdas_ganhos, relatorio_abc, top10, visao_geral
+from analytics.base import period
+
+LINHAS = [
+    # ano, mes, emissora, executivo, cliente, faturamento, inserções
+    (2024, 1, "Difusora", "Ana", "Alfa", 100.0, 10.0),
+    (2024, 2, "Novabrasil", "Ana", "Alfa", 50.0, 5.0),
+    (2024, 3, "Difusora", "Bruno", "Beta", 200.0, 20.0),
+    (2024, 7, "Novabrasil", "Bruno", "Gama", 300.0, 30.0),
+    (2025, 1, "Difusora", "Ana", "Alfa", 150.0, 15.0),
+    (2025, 2, "Th+ Prime", "Bruno", "Delta", 80.0, 8.0),
+    (2025, 4, "Novabrasil", "Ana", "Beta", 120.0, 12.0),
+    (2025, 5, "TH+", "Ana", "Alfa", 20.0, 2.0),
+]
+
+def _base(linhas=LINHAS):
+    df = pd.DataFrame(linhas, columns=["ano", "mes", "emissora", "executivo", "cliente", "faturamento", "insercoes"])
+    df = df.astype({"ano": "int16", "mes": "int16", "emissora": "category", "executivo": "category", "cliente": "category"})
+    df["meslabel"] = df["mes"].astype(str).str.zfill(2) + "/" + df["ano"].astype(str)
+    return df
+
+@pytest.fixture
+def base():
+    return _base()
+
+@pytest.fixture
+def um_ano():
+    return _base([linha for linha in LINHAS if linha[0] == 2025])
+
+# ==================== VISÃO GERAL ====================
+
+def test_visao_geral_compute(base):
+    r = visao_geral.compute(base, 1, 6)
+    assert (r["ano_base"], r["ano_comp"]) == (2024, 2025)
+
+    k = r["kpis"]
+    assert (k["total_base"], k["total_comp"], k["delta_abs"]) == (350.0, 370.0, 20.0)
+    assert k["delta_pct"] == pytest.approx(20 / 350 * 100)
+    assert k["ticket_base"] == pytest.approx(175.0)
+    assert k["ticket_comp"] == pytest.approx(370 / 3)
+    assert k["maior_cliente_base"] == ("Beta", 200.0)
+    assert k["maior_cliente_comp"] == ("Alfa", 170.0)
+
+    assert r["evolucao"][["ano", "mes", "faturamento"]].values.tolist() == [
+        [2024, 1, 100], [2024, 2, 50], [2024, 3, 200],
+        [2025, 1, 150], [2025, 2, 80], [2025, 4, 120], [2025, 5, 20],
+    ]
+    # 'TH+' e 'Th+ Prime' aparecem juntas com o nome canônico
+    assert r["emissora"][["emissora", "ano", "faturamento"]].values.tolist() == [
+        ["Difusora", 2024, 300.0], ["Difusora", 2025, 150.0],
+        ["Novabrasil", 2024, 50.0], ["Novabrasil", 2025, 120.0],
+        ["Th+ Prime", 2025, 100.0],
+    ]
+    assert sorted(r["share"]) == [2024, 2025]
+    assert r["share"][2025][["emissora", "faturamento"]].values.tolist() == [
+        ["Difusora", 150.0], ["Novabrasil", 120.0], ["Th+ Prime", 100.0],
+    ]
+    assert r["executivo"][["executivo", "ano", "faturamento"]].astype(object).values.tolist() == [
+        ["Ana", 2024, 150.0], ["Ana", 2025, 290.0], ["Bruno", 2024, 200.0], ["Bruno", 2025, 80.0],
+    ]
+
+def test_visao_geral_periodo_vazio(base):
+    r = visao_geral.compute(base, 8, 9)
+    k = r["kpis"]
+    assert (k["total_base"], k["total_comp"], k["delta_abs"], k["delta_pct"]) == (0.0, 0.0, 0.0, 0)
+    assert (k["ticket_base"], k["ticket_comp"]) == (0.0, 0.0)
+    assert k["maior_cliente_base"] == ("—", 0.0)
+    assert r["evolucao"].empty and r["emissora"].empty and r["executivo"].empty
+    assert r["share"] == {}
+
+def test_visao_geral_um_ano(um_ano):
+    r = visao_geral.compute(um_ano, 1, 6)
+    assert (r["ano_base"], r["ano_comp"]) == (2025, 2025)
+    k = r["kpis"]
+    assert k["total_base"] == k["total_comp"] == 370.0
+    assert (k["delta_abs"], k["delta_pct"]) == (0.0, 0.0)
+
+def test_visao_geral_sem_anos():
+    assert visao_geral.compute(_base([]), 1, 12) is None
+
+# ==================== PERDAS & GANHOS ====================
+
+def test_variation_table(base):
+    tabela, total = perdas_ganhos.variation_table(period(base, 1, 6), "cliente", "Cliente", 2024, 2025)
+    assert tabela["Cliente"].tolist() == ["Beta", "Alfa", "Delta"]
+    assert tabela[["Fat_2024", "Fat_2025", "# Fat", "Ins_2024", "Ins_2025", "Δ Ins"]].values.tolist() == [
+        [200.0, 120.0, -80.0, 20.0, 12.0, -8.0],
+        [150.0, 170.0, 20.0, 15.0, 17.0, 2.0],
+        [0.0, 80.0, 80.0, 0.0, 8.0, 8.0],
+    ]
+    np.testing.assert_allclose(tabela["Δ%"], [-40.0, 20 / 150 * 100, np.nan])
+
+    linha = total.iloc[0]
+    assert linha["Cliente"] == "Totalizador"
+    assert (linha["Fat_2024"], linha["Fat_2025"], linha["# Fat"]) == (350.0, 370.0, 20.0)
+    assert linha["Δ%"] == pytest.approx(20 / 350 * 100)
+    assert (linha["Ins_2024"], linha["Ins_2025"], linha["Δ Ins"]) == (35.0, 37.0, 2.0)
+
+def test_variation_table_periodo_vazio(base):
+    tabela, total = perdas_ganhos.variation_table(period(base, 8, 9), "cliente", "Cliente", 2024, 2025)
+    assert tabela.empty and total.empty
+
+def test_variation_table_um_ano(um_ano):
+    tabela, total = perdas_ganhos.variation_table(period(um_ano, 1, 6), "emissora", "Emissora", 2025, 2025)
+    assert sorted(tabela["Emissora"]) == ["Difusora", "Novabrasil", "TH+", "Th+ Prime"]
+    assert (tabela["# Fat"] == 0).all() and (tabela["Δ Ins"] == 0).all()
+    assert (tabela["Δ%"] == 0).all()
+    assert total.iloc[0]["Fat_2025"] == 370.0 and total.iloc[0]["# Fat"] == 0.0
+
+def test_perdas_ganhos_compute(base):
+    r = perdas_ganhos.compute(base, 1, 6)
+    assert (r["perdas"], r["ganhos"]) == ([], ["Delta"])
+    assert r["kpis"]["val_ganhos"] == 80.0
+    assert r["kpis"]["saldo_clientes"] == 1
+
+# ==================== CRUZAMENTOS & INTERSEÇÕES ====================
+
+EMISSORAS = ["Difusora", "Novabrasil", "TH+", "Th+ Prime"]
+
+@pytest.mark.parametrize("metrica, esperado", [
+    ("Clientes", [[2, 2, 1, 0], [2, 2, 1, 0], [1, 1, 1, 0], [0, 0, 0, 1]]),
+    ("Faturamento", [[450, 170, 20, 0], [170, 170, 20, 0], [20, 20, 20, 0], [0, 0, 0, 80]]),
+    ("Inserções", [[45, 17, 2, 0], [17, 17, 2, 0], [2, 2, 2, 0], [0, 0, 0, 8]]),
+])
+def test_intersection_matrix(base, metrica, esperado):
+    agg, presenca = cruzamentos_intersecoes._presence(period(base, 1, 6))
+    matriz = cruzamentos_intersecoes.intersection_matrix(agg, presenca, metrica)
+    assert matriz.index.tolist() == matriz.columns.tolist() == EMISSORAS
+    np.testing.assert_allclose(matriz.to_numpy(), esperado)
+
+def test_intersection_matrix_uma_emissora(base):
+    so_difusora = base[base["emissora"] == "Difusora"]
+    agg, presenca = cruzamentos_intersecoes._presence(period(so_difusora, 1, 6))
+    assert cruzamentos_intersecoes.intersection_matrix(agg, presenca, "Clientes") is None
+
+def test_intersection_matrix_um_ano(um_ano):
+    agg, presenca = cruzamentos_intersecoes._presence(period(um_ano, 1, 6))
+    matriz = cruzamentos_intersecoes.intersection_matrix(agg, presenca, "Faturamento")
+    # 2025: Alfa em Difusora (150) e TH+ (20); Beta só na Novabrasil; Delta só na Th+ Prime
+    np.testing.assert_allclose(matriz.to_numpy(), [[150, 0, 20, 0], [0, 120, 0, 0], [20, 0, 20, 0], [0, 0, 0, 80]])
+
+def test_cruzamentos_periodo_vazio(base):
+    assert cruzamentos_intersecoes.compute(base, 8, 9) is None
+
+# ==================== CLIENTES & FATURAMENTO ====================
+
+def _linhas_clientes_faturamento(df, mes_ini, mes_fim, ano_base, ano_comp):
+    """Tabelas da página calculadas nas linhas da base (sem o cubo)."""
+    linhas = period(df, mes_ini, mes_fim)
+    cf = clientes_faturamento
+    return {
+        "clientes_emissora": cf.clients_by_emissora(linhas, ano_base, ano_comp),
+        "faturamento_emissora": cf.revenue_by(linhas, "emissora", ano_base, ano_comp),
+        "faturamento_executivo": cf.revenue_by(linhas, "executivo", ano_base, ano_comp),
+        "medias_emissora": cf.averages_by_emissora(linhas),
+        "faturamento_total_emissora": cf.revenue_total_by_emissora(linhas),
+        "mes_a_mes": cf.month_comparison(linhas, ano_base, ano_comp),
+        "relacao_clientes": cf.client_relation(linhas, ano_base, ano_comp),
+    }
+
+@pytest.mark.parametrize("fixture, mes_ini, mes_fim", [("base", 1, 6), ("base", 1, 12), ("um_ano", 1, 6)])
+def test_clientes_faturamento_paridade(request, fixture, mes_ini, mes_fim):
+    df = request.getfixturevalue(fixture)
+    r = clientes_faturamento.compute(df, mes_ini, mes_fim)
+    esperado = _linhas_clientes_faturamento(df, mes_ini, mes_fim, r["ano_base"], r["ano_comp"])
+    for nome, (tabela, total) in esperado.items():
+        obtido_tabela, obtido_total = r[nome]
+        pd.testing.assert_frame_equal(obtido_tabela.reset_index(drop=True), tabela.reset_index(drop=True),
+                                      check_dtype=False, check_categorical=False)
+        pd.testing.assert_frame_equal(obtido_total, total, check_dtype=False)
+
+def test_clientes_faturamento_compute(base):
+    r = clientes_faturamento.compute(base, 1, 6)
+    tabela, total = r["clientes_emissora"]
+    assert tabela[["emissora", 2024, 2025, "Δ"]].values.tolist() == [
+        ["Difusora", 2, 1, -1], ["Novabrasil", 1, 1, 0], ["TH+", 0, 1, 1], ["Th+ Prime", 0, 1, 1],
+    ]
+    assert (total.iloc[0][2024], total.iloc[0][2025]) == (3, 4)
+
+    tabela, total = r["faturamento_executivo"]
+    assert tabela[["executivo", 2024, 2025, "Δ", "Ins_2024", "Ins_2025"]].values.tolist() == [
+        ["Ana", 150.0, 290.0, 140.0, 15.0, 29.0], ["Bruno", 200.0, 80.0, -120.0, 20.0, 8.0],
+    ]
+    assert total.iloc[0]["Δ%"] == pytest.approx(20 / 350 * 100)
+
+    # Um cliente em várias emissoras conta uma vez no total de clientes distintos
+    tabela, total = r["medias_emissora"]
+    assert tabela["Clientes"].tolist() == [2, 2, 1, 1]
+    assert (total.iloc[0]["Clientes"], total.iloc[0]["Média Invest./Cliente"]) == (3, 240.0)
+
+    tabela, total = r["mes_a_mes"]
+    assert tabela["mes_nome"].tolist() == ["Jan", "Fev", "Mar", "Abr", "Mai"]
+    assert total[["Fat. 2024", "Fat. 2025"]].values.tolist() == [[350.0, 370.0]]
+
+    tabela, total = r["relacao_clientes"]
+    assert tabela["Total Fat"].tolist() == [320.0, 320.0, 80.0]
+    assert tabela.iloc[-1]["cliente"] == "Delta"
+    assert tabela["Share %"].sum() == pytest.approx(100.0)
+
+def test_clientes_faturamento_periodo_vazio(base):
+    r = clientes_faturamento.compute(base, 8, 9)
+    assert r["mes_a_mes"] is None
+    for nome in ["clientes_emissora", "faturamento_emissora", "medias_emissora", "relacao_clientes"]:
+        tabela, total = r[nome]
+        assert tabela.empty and total.empty
+
+def test_clientes_faturamento_um_ano(um_ano):
+    r = clientes_faturamento.compute(um_ano, 1, 6)
+    tabela, total = r["mes_a_mes"]
+    assert list(tabela.columns) == ["mes_nome", "Fat. 2025", "Ins. 2025", "Custo 2025"]
+    tabela, _ = r["relacao_clientes"]
+    assert [c for c in tabela.columns if c.startswith(("Fat_", "Ins_"))] == ["Fat_2025", "Ins_2025"]
+
+def test_clientes_faturamento_sem_anos():
+    assert clientes_faturamento.compute(_base([]), 1, 12) is None
+
+# ==================== TOP 10 ====================
+
+def _linhas_top10(df, mes_ini, mes_fim, emissora=None, ano=None):
+    linhas = period(df, mes_ini, mes_fim)
+    if emissora is not None:
+        linhas = linhas[linhas["emissora"] == emissora]
+    if ano is not None:
+        linhas = linhas[linhas["ano"] == ano]
+    tabela = linhas.groupby("cliente", as_index=False, observed=True)[["faturamento", "insercoes"]].sum()
+    return tabela.assign(custo_unitario=tabela["faturamento"] / tabela["insercoes"])
+
+@pytest.mark.parametrize("criterio", list(top10.CRITERIOS))
+@pytest.mark.parametrize("emissora, ano", [(None, None), ("Difusora", None), (None, 2024), ("Novabrasil", 2025)])
+def test_top10_paridade(base, criterio, emissora, ano):
+    tabela, total = top10.compute(base, 1, 6, emissora=emissora, ano=ano, criterio=criterio)
+    esperado = _linhas_top10(base, 1, 6, emissora, ano)
+    # Empates (Alfa e Beta somam 320 no consolidado) podem sair em qualquer ordem
+    pd.testing.assert_frame_equal(tabela.sort_values("cliente").reset_index(drop=True), esperado,
+                                  check_dtype=False, check_categorical=False)
+    assert total.iloc[0]["faturamento"] == esperado["faturamento"].sum()
+    assert total.iloc[0]["insercoes"] == esperado["insercoes"].sum()
+
+def test_top10_ordem_e_limite(base):
+    tabela, total = top10.compute(base, 1, 6, ano=2025, criterio="Faturamento", n=2)
+    assert tabela["cliente"].tolist() == ["Alfa", "Beta"]
+    assert total.iloc[0]["faturamento"] == 290.0
+    assert top10.selector_options(base, 1, 6) == (["Difusora", "Novabrasil", "TH+", "Th+ Prime"], [2024, 2025])
+
+def test_top10_periodo_vazio(base):
+    tabela, total = top10.compute(base, 8, 9)
+    assert tabela.empty and total.empty
+
+# ==================== RELATÓRIO ABC ====================
+
+@pytest.mark.parametrize("criterio, coluna", [("Faturamento", "faturamento"), ("Inserções", "insercoes")])
+def test_relatorio_abc_paridade(um_ano, criterio, coluna):
+    r = relatorio_abc.compute(um_ano, 1, 6, criterio=criterio)
+    esperado = period(um_ano, 1, 6).groupby("cliente", as_index=False, observed=True)[["faturamento", "insercoes"]].sum()
+    esperado = esperado.sort_values(coluna, ascending=False).reset_index(drop=True)
+    pd.testing.assert_frame_equal(r["tabela"][["cliente", "faturamento", "insercoes"]], esperado,
+                                  check_dtype=False, check_categorical=False)
+    np.testing.assert_allclose(r["tabela"]["acumulado"], (esperado[coluna] / esperado[coluna].sum()).cumsum())
+
+def test_relatorio_abc_compute(um_ano):
+    # 2025: Alfa 170, Beta 120, Delta 80 (total 370)
+    r = relatorio_abc.compute(um_ano, 1, 6)
+    assert r["tabela"]["cliente"].tolist() == ["Alfa", "Beta", "Delta"]
+    np.testing.assert_allclose(r["tabela"]["acumulado"], [170 / 370, 290 / 370, 1.0])
+    assert r["tabela"]["classe"].tolist() == ["A", "A", "C"]
+    assert r["resumo"].values.tolist() == [[2, 290.0, 29.0], [0, 0.0, 0.0], [1, 80.0, 8.0]]
+
+def test_relatorio_abc_base(base):
+    r = relatorio_abc.compute(base, 1, 6)
+    assert r["tabela"]["faturamento"].tolist() == [320.0, 320.0, 80.0]
+    assert r["resumo"]["Qtd_Clientes"].tolist() == [1, 1, 1]
+
+def test_relatorio_abc_periodo_vazio(base):
+    assert relatorio_abc.compute(base, 8, 9) is None
+
+# ==================== EFICIÊNCIA ====================
+
+# Linhas sem faturamento positivo (zerada e estorno) ficam fora dos KPIs e da matriz;
+# o resumo anual por emissora soma todas as linhas do período
+LINHAS_EFICIENCIA = LINHAS + [
+    (2025, 3, "Difusora", "Bruno", "Gama", 0.0, 5.0),
+    (2024, 2, "Difusora", "Ana", "Beta", -30.0, 3.0),
+    (2025, 4, "Novabrasil", "Bruno", "Gama", 60.0, 3.0),
+]
+
+@pytest.fixture
+def base_eficiencia():
+    return _base(LINHAS_EFICIENCIA)
+
+def test_eficiencia_paridade(base_eficiencia):
+    r = eficiencia.compute(base_eficiencia, 1, 6)
+    linhas = period(base_eficiencia, 1, 6)
+    positivas = linhas[linhas["faturamento"] > 0]
+    tabela, total = eficiencia.annual_summary(linhas, r["anos_resumo"])
+    # Yields empatados (10 por inserção) podem sair em qualquer ordem
+    ordenar = lambda t: t.sort_values("emissora").reset_index(drop=True)
+    pd.testing.assert_frame_equal(ordenar(r["resumo_emissoras"][0]), ordenar(tabela),
+                                  check_dtype=False, check_categorical=False)
+    pd.testing.assert_frame_equal(r["resumo_emissoras"][1], total, check_dtype=False)
+
+    k = r["kpis"]
+    assert k["total_ins"] == positivas["insercoes"].sum()
+    assert k["custo_medio_global"] == pytest.approx(positivas["faturamento"].sum() / positivas["insercoes"].sum())
+    assert k["media_ins_cli"] == pytest.approx(positivas["insercoes"].sum() / positivas["cliente"].nunique())
+
+    for ano in [None, 2024, 2025]:
+        matriz = eficiencia.efficiency_matrix(base_eficiencia, 1, 6, ano=ano)
+        recorte = positivas if ano is None else positivas[positivas["ano"] == ano]
+        pontos = recorte.groupby(["cliente", "emissora"], as_index=False, observed=True).agg(
+            Faturamento=("faturamento", "sum"), Insercoes=("insercoes", "sum"))
+        pontos["Custo_Medio"] = pontos["Faturamento"] / pontos["Insercoes"]
+        pd.testing.assert_frame_equal(matriz["pontos"].reset_index(drop=True), pontos,
+                                      check_dtype=False, check_categorical=False)
+        assert matriz["mediana_custo"] == pontos["Custo_Medio"].median()
+
+def test_eficiencia_compute(base_eficiencia):
+    r = eficiencia.compute(base_eficiencia, 1, 6)
+    assert r["anos_resumo"] == [2024, 2025]
+    # Positivas: 720 de faturamento em 72 inserções + Gama (60 em 3) na Novabrasil
+    assert r["kpis"]["total_ins"] == 75.0
+    assert r["kpis"]["custo_medio_global"] == pytest.approx(780 / 75)
+    assert r["kpis"]["media_ins_cli"] == pytest.approx(75 / 4)
+    tabela, total = r["resumo_emissoras"]
+    assert tabela["emissora"].tolist()[0] == "Novabrasil"
+    assert tabela.set_index("emissora").loc["Novabrasil", "Yield_2025"] == pytest.approx(180 / 15)
+    assert tabela.set_index("emissora").loc["Difusora", "Faturamento_2024"] == 270.0
+    assert total.iloc[0]["Faturamento_2025"] == 430.0
+
+def test_eficiencia_periodo_vazio(base):
+    assert eficiencia.compute(base, 8, 9) is None
+
+def test_eficiencia_um_ano(um_ano):
+    r = eficiencia.compute(um_ano, 1, 6)
+    assert (r["ano_base"], r["ano_comp"], r["anos_resumo"]) == (2025, 2025, [2025])
+    assert list(r["resumo_emissoras"][1].columns) == ["emissora", "Faturamento_2025", "Insercoes_2025", "Yield_2025"]
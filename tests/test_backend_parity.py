@@ -0,0 +1,82 @@
+# tests/test_backend_parity.py
+# Paridade dos motores de agregação (utils.backend): o Arrow deve devolver as mesmas tabelas
+# que o groupby do pandas, na base publicada, nos recortes (filtros globais, período), no
+# cubo e em DataFrames avulsos. Somas podem diferir no último dígito (o Arrow soma em
+# paralelo), por isso a tolerância relativa.
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from analytics.base import period
+from utils.backend import _snapshots, arrow_snapshot, group_sum, pivot_by_year, pivot_nunique_by_year
+from utils.cube import cube_for
+from utils.dataset import dataset_artifact, publish_dataset
+from utils.filters import build_filter_index, filter_frame
+from utils.format import normalize_frame
+from utils.synthetic import gerar_base_bruta
+
+RTOL = 1e-9
+
+CONSULTAS = {
+    "cliente x ano (faturamento)": lambda df, b: pivot_by_year(df, "cliente", "faturamento", backend=b),
+    "emissora x ano (inserções)": lambda df, b: pivot_by_year(df, "emissora", "insercoes", backend=b),
+    "executivo x ano (faturamento)": lambda df, b: pivot_by_year(df, "executivo", "faturamento", backend=b),
+    "ano x mês (faturamento, inserções)": lambda df, b: group_sum(df, ["ano", "mes"], ["faturamento", "insercoes"], backend=b),
+    "clientes por emissora x ano": lambda df, b: pivot_nunique_by_year(df, "emissora", "cliente", backend=b),
+}
+
+@pytest.fixture(scope="module", autouse=True)
+def motor_arrow():
+    # Os recortes só são registrados para o snapshot da origem com o motor Arrow configurado
+    anterior = os.environ.get("ANALYTICS_BACKEND")
+    os.environ["ANALYTICS_BACKEND"] = "arrow"
+    yield
+    if anterior is None:
+        os.environ.pop("ANALYTICS_BACKEND", None)
+    else:
+        os.environ["ANALYTICS_BACKEND"] = anterior
+
+@pytest.fixture(scope="module")
+def base():
+    df = normalize_frame(gerar_base_bruta(20_000, clientes=300, executivos=8))
+    publish_dataset(df, "teste")
+    return df
+
+def _selecao(base):
+    emissoras = list(base["emissora"].cat.categories[:2])
+    executivos = list(base["executivo"].cat.categories[::2])
+    return {"emissora": emissoras, "executivo": executivos}
+
+def _recortes(base):
+    filtrado = filter_frame(base, dataset_artifact(base, "indice", build_filter_index), _selecao(base))
+    return {
+        "base publicada": base,
+        "período da base": period(base, 3, 8),
+        "recorte de filtros": filtrado,
+        "período do recorte": period(filtrado, 2, 11),
+        "período vazio": period(base, 13, 14),
+        "cubo do recorte": cube_for(filtrado),
+        "período do cubo": period(cube_for(filtrado), 1, 6),
+        "avulso": period(base, 3, 8).reset_index(drop=True),
+    }
+
+@pytest.mark.parametrize("consulta", list(CONSULTAS))
+@pytest.mark.parametrize("recorte", ["base publicada", "período da base", "recorte de filtros", "período do recorte",
+                                     "período vazio", "cubo do recorte", "período do cubo", "avulso"])
+def test_paridade(base, consulta, recorte):
+    df = _recortes(base)[recorte]
+    esperado, obtido = CONSULTAS[consulta](df, "pandas"), CONSULTAS[consulta](df, "arrow")
+    pd.testing.assert_frame_equal(esperado, obtido, check_exact=False, rtol=RTOL, check_categorical=False)
+
+def test_recortes_filtrados_no_snapshot_da_versao(base):
+    colunas = ["cliente", "ano", "faturamento"]
+    construcoes = _snapshots()["construcoes"]
+    for recorte in (period(base, 3, 8), period(base, 3, 8), _recortes(base)["período do recorte"]):
+        esperado = pa.Table.from_pandas(recorte[colunas], preserve_index=False)
+        assert arrow_snapshot(recorte, colunas).equals(esperado)
+    # A base publicada é convertida uma vez, guardada com a versão; nenhum recorte é convertido
+    assert _snapshots()["construcoes"] == construcoes
+    tabela = dataset_artifact(base, "arrow", lambda df: pytest.fail("snapshot da versão não foi guardado"))
+    assert tabela.num_rows == len(base)
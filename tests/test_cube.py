@@ -0,0 +1,123 @@
+# tests/test_cube.py
+# Cubo de agregação (utils.cube): qualquer rollup do cubo deve bater com o groupby da base
+# original (somas, contagem de linhas, clientes distintos e medidas só de faturamento > 0),
+# com e sem filtros; o cubo de um recorte do cache de filtros deve ser o cubo do recorte.
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.cube import _filtered_cube, build_cube, cube_for, rollup
+from utils.dataset import dataset_artifact, publish_dataset
+from utils.filters import build_filter_index, filter_frame
+from utils.format import normalize_frame
+from utils.synthetic import gerar_base_bruta
+
+RTOL = 1e-9
+
+@pytest.fixture(scope="module")
+def base():
+    df = normalize_frame(gerar_base_bruta(20_000, clientes=300, executivos=8))
+    # Zeros e estornos: as medidas "_pos" só somam as linhas com faturamento > 0
+    df.loc[df.index[::7], "faturamento"] = 0.0
+    df.loc[df.index[::11], "faturamento"] *= -1
+    publish_dataset(df, "teste")
+    return df
+
+@pytest.fixture(scope="module")
+def cubo(base):
+    return build_cube(base)
+
+def _filtrar(df, **filtros):
+    """Mesmas regras de filtro do rollup, aplicadas às linhas da base."""
+    for dim, valor in filtros.items():
+        if isinstance(valor, tuple):
+            df = df[df[dim].between(*valor)]
+        elif isinstance(valor, list):
+            df = df[df[dim].isin(valor)]
+        else:
+            df = df[df[dim] == valor]
+    return df
+
+def _esperado(df, dimensoes, **filtros):
+    df = _filtrar(df, **filtros)
+    grupos = df.groupby(dimensoes, observed=True)
+    esperado = grupos[["faturamento", "insercoes"]].sum().assign(linhas=grupos.size())
+    positivos = df[df["faturamento"] > 0].groupby(dimensoes, observed=True)
+    pos = positivos[["faturamento", "insercoes"]].sum().assign(linhas=positivos.size()).add_suffix("_pos")
+    return esperado.join(pos).fillna(0).reset_index()
+
+FILTROS = {
+    "sem filtros": {},
+    "intervalo de anos": {"ano": (2023, 2024)},
+    "intervalo de meses": {"mes": (3, 8)},
+    "lista de emissoras": {"emissora": "primeiras duas"},
+    "um cliente": {"cliente": "primeiro"},
+    "combinados": {"ano": (2024, 2025), "mes": (1, 6), "emissora": "primeiras duas"},
+}
+
+def _filtros(base, nome):
+    filtros = dict(FILTROS[nome])
+    if "emissora" in filtros:
+        filtros["emissora"] = list(base["emissora"].cat.categories[:2])
+    if "cliente" in filtros:
+        filtros["cliente"] = base["cliente"].iloc[0]
+    return filtros
+
+@pytest.mark.parametrize("filtro", list(FILTROS))
+@pytest.mark.parametrize("dimensoes", [["ano"], ["mes"], ["emissora"], ["cliente"], ["ano", "mes"],
+                                       ["emissora", "ano"], ["cliente", "emissora", "ano"]])
+def test_rollup_igual_ao_groupby(base, cubo, dimensoes, filtro):
+    filtros = _filtros(base, filtro)
+    esperado = _esperado(base, dimensoes, **filtros)
+    obtido = rollup(cubo, dimensoes, medidas=list(esperado.columns[len(dimensoes):]), **filtros)
+    assert not obtido.empty
+    pd.testing.assert_frame_equal(obtido, esperado, check_exact=False, rtol=RTOL,
+                                  check_dtype=False, check_categorical=False)
+
+@pytest.mark.parametrize("filtro", list(FILTROS))
+def test_rollup_total_geral(base, cubo, filtro):
+    filtros = _filtros(base, filtro)
+    df = _filtrar(base, **filtros)
+    total = rollup(cubo, [], medidas=["faturamento", "insercoes", "linhas"], **filtros).iloc[0]
+    np.testing.assert_allclose(total.to_numpy(float), [df["faturamento"].sum(), df["insercoes"].sum(), len(df)], rtol=RTOL)
+
+@pytest.mark.parametrize("dimensao", ["emissora", "ano", "executivo"])
+def test_clientes_distintos(base, cubo, dimensao):
+    # Cada cliente aparece em pelo menos uma célula do cubo de cada grupo em que compra
+    esperado = base.groupby(dimensao, observed=True)["cliente"].nunique()
+    obtido = cubo.groupby(dimensao, observed=True)["cliente"].nunique()
+    pd.testing.assert_series_equal(obtido, esperado)
+
+def test_filtro_sem_linhas(cubo):
+    assert rollup(cubo, ["ano"], ano=(1990, 1991)).empty
+    assert rollup(cubo, [], ano=(1990, 1991)).iloc[0].tolist() == [0, 0]
+
+# ==================== CUBO DA BASE E DOS RECORTES ====================
+
+def test_cubo_da_base_publicada_e_construido_uma_vez(base, cubo):
+    assert cube_for(base) is cube_for(base)
+    pd.testing.assert_frame_equal(cube_for(base), cubo)
+
+@pytest.mark.parametrize("selecao", [
+    {"emissora": "primeiras duas"},
+    {"executivo": "alternados", "periodo": [202401, 202402, 202507]},
+    {"cliente": "primeiros dez"},
+])
+def test_cubo_do_recorte_de_filtros(base, selecao):
+    categorias = {"primeiras duas": base["emissora"].cat.categories[:2],
+                  "alternados": base["executivo"].cat.categories[::2],
+                  "primeiros dez": base["cliente"].cat.categories[:10]}
+    selecao = {dim: list(categorias.get(valor, valor)) if isinstance(valor, str) else valor
+               for dim, valor in selecao.items()}
+    recorte = filter_frame(base, dataset_artifact(base, "indice", build_filter_index), selecao)
+    assert 0 < len(recorte) < len(base)
+
+    esperado = build_cube(recorte)
+    pd.testing.assert_frame_equal(_filtered_cube(base, selecao), esperado)
+    # O cubo do recorte é guardado junto com ele no cache de filtros
+    assert cube_for(recorte) is cube_for(recorte)
+    pd.testing.assert_frame_equal(cube_for(recorte), esperado)
+
+def test_cubo_de_dataframe_avulso(base):
+    avulso = base[base["ano"] == 2024].reset_index(drop=True)
+    pd.testing.assert_frame_equal(cube_for(avulso), build_cube(avulso))
@@ -0,0 +1,59 @@
+# tests/test_dataset.py
+# Registro de bases (utils.dataset): sessões anotadas por versão e contadas no relatório de memória.
+import time
+
+import pandas as pd
+import pytest
+
+from utils import dataset
+from utils.dataset import _registro, bind_session, memory_report, publish_dataset, version_sessions
+
+@pytest.fixture
+def sem_sessoes():
+    reg = _registro()
+    with reg["lock"]:
+        reg["sessoes"].clear()
+    yield
+    with reg["lock"]:
+        reg["sessoes"].clear()
+
+def _publicar(nome):
+    return publish_dataset(pd.DataFrame({"faturamento": [1.0, 2.0]}), nome)
+
+def test_sessoes_por_versao(sem_sessoes):
+    v1 = _publicar("primeira")
+    v2 = _publicar("segunda")
+    bind_session(v1, "a")
+    bind_session(v2, "b")
+    bind_session(v2, "c")
+    # Cada rerun anota de novo: a sessão conta uma vez, com a última versão
+    bind_session(v2, "a")
+    assert version_sessions() == {v2: 3}
+
+    relatorio = memory_report()
+    assert relatorio["sessoes"] == 3
+    assert relatorio["sessoes_por_versao"] == {v2: 3}
+    assert memory_report(sessoes=10)["sessoes"] == 10
+
+def test_sessoes_de_versao_descartada_passam_para_a_atual(sem_sessoes):
+    v1 = _publicar("primeira")
+    bind_session(v1, "a")
+    _publicar("segunda")
+    assert version_sessions() == {v1: 1}
+    v3 = _publicar("terceira")
+    assert version_sessions() == {v3: 1}
+
+def test_sessoes_inativas_nao_contam(sem_sessoes, monkeypatch):
+    versao = _publicar("base")
+    bind_session(versao, "antiga")
+    agora = time.monotonic()
+    monkeypatch.setattr(dataset.time, "monotonic", lambda: agora + dataset.SESSAO_INATIVA_S + 1)
+    bind_session(versao, "recente")
+    assert version_sessions() == {versao: 1}
+    assert "antiga" not in _registro()["sessoes"]
+
+def test_fora_do_servidor(sem_sessoes):
+    # Sem script em execução não há id de sessão: nada é anotado e o relatório conta 1
+    bind_session(_publicar("base"))
+    assert version_sessions() == {}
+    assert memory_report()["sessoes"] == 1
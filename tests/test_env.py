@@ -0,0 +1,13 @@
+# tests/test_env.py
+# Variáveis de ambiente de configuração (utils.env.env_int).
+import pytest
+
+from utils.env import env_int
+
+@pytest.mark.parametrize("valor, esperado", [(None, 4), ("3", 3), ("1", 1), ("0", 4), ("-2", 4), ("dois", 4), ("", 4)])
+def test_env_int(monkeypatch, valor, esperado):
+    if valor is None:
+        monkeypatch.delenv("TESTE_WORKERS", raising=False)
+    else:
+        monkeypatch.setenv("TESTE_WORKERS", valor)
+    assert env_int("TESTE_WORKERS", 4, 1) == esperado
@@ -0,0 +1,54 @@
+# tests/test_excel_streaming.py
+# Pico de memória (RSS) e resultado da leitura em blocos (utils.loaders.read_excel_streaming).
+# Tamanho da planilha sintética: TEST_EXCEL_LINHAS (padrão 1.000.000; leva alguns minutos).
+import os
+
+import pandas as pd
+import pytest
+
+from utils.benchmark import pico_rss
+from utils.format import normalize_frame
+from utils import loaders
+from utils.loaders import read_excel_streaming
+from utils.synthetic import gerar_base_bruta, gravar_base
+
+LINHAS = int(os.environ.get("TEST_EXCEL_LINHAS", 1_000_000))
+
+# Pico permitido: RSS da mesma leitura numa planilha de 1.000 linhas (interpretador,
+# bibliotecas) + folga fixa do alocador + FATOR_LIMITE x tamanho da base normalizada
+FATOR_LIMITE = 3.0
+FOLGA = 32 * 1024 * 1024
+
+@pytest.fixture(scope="module")
+def planilhas(tmp_path_factory):
+    pasta = tmp_path_factory.mktemp("excel")
+    grande = gravar_base(gerar_base_bruta(LINHAS), str(pasta / "sintetica.xlsx"))
+    pequena = gravar_base(gerar_base_bruta(1_000), str(pasta / "pequena.xlsx"))
+    return grande, pequena
+
+def testpico_rss_limitado(planilhas):
+    grande, pequena = planilhas
+    rss_base, _ = pico_rss("streaming", pequena)
+    rss_stream, tamanho = pico_rss("streaming", grande)
+    limite = rss_base + FOLGA + FATOR_LIMITE * tamanho
+    assert rss_stream <= limite, (
+        f"pico {rss_stream / 1e6:.1f} MB acima do limite {limite / 1e6:.1f} MB "
+        f"({LINHAS:,} linhas, base normalizada {tamanho / 1e6:.1f} MB)"
+    )
+
+def test_mesma_base_que_read_excel(tmp_path, capsys):
+    caminho = gravar_base(gerar_base_bruta(5_000, seed=1), str(tmp_path / "media.xlsx"))
+    esperado = normalize_frame(pd.read_excel(caminho, engine="openpyxl"))
+    obtido = read_excel_streaming(caminho, chunk_rows=700)
+    pd.testing.assert_frame_equal(obtido, esperado)
+    # Contagem de formatos de data somada entre os blocos, sem imprimir nada (o loader imprime)
+    assert obtido.attrs["formatos_data"] == esperado.attrs["formatos_data"]
+    assert "Formatos de data_ref" not in capsys.readouterr().out
+
+@pytest.mark.parametrize("em_blocos", [False, True])
+def test_formatos_impressos_uma_vez_por_arquivo(tmp_path, capsys, monkeypatch, em_blocos):
+    caminho = gravar_base(gerar_base_bruta(2_000, seed=2), str(tmp_path / "pequena.xlsx"))
+    if em_blocos:
+        monkeypatch.setattr(loaders, "STREAMING_MIN_BYTES", 0)
+    loaders._parse_timed(caminho)
+    assert capsys.readouterr().out.count("Formatos de data_ref (pequena.xlsx)") == 1
@@ -0,0 +1,78 @@
+# tests/test_export.py
+# Planilha exportada (utils.export): abas dos gráficos nativos do Excel, mensagens de erro
+# e pico de memória do pacote ZIP. Tamanho da tabela do teste de memória: TEST_EXPORT_LINHAS.
+import os
+import tracemalloc
+import zipfile
+
+import openpyxl
+import pandas as pd
+import plotly.graph_objects as go
+import pytest
+
+from utils import export
+from utils.synthetic import gerar_tabela_clientes
+
+LINHAS = int(os.environ.get("TEST_EXPORT_LINHAS", 200_000))
+
+# Pico permitido da exportação: tamanho do ZIP + folga fixa (não cresce com as linhas)
+FOLGA = 16 * 1024 * 1024
+
+def _abrir(arquivo):
+    return openpyxl.load_workbook(arquivo)
+
+def _barras():
+    return go.Figure(go.Bar(x=["A", "B"], y=[1, 2], name="Faturamento"))
+
+def test_erro_no_grafico_nativo_vai_para_a_propria_aba(monkeypatch):
+    def falhar(*args, **kwargs):
+        raise ValueError("falha simulada")
+    monkeypatch.setattr(export, "_bar_line_chart", falhar)
+
+    # As duas chaves viram a mesma aba "Faturamento" depois da limpeza do nome
+    dados = {
+        "Faturamento": {"df": pd.DataFrame({"Cliente": ["X"], "Valor": [10.0]})},
+        "Faturamento?": {"fig": _barras()},
+    }
+    planilha = _abrir(export.to_excel_with_images(dados, "sem filtros", chart_mode="nativo"))
+    assert planilha.sheetnames == ["Filtros", "Faturamento", "Faturamento (2)"]
+    assert planilha["Faturamento"]["A1"].value == "Cliente"
+    assert planilha["Faturamento (2)"]["A1"].value == "Erro ao gerar gráfico: falha simulada"
+
+def test_grafico_nativo():
+    planilha = _abrir(export.to_excel_with_images({"Barras": {"fig": _barras()}}, "", chart_mode="nativo"))
+    aba = planilha["Barras"]
+    assert [c.value for c in aba[1]][:2] == ["Categoria", "Faturamento"]
+    assert len(aba._charts) == 1
+
+def test_mapa_de_calor_vira_tabela_colorida():
+    fig = go.Figure(go.Heatmap(z=[[1, 2], [3, 4]], x=["2024", "2025"], y=["Difusora", "Novabrasil"]))
+    planilha = _abrir(export.to_excel_with_images({"Calor": {"fig": fig}}, "", chart_mode="nativo"))
+    aba = planilha["Calor"]
+    assert [[c.value for c in linha] for linha in aba.iter_rows()] == [
+        [None, "2024", "2025"], ["Difusora", 1, 2], ["Novabrasil", 3, 4],
+    ]
+    # Sem gráfico: só a escala de cores da formatação condicional
+    assert aba._charts == []
+    assert len(aba.conditional_formatting) == 1
+
+# ==================== MEMÓRIA ====================
+
+def test_pico_de_memoria_do_zip():
+    dados = {"Clientes": {"df": gerar_tabela_clientes(LINHAS)}}
+    tracemalloc.start()
+    try:
+        pacote = export.create_zip_package(dados, "teste")
+        pico = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    tamanho = len(pacote.getbuffer())
+    assert pico <= tamanho + FOLGA, (
+        f"pico {pico / 1e6:.1f} MB acima do limite {(tamanho + FOLGA) / 1e6:.1f} MB "
+        f"({LINHAS:,} linhas, ZIP {tamanho / 1e6:.1f} MB)"
+    )
+    # O pacote sai como arquivo posicionado no início, com a planilha inteira
+    with zipfile.ZipFile(pacote) as zip_file:
+        assert zip_file.namelist() == ["Relatorio.xlsx"]
+        planilha = openpyxl.load_workbook(zip_file.open("Relatorio.xlsx"), read_only=True)
+        assert planilha["Clientes"].max_row == LINHAS + 1
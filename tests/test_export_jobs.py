@@ -0,0 +1,24 @@
+# tests/test_export_jobs.py
+# Assinatura do conteúdo de um item de exportação (utils.export_jobs._content_key): igual
+# para cópias do mesmo conteúdo (as páginas remontam as tabelas a cada reexecução).
+import pandas as pd
+import plotly.graph_objects as go
+
+from utils.export_jobs import _content_key
+
+def test_tabela_copiada_mesma_chave():
+    df = pd.DataFrame({"Cliente": ["A", "B"], "Valor": [1.0, 2.0]})
+    assert _content_key({"df": df}) == _content_key({"df": df.copy()})
+    assert _content_key({"df": df}) != _content_key({"df": df.assign(Valor=[1.0, 3.0])})
+
+def test_tabela_sem_hash_usa_conteudo():
+    # Listas nas células: hash_pandas_object falha e a chave vem do CSV
+    df = pd.DataFrame({"Cliente": ["A", "B"], "Emissoras": [["X", "Y"], ["Z"]]})
+    chave = _content_key({"df": df})
+    assert chave == _content_key({"df": df.copy(deep=True)})
+    assert chave != _content_key({"df": df.assign(Emissoras=[["X"], ["Z"]])})
+
+def test_figura_copiada_mesma_chave():
+    fig = go.Figure(go.Bar(x=["A"], y=[1]))
+    assert _content_key({"fig": fig}) == _content_key({"fig": go.Figure(fig)})
+    assert _content_key({"fig": fig}) != _content_key({"fig": go.Figure(go.Bar(x=["A"], y=[2]))})
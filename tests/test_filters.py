@@ -0,0 +1,174 @@
+# tests/test_filters.py
+# Índice de filtros (utils.filters): as posições do índice por valor devem selecionar as
+# mesmas linhas que as máscaras isin/between usadas antes do índice, em seleções
+# aleatórias, vazias, completas ("Todos") e com valores que não existem na base.
+# Cache LRU de bases filtradas: descarte por número de recortes, por memória e por versão.
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils import filters
+from utils.dataset import publish_dataset
+from utils.filters import _filter_cache, build_filter_index, filter_cache_stats, filter_frame, filter_positions
+from utils.format import normalize_frame
+from utils.synthetic import gerar_base_bruta
+
+@pytest.fixture(scope="module")
+def base():
+    return normalize_frame(gerar_base_bruta(20_000, clientes=300, executivos=8))
+
+@pytest.fixture(scope="module")
+def indice(base):
+    return build_filter_index(base)
+
+def _mascara(df, ano_1, ano_2, meses, emissoras, executivos, clientes):
+    """Filtro dos widgets como era feito antes do índice (aplicar_filtros)."""
+    filtrado = df[(df["ano"].between(ano_1, ano_2)) & (df["emissora"].isin(emissoras))
+                  & (df["executivo"].isin(executivos)) & (df["mes"].isin(meses))]
+    if clientes:
+        filtrado = filtrado[filtrado["cliente"].isin(clientes)]
+    return filtrado
+
+def _selecao(ano_1, ano_2, meses, emissoras, executivos, clientes):
+    """Seleção no formato montado por aplicar_filtros."""
+    selecao = {
+        "periodo": [a * 100 + m for a in range(ano_1, ano_2 + 1) for m in meses],
+        "emissora": emissoras,
+        "executivo": executivos,
+    }
+    if clientes:
+        selecao["cliente"] = clientes
+    return selecao
+
+def _conferir(base, indice, *args):
+    esperado = _mascara(base, *args)
+    posicoes = filter_positions(indice, _selecao(*args))
+    if posicoes is None:
+        posicoes = np.arange(len(base))
+    np.testing.assert_array_equal(posicoes, base.index.get_indexer(esperado.index))
+    pd.testing.assert_frame_equal(filter_frame(base, indice, _selecao(*args)), esperado)
+
+def _todos(indice):
+    return (int(indice["anos"][0]), int(indice["anos"][-1]), [int(m) for m in indice["meses"]],
+            list(indice["emissora"]), list(indice["executivo"]), [])
+
+@pytest.mark.parametrize("semente", range(10))
+def test_selecoes_aleatorias(base, indice, semente):
+    rng = np.random.default_rng(semente)
+    anos = sorted(rng.choice(indice["anos"], size=2))
+    meses = sorted(rng.choice(indice["meses"], size=rng.integers(1, 13), replace=False).tolist())
+    emissoras = rng.choice(indice["emissora"], size=rng.integers(1, len(indice["emissora"]) + 1), replace=False).tolist()
+    executivos = rng.choice(indice["executivo"], size=rng.integers(1, len(indice["executivo"]) + 1), replace=False).tolist()
+    clientes = rng.choice(indice["cliente"], size=rng.integers(0, 20), replace=False).tolist()
+    _conferir(base, indice, int(anos[0]), int(anos[1]), meses, emissoras, executivos, clientes)
+
+def test_todos_marcados_devolve_a_base(base, indice):
+    todos = _todos(indice)
+    assert filter_positions(indice, _selecao(*todos)) is None
+    assert filter_frame(base, indice, _selecao(*todos)) is base
+    assert len(_mascara(base, *todos)) == len(base)
+
+@pytest.mark.parametrize("vazio", ["meses", "emissoras", "executivos"])
+def test_selecao_vazia_nao_devolve_linhas(base, indice, vazio):
+    ano_1, ano_2, meses, emissoras, executivos, clientes = _todos(indice)
+    argumentos = {"meses": meses, "emissoras": emissoras, "executivos": executivos}
+    argumentos[vazio] = []
+    args = (ano_1, ano_2, argumentos["meses"], argumentos["emissoras"], argumentos["executivos"], clientes)
+    assert filter_frame(base, indice, _selecao(*args)).empty
+    _conferir(base, indice, *args)
+
+def test_valores_inexistentes_sao_ignorados(base, indice):
+    ano_1, ano_2, meses, emissoras, executivos, _ = _todos(indice)
+    # Valores fora da base não selecionam nada e não atrapalham os demais
+    _conferir(base, indice, ano_1, ano_2, meses + [13], emissoras[:1] + ["Rádio Inexistente"],
+              executivos + ["Ninguém"], ["Cliente Inexistente", indice["cliente"][0]])
+    # Só valores inexistentes: nenhuma linha
+    _conferir(base, indice, ano_1, ano_2, meses, ["Rádio Inexistente"], executivos, [])
+    # Anos fora da base: o período não tem nenhum ano/mês presente
+    _conferir(base, indice, 1990, 1991, meses, emissoras, executivos, [])
+
+# ==================== CACHE LRU ====================
+
+@pytest.fixture
+def cache_vazio():
+    cache = _filter_cache()
+    with cache["lock"]:
+        cache["entradas"].clear()
+        cache.update(bytes=0, acertos=0, falhas=0, descartes=0)
+    return cache
+
+@pytest.fixture
+def publicada(base, cache_vazio):
+    df = base.copy()
+    publish_dataset(df, "teste")
+    return df, build_filter_index(df)
+
+def _por_periodo(indice):
+    """Uma seleção por ano/mês da base: recortes distintos, cada um com uma chave própria."""
+    return [{"periodo": [int(a) * 100 + int(m)]} for a in indice["anos"] for m in indice["meses"]]
+
+def _periodos_em_cache(cache):
+    return [dict(chave[1:])["periodo"] for chave in cache["entradas"]]
+
+def test_descarte_por_numero_de_recortes(publicada, cache_vazio):
+    df, indice = publicada
+    selecoes = _por_periodo(indice)
+    limite = filters.FILTER_CACHE_MAX_ENTRIES
+    assert len(selecoes) > limite + 1
+
+    recortes = [filter_frame(df, indice, s) for s in selecoes[:limite]]
+    assert filter_cache_stats()["entradas"] == limite
+    # Reusar o primeiro recorte o torna o mais recente: o descarte seguinte leva o segundo
+    assert filter_frame(df, indice, selecoes[0]) is recortes[0]
+    filter_frame(df, indice, selecoes[limite])
+    filter_frame(df, indice, selecoes[limite + 1])
+
+    codigos = _periodos_em_cache(cache_vazio)
+    assert len(codigos) == limite
+    assert codigos[-1] == (indice["dimensoes"]["periodo"]["valores"][selecoes[limite + 1]["periodo"][0]],)
+    descartados = {indice["dimensoes"]["periodo"]["valores"][s["periodo"][0]] for s in selecoes[1:3]}
+    assert descartados.isdisjoint(c[0] for c in codigos)
+    stats = filter_cache_stats()
+    assert (stats["acertos"], stats["falhas"], stats["descartes"]) == (1, limite + 2, 2)
+    assert stats["bytes"] == sum(e["bytes"] for e in cache_vazio["entradas"].values())
+
+def test_descarte_por_memoria(publicada, cache_vazio, monkeypatch):
+    df, indice = publicada
+    selecoes = _por_periodo(indice)[:4]
+    tamanhos = [int(df.take(filter_positions(indice, s)).memory_usage(deep=False).sum()) for s in selecoes]
+    # Cabem os dois recortes mais recentes, nunca três
+    monkeypatch.setattr(filters, "FILTER_CACHE_MAX_BYTES", max(tamanhos[i] + tamanhos[i + 1] for i in range(3)))
+
+    for s in selecoes:
+        filter_frame(df, indice, s)
+    stats = filter_cache_stats()
+    assert (stats["entradas"], stats["descartes"]) == (2, 2)
+    assert stats["bytes"] == tamanhos[2] + tamanhos[3] <= filters.FILTER_CACHE_MAX_BYTES
+
+    # Recorte maior que o limite inteiro: devolvido, mas não guardado
+    monkeypatch.setattr(filters, "FILTER_CACHE_MAX_BYTES", min(tamanhos) - 1)
+    filter_frame(df, indice, {"periodo": selecoes[0]["periodo"] + selecoes[1]["periodo"]})
+    assert filter_cache_stats()["entradas"] == 2
+
+def test_recortes_de_versoes_descartadas_saem_primeiro(publicada, cache_vazio):
+    df, indice = publicada
+    selecoes = _por_periodo(indice)
+    for s in selecoes[:3]:
+        filter_frame(df, indice, s)
+    # Duas publicações depois, a versão do 'df' deixa de existir no registro
+    nova = df.copy()
+    publish_dataset(df.iloc[:10].copy(), "intermediaria")
+    publish_dataset(nova, "nova")
+    filter_frame(nova, build_filter_index(nova), selecoes[0])
+
+    assert len(cache_vazio["entradas"]) == 1
+    assert filter_cache_stats()["descartes"] == 3
+
+def test_log_do_cache_a_cada_recorte_novo(publicada, capsys):
+    df, indice = publicada
+    selecao = _por_periodo(indice)[0]
+    filter_frame(df, indice, selecao)
+    filter_frame(df, indice, selecao)
+    linhas = [l for l in capsys.readouterr().out.splitlines() if l.startswith("Cache de filtros:")]
+    assert len(linhas) == 1
+    assert "0/1 (0%), 1 recortes" in linhas[0]
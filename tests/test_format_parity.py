@@ -0,0 +1,154 @@
+# tests/test_format_parity.py
+# Paridade das normalizações vetorizadas (utils.format *_series) com as funções escalares
+# de referência aplicadas linha a linha, como normalize_dataframe fazia antes.
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import PLANILHA_EXEMPLO
+from utils.format import (
+    normalize_text, normalize_text_series,
+    parse_currency_br, parse_currency_br_series,
+    try_parse_date, parse_dates_series,
+    consolidate_executives, consolidate_executives_series,
+)
+
+SEEDS = range(5)
+
+# ==================== REFERÊNCIA (LINHA A LINHA) ====================
+
+def _texto_referencia(serie):
+    return serie.apply(normalize_text).astype(object)
+
+def _moeda_referencia(serie):
+    return serie.apply(parse_currency_br).astype(float)
+
+def _datas_referencia(serie):
+    texto = serie.astype(str).str.strip().str.replace("'", "", regex=False)
+    return pd.Series([try_parse_date(v) for v in texto], index=serie.index, dtype="datetime64[ns]")
+
+def _executivos_referencia(serie):
+    return serie.apply(consolidate_executives).astype(object)
+
+def _assert_series(obtido, esperado):
+    pd.testing.assert_series_equal(obtido, esperado, check_exact=True, check_names=False)
+
+# ==================== ENTRADAS SORTEADAS ====================
+
+def _sortear(rng, opcoes, n):
+    return [opcoes[i] for i in rng.integers(0, len(opcoes), n)]
+
+def _textos(rng, n=2000):
+    palavras = ["ana", "ANA", "Rádio", "TV", "th+", "NOVABRASIL", "são paulo", "  jOãO  da silva ",
+                "ME", "ltda", "x", "ÁGUA", "d'ávila", "mc donald's", "a-b c", "\tabc\n", "123", ""]
+    valores = [" ".join(_sortear(rng, palavras, rng.integers(1, 4))) for _ in range(n)]
+    extras = [None, np.nan, 12, 3.5, "", "   ", "AB", "ABCD", "ab"]
+    posicoes = rng.integers(0, n, n // 10)
+    for i, extra in zip(posicoes, _sortear(rng, extras, len(posicoes))):
+        valores[i] = extra
+    return pd.Series(valores, dtype=object)
+
+def _moedas(rng, n=2000):
+    formatos = [
+        lambda v: f"R$ {v:,.2f}".replace(",", "X").replace(".", ",").replace("X", "."),
+        lambda v: f"{v:.2f}".replace(".", ","),
+        lambda v: f"({v:.2f})".replace(".", ","),
+        lambda v: f"-{v:,.2f}".replace(",", "X").replace(".", ",").replace("X", "."),
+        lambda v: f"R$ {v:.1f}".replace(".", ","),
+        lambda v: f"{v:.3e}",
+        lambda v: v,
+        lambda v: int(v),
+        lambda v: str(int(v)),
+    ]
+    valores = [formatos[i](float(v)) for i, v in
+               zip(rng.integers(0, len(formatos), n), rng.lognormal(6, 2, n))]
+    extras = [None, np.nan, "", "  ", "abc", "R$", "1.234.567,89", "(0,00)", "-0", "1e400", "inf", "nan", "1_000"]
+    posicoes = rng.integers(0, n, n // 10)
+    for i, extra in zip(posicoes, _sortear(rng, extras, len(posicoes))):
+        valores[i] = extra
+    return pd.Series(valores, dtype=object)
+
+def _datas(rng, n=2000):
+    anos, meses, dias = rng.integers(1990, 2035, n), rng.integers(1, 14, n), rng.integers(1, 32, n)
+    formatos = [
+        lambda a, m, d: f"{a}-{m:02d}-{d:02d}",
+        lambda a, m, d: f"{d}/{m}/{a}",
+        lambda a, m, d: f"{d:02d}/{m:02d}/{a % 100:02d}",
+        lambda a, m, d: f"'{m:02d}/{a}'",
+        lambda a, m, d: f"{m}/{a}",
+        lambda a, m, d: str(30000 + d * m * 37),
+        lambda a, m, d: f"{30000 + d * m}.5",
+        lambda a, m, d: f"{a}-{m:02d}-{d:02d} 10:30:00",
+        lambda a, m, d: pd.Timestamp(a, min(m, 12), 1),
+    ]
+    valores = [formatos[i](a, m, d) for i, a, m, d in zip(rng.integers(0, len(formatos), n), anos, meses, dias)]
+    extras = [None, np.nan, "", "abc", "2024", "13/2024", "00/2024", "2024-02-30", " 01/2024 ", "1.2.3"]
+    posicoes = rng.integers(0, n, n // 10)
+    for i, extra in zip(posicoes, _sortear(rng, extras, len(posicoes))):
+        valores[i] = extra
+    return pd.Series(valores, dtype=object)
+
+def _executivos(rng, n=2000):
+    nomes = ["Eduardo Notomi", "EDUARDO N", "julia bergo", "Olga Luiza Vancim Me", "WALNER FRANCISCO ESC",
+             "Venda Externa", "VENDAS EXTERNAS", "venda externa sp", "Maria", "N/A", "", "nan", "None"]
+    valores = _sortear(rng, nomes, n)
+    extras = [None, np.nan, 7, 1.5]
+    posicoes = rng.integers(0, n, n // 10)
+    for i, extra in zip(posicoes, _sortear(rng, extras, len(posicoes))):
+        valores[i] = extra
+    return pd.Series(valores, dtype=object)
+
+# ==================== ENTRADAS SORTEADAS ====================
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_normalize_text_sorteado(seed):
+    serie = _textos(np.random.default_rng(seed))
+    _assert_series(normalize_text_series(serie), _texto_referencia(serie))
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_parse_currency_sorteado(seed):
+    serie = _moedas(np.random.default_rng(seed))
+    _assert_series(parse_currency_br_series(serie), _moeda_referencia(serie))
+
+def test_parse_currency_coluna_numerica():
+    serie = pd.Series([1.5, np.nan, -2.0, 0.0, 1e20])
+    _assert_series(parse_currency_br_series(serie), _moeda_referencia(serie))
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_parse_dates_sorteado(seed):
+    serie = _datas(np.random.default_rng(seed))
+    _assert_series(parse_dates_series(serie), _datas_referencia(serie))
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_consolidate_executives_sorteado(seed):
+    serie = _executivos(np.random.default_rng(seed))
+    _assert_series(consolidate_executives_series(serie), _executivos_referencia(serie))
+
+def test_series_vazias():
+    vazia = pd.Series([], dtype=object)
+    _assert_series(normalize_text_series(vazia), _texto_referencia(vazia))
+    _assert_series(parse_currency_br_series(vazia), _moeda_referencia(vazia))
+    _assert_series(parse_dates_series(vazia), _datas_referencia(vazia))
+    _assert_series(consolidate_executives_series(vazia), _executivos_referencia(vazia))
+
+# ==================== PLANILHA DE EXEMPLO ====================
+
+@pytest.fixture(scope="module")
+def planilha():
+    return pd.read_excel(PLANILHA_EXEMPLO)
+
+def test_planilha_textos(planilha):
+    for coluna in ["Empresa", "DESCRIÇÃO", "CONTATO COML.", "AGÊNCIA", "PRODUTO"]:
+        _assert_series(normalize_text_series(planilha[coluna]), _texto_referencia(planilha[coluna]))
+
+def test_planilha_executivos(planilha):
+    serie = normalize_text_series(planilha["CONTATO COML."])
+    _assert_series(consolidate_executives_series(serie), _executivos_referencia(serie))
+
+def test_planilha_moeda(planilha):
+    for coluna in ["VALOR BRUTO", "VALOR LIQUIDO", "CUSTO UNITÁRIO"]:
+        _assert_series(parse_currency_br_series(planilha[coluna]), _moeda_referencia(planilha[coluna]))
+
+def test_planilha_datas(planilha):
+    for coluna in ["REF.", "VIGÊNCIA INI", "VIGÊNCIA FIM"]:
+        _assert_series(parse_dates_series(planilha[coluna]), _datas_referencia(planilha[coluna]))
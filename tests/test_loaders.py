@@ -0,0 +1,21 @@
+# tests/test_loaders.py
+# Carga da pasta de dados (utils.loaders): relatório dos caches por impressão digital.
+from utils import loaders
+from utils.synthetic import gerar_base_bruta, gravar_base
+
+def test_relatorio_dos_caches_a_cada_carga(tmp_path, capsys):
+    caminho = gravar_base(gerar_base_bruta(500), str(tmp_path / "base.parquet"))
+    antes = loaders.cache_report()["hash_arquivos"]
+    capsys.readouterr()
+
+    # Primeira carga: hash calculado; segunda: mesmo conjunto, hash reaproveitado
+    assert loaders._publish_files(str(tmp_path), [caminho])[0]
+    assert loaders._publish_files(str(tmp_path), [caminho])[0]
+    saida = capsys.readouterr().out
+    assert saida.count("Hash de arquivos:") == 2
+
+    depois = loaders.cache_report()["hash_arquivos"]
+    assert depois["falhas"] == antes["falhas"] + 1
+    assert depois["acertos"] == antes["acertos"] + 1
+    # A base lida já foi gravada no armazenamento: não fica no cache de normalização
+    assert loaders.cached_normalization(loaders.file_fingerprint(caminho)) is None
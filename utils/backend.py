@@ -0,0 +1,162 @@
+# utils/backend.py
+# Motor das agregações das páginas (somas e contagens distintas por grupo).
+# - "pandas": groupby do pandas (comportamento original, uma thread);
+# - "arrow":  group_by do pyarrow (Acero), colunar e multi-thread, sobre um snapshot Arrow
+#             construído uma única vez por base publicada (por versão) ou cubo; os recortes
+#             (filtros globais, período) são filtrados na própria tabela Arrow.
+# Escolha pela variável de ambiente ANALYTICS_BACKEND (padrão: pandas). Os dois motores
+# devolvem o mesmo formato de resultado (ver tests/test_backend_parity.py).
+import os
+import threading
+import weakref
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import streamlit as st
+
+from utils.dataset import dataset_artifact, dataset_version_of
+
+BACKENDS = ("pandas", "arrow")
+DEFAULT_BACKEND = "pandas"
+
+def analytics_backend():
+    """Motor configurado em ANALYTICS_BACKEND (valores desconhecidos voltam para o padrão)."""
+    nome = os.environ.get("ANALYTICS_BACKEND", DEFAULT_BACKEND).strip().lower()
+    if nome not in BACKENDS:
+        print(f"ANALYTICS_BACKEND='{nome}' desconhecido; usando '{DEFAULT_BACKEND}'.")
+        return DEFAULT_BACKEND
+    return nome
+
+# ==================== SNAPSHOT ARROW ====================
+# Só as origens são convertidas: a base publicada (uma vez por versão, guardada com ela em
+# utils.dataset) e os cubos. Os recortes registrados com register_rows (filtros globais,
+# período) guardam as posições das suas linhas na origem e viram um take() da tabela dela.
+
+@st.cache_resource
+def _snapshots():
+    """Tabelas Arrow das origens que não são versões (cubos), por id, e os recortes registrados."""
+    return {"lock": threading.Lock(), "tabelas": {}, "recortes": {}, "construcoes": 0}
+
+def _converter(df):
+    return pa.Table.from_pandas(df, preserve_index=False)
+
+def register_rows(recorte, origem, linhas):
+    """
+    Registra 'recorte' como as linhas 'linhas' (posições ou máscara booleana) de 'origem',
+    para o motor Arrow filtrar o snapshot da origem em vez de converter o recorte.
+    Recortes de recortes registrados apontam direto para a origem deles. No motor pandas não faz nada.
+    """
+    if analytics_backend() != "arrow" or recorte is origem:
+        return
+    linhas = np.asarray(linhas)
+    posicoes = np.flatnonzero(linhas) if linhas.dtype == bool else linhas.astype(np.int64, copy=False)
+    cache = _snapshots()
+    with cache["lock"]:
+        pai = _registro_recorte(cache, origem)
+    if pai is not None:
+        origem, posicoes = pai[0], pai[1][posicoes]
+    chave = id(recorte)
+    with cache["lock"]:
+        cache["recortes"][chave] = (weakref.ref(recorte), weakref.ref(origem), posicoes)
+    weakref.finalize(recorte, _descartar, cache, "recortes", chave)
+
+def _registro_recorte(cache, df):
+    """(origem, posições) de um recorte registrado e ainda vivo; None caso contrário."""
+    entrada = cache["recortes"].get(id(df))
+    if entrada is None or entrada[0]() is not df:
+        return None
+    origem = entrada[1]()
+    return (origem, entrada[2]) if origem is not None else None
+
+def _snapshot_origem(df):
+    """Tabela Arrow de uma origem: por versão se for uma base publicada, senão por objeto."""
+    if dataset_version_of(df) is not None:
+        return dataset_artifact(df, "arrow", _converter)
+    cache = _snapshots()
+    chave = id(df)
+    with cache["lock"]:
+        tabela = cache["tabelas"].get(chave)
+    if tabela is not None:
+        return tabela
+
+    tabela = _converter(df)
+    with cache["lock"]:
+        if chave not in cache["tabelas"]:
+            cache["tabelas"][chave] = tabela
+            cache["construcoes"] += 1
+            weakref.finalize(df, _descartar, cache, "tabelas", chave)
+        return cache["tabelas"][chave]
+
+def arrow_snapshot(df, colunas=None):
+    """
+    Tabela Arrow do DataFrame (só 'colunas', se informadas). Bases publicadas, cubos e os
+    recortes do cache de filtros são imutáveis, então o snapshot não fica desatualizado;
+    recortes registrados saem do snapshot da origem com take(), sem nova conversão.
+    """
+    cache = _snapshots()
+    with cache["lock"]:
+        registro = _registro_recorte(cache, df)
+    origem, posicoes = registro if registro is not None else (df, None)
+    tabela = _snapshot_origem(origem)
+    if colunas is not None:
+        tabela = tabela.select(list(colunas))
+    return tabela if posicoes is None else tabela.take(pa.array(posicoes))
+
+def _descartar(cache, tipo, chave):
+    with cache["lock"]:
+        cache[tipo].pop(chave, None)
+
+# ==================== AGREGAÇÕES ====================
+
+def _restaurar_chaves(resultado, df, chaves):
+    """Devolve às chaves os tipos do DataFrame de origem e a ordem do groupby do pandas."""
+    resultado = resultado.dropna(subset=chaves)
+    for c in chaves:
+        origem = df[c].dtype
+        if isinstance(origem, pd.CategoricalDtype):
+            resultado[c] = pd.Categorical(resultado[c].astype(object), categories=origem.categories, ordered=origem.ordered)
+        else:
+            resultado[c] = resultado[c].astype(origem)
+    return resultado.sort_values(chaves, kind="stable").reset_index(drop=True)
+
+def _agregar_arrow(df, chaves, operacoes):
+    """group_by do Arrow: operacoes = [(coluna, função arrow, nome do resultado)]."""
+    tabela = arrow_snapshot(df, dict.fromkeys(chaves + [c for c, _, _ in operacoes]))
+    agregado = tabela.group_by(chaves).aggregate([(c, f) for c, f, _ in operacoes])
+    resultado = agregado.to_pandas()
+    resultado = resultado.rename(columns={f"{c}_{f}": nome for c, f, nome in operacoes})
+    return _restaurar_chaves(resultado[chaves + [nome for _, _, nome in operacoes]], df, chaves)
+
+def group_sum(df, chaves, medidas, backend=None):
+    """
+    Equivale a df.groupby(chaves, observed=True)[medidas].sum().reset_index():
+    uma linha por combinação presente, chaves ordenadas, grupos com chave nula descartados.
+    """
+    chaves, medidas = list(chaves), list(medidas)
+    if (backend or analytics_backend()) == "pandas":
+        return df.groupby(chaves, observed=True)[medidas].sum().reset_index()
+    resultado = _agregar_arrow(df, chaves, [(m, "sum", m) for m in medidas])
+    # Soma de grupo só com nulos: pandas dá 0, Arrow dá nulo
+    resultado[medidas] = resultado[medidas].fillna(0)
+    return resultado
+
+def group_nunique(df, chaves, coluna, backend=None):
+    """Equivale a df.groupby(chaves, observed=True)[coluna].nunique().reset_index()."""
+    chaves = list(chaves)
+    if (backend or analytics_backend()) == "pandas":
+        return df.groupby(chaves, observed=True)[coluna].nunique().reset_index()
+    resultado = _agregar_arrow(df, chaves, [(coluna, "count_distinct", coluna)])
+    return resultado.astype({coluna: np.int64})
+
+def pivot_by_year(df, dimensao, medida, backend=None):
+    """
+    Tabela dimensão x ano com a soma da medida (zeros onde não há lançamento), no formato de
+    df.groupby([dimensao, "ano"], observed=True)[medida].sum().unstack(fill_value=0).
+    """
+    somas = group_sum(df, [dimensao, "ano"], [medida], backend=backend)
+    return somas.set_index([dimensao, "ano"])[medida].unstack(fill_value=0)
+
+def pivot_nunique_by_year(df, dimensao, coluna, backend=None):
+    """Tabela dimensão x ano com a contagem distinta de 'coluna' (zeros onde não há)."""
+    contagens = group_nunique(df, [dimensao, "ano"], coluna, backend=backend)
+    return contagens.set_index([dimensao, "ano"])[coluna].unstack(fill_value=0)
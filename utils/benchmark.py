@@ -0,0 +1,342 @@
+# utils/benchmark.py
+# Comparativos de desempenho: implementação escalar (linha a linha) x vetorizada.
+# Uso: python -m utils.benchmark [linhas]
+import io
+import os
+import sys
+import time
+import subprocess
+import tempfile
+import numpy as np
+import pandas as pd
+
+from utils.format import try_parse_date, parse_dates_series, parse_currency_br, parse_currency_br_series, normalize_frame
+from utils.dataset import publish_dataset, memory_report
+from utils.synthetic import (gerar_base_bruta, gerar_base_canonica, gerar_base_formatos, gerar_datas,
+                             gerar_tabela_clientes, gerar_valores, gravar_base)
+
+# ==================== MEDIÇÃO ====================
+
+def cronometrar(func, *args, repeticoes=3):
+    """Melhor tempo (s) entre as repetições, junto com o último resultado."""
+    melhor, resultado = float("inf"), None
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = func(*args)
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor, resultado
+
+def _datas_escalar(serie):
+    texto = serie.astype(str).str.strip().str.replace("'", "", regex=False)
+    return texto.apply(try_parse_date)
+
+def benchmark_datas(n=100_000):
+    """Compara try_parse_date (.apply) com parse_dates_series e confere se os resultados batem."""
+    serie = gerar_datas(n)
+    t_escalar, r_escalar = cronometrar(_datas_escalar, serie, repeticoes=1)
+
+    relatorio = {}
+    t_vetor, r_vetor = cronometrar(lambda s: parse_dates_series(s, relatorio=relatorio), serie)
+
+    iguais = pd.to_datetime(r_escalar).equals(r_vetor)
+    print(f"data_ref ({n:,} linhas)")
+    print(f"  escalar:    {t_escalar:8.3f} s")
+    print(f"  vetorizado: {t_vetor:8.3f} s  ({t_escalar / max(t_vetor, 1e-9):.1f}x)")
+    print(f"  resultados idênticos: {iguais}")
+    print("  buckets: " + ", ".join(f"{k}={v}" for k, v in relatorio.items()))
+    return {"linhas": n, "escalar_s": t_escalar, "vetorizado_s": t_vetor, "iguais": iguais, "buckets": relatorio}
+
+def benchmark_moeda(n=100_000):
+    """Compara parse_currency_br (.apply) com parse_currency_br_series (texto e coluna já numérica)."""
+    serie = gerar_valores(n)
+    t_escalar, r_escalar = cronometrar(lambda s: s.apply(parse_currency_br), serie, repeticoes=1)
+    t_vetor, r_vetor = cronometrar(parse_currency_br_series, serie)
+    t_numerico, _ = cronometrar(parse_currency_br_series, r_vetor)
+
+    iguais = r_escalar.astype(float).equals(r_vetor)
+    print(f"Faturamento ({n:,} linhas)")
+    print(f"  escalar:    {t_escalar:8.3f} s")
+    print(f"  vetorizado: {t_vetor:8.3f} s  ({t_escalar / max(t_vetor, 1e-9):.1f}x)")
+    print(f"  já numérico:{t_numerico:8.3f} s")
+    print(f"  resultados idênticos: {iguais}")
+    return {"linhas": n, "escalar_s": t_escalar, "vetorizado_s": t_vetor, "numerico_s": t_numerico, "iguais": iguais}
+
+def benchmark_memoria(n=100_000, sessoes=30):
+    """Memória por sessão: cópia da base em cada session_state x versão compartilhada no processo."""
+    bruto = gerar_base_formatos(n)
+    df = normalize_frame(bruto)
+    publish_dataset(df, "benchmark", chave=("benchmark", n))
+    print(f"Base compartilhada ({len(df):,} linhas)")
+    return memory_report(sessoes=sessoes)
+
+_SCRIPT_RSS = """
+import resource, sys
+sys.path.insert(0, {raiz!r})
+import pandas as pd
+from utils import loaders
+from utils.format import normalize_frame
+modo, caminho = sys.argv[1], sys.argv[2]
+if modo == "streaming":
+    df = loaders.read_excel_streaming(caminho)
+else:
+    df = normalize_frame(pd.read_excel(caminho, engine="openpyxl"))
+print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, int(df.memory_usage(deep=True).sum()))
+"""
+
+def pico_rss(modo, caminho):
+    """Executa a leitura num processo novo e devolve (pico de RSS em bytes, tamanho da base em bytes)."""
+    raiz = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    saida = subprocess.run(
+        [sys.executable, "-c", _SCRIPT_RSS.format(raiz=raiz), modo, caminho],
+        capture_output=True, text=True, check=True,
+    ).stdout.split()
+    return int(saida[-2]) * 1024, int(saida[-1])  # ru_maxrss vem em KB no Linux
+
+def benchmark_excel(n=1_000_000, fator_limite=3.0):
+    """
+    Pico de memória (RSS) da leitura de uma planilha sintética de n linhas:
+    pd.read_excel + normalização x leitura em blocos (read_excel_streaming).
+    Limite da leitura em blocos: RSS fixo (mesma leitura numa planilha de 1.000 linhas)
+    + fator_limite x tamanho da base normalizada.
+    """
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho = os.path.join(pasta, "sintetica.xlsx")
+        pequena = os.path.join(pasta, "pequena.xlsx")
+        gravar_base(gerar_base_bruta(n), caminho)
+        gravar_base(gerar_base_bruta(1_000), pequena)
+        rss_base, _ = pico_rss("streaming", pequena)
+        rss_stream, tamanho = pico_rss("streaming", caminho)
+        rss_pandas, _ = pico_rss("read_excel", caminho)
+
+    limite = rss_base + fator_limite * tamanho
+    dentro = rss_stream <= limite
+    print(f"Excel ({n:,} linhas, base normalizada {tamanho / 1e6:.1f} MB)")
+    print(f"  read_excel: pico {rss_pandas / 1e6:8.1f} MB")
+    print(f"  em blocos:  pico {rss_stream / 1e6:8.1f} MB  (limite {limite / 1e6:.1f} MB: {'OK' if dentro else 'EXCEDIDO'})")
+    return {"linhas": n, "base_bytes": tamanho, "rss_read_excel": rss_pandas, "rss_streaming": rss_stream,
+            "rss_limite": limite, "dentro_do_limite": dentro}
+
+def benchmark_formatos(n=100_000):
+    """
+    Tempo de carga (parse_file: leitura + normalização) dos mesmos dados sintéticos
+    gravados em cada formato aceito na pasta /data.
+    """
+    from utils.loaders import parse_file
+    from utils.format import invalidate_normalization_cache
+    bruto = gerar_base_bruta(n)
+    gravadores = {
+        ".xlsx": lambda c: bruto.to_excel(c, index=False, engine="xlsxwriter"),
+        ".csv": lambda c: bruto.to_csv(c, index=False, sep=";"),
+        ".parquet": lambda c: bruto.to_parquet(c, index=False),
+        ".feather": lambda c: bruto.to_feather(c),
+    }
+
+    resultados = {}
+    with tempfile.TemporaryDirectory() as pasta:
+        for extensao, gravar in gravadores.items():
+            caminho = os.path.join(pasta, "base" + extensao)
+            gravar(caminho)
+            # Sem o cache de normalização: mede a leitura de verdade a cada repetição
+            tempo, df = cronometrar(lambda c: invalidate_normalization_cache() or parse_file(c), caminho,
+                                    repeticoes=1 if extensao == ".xlsx" else 3)
+            resultados[extensao] = {"segundos": tempo, "bytes": os.path.getsize(caminho), "linhas": len(df)}
+
+    ref = resultados[".xlsx"]["segundos"]
+    print(f"Formatos de entrada ({n:,} linhas)")
+    for extensao, r in resultados.items():
+        print(f"  {extensao:<9} {r['segundos']:8.3f} s  ({ref / max(r['segundos'], 1e-9):5.1f}x)  "
+              f"{r['bytes'] / 1e6:7.1f} MB  {r['linhas']:,} linhas")
+    return resultados
+
+def benchmark_cache(n=100_000):
+    """
+    Custo de uma consulta ao cache da normalização:
+    st.cache_data (hasheia o DataFrame bruto a cada chamada) x impressão digital da origem.
+    Também compara o hash SHA-256 do arquivo com o hash reaproveitado pela impressão digital.
+    """
+    import streamlit as st
+    from utils.format import cached_normalization, cache_normalization, invalidate_normalization_cache
+    from utils.loaders import file_digest, cached_file_digest, file_fingerprint
+
+    bruto = gerar_base_formatos(n)
+
+    @st.cache_data
+    def _via_cache_data(df_raw):
+        return normalize_frame(df_raw)
+
+    _via_cache_data(bruto)
+    t_cache_data, _ = cronometrar(_via_cache_data, bruto, repeticoes=5)
+
+    # Mesma consulta dos loaders: a impressão digital da origem é a chave
+    invalidate_normalization_cache()
+    cache_normalization(("benchmark", n), normalize_frame(bruto))
+    t_fingerprint, _ = cronometrar(cached_normalization, ("benchmark", n), repeticoes=5)
+
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho = os.path.join(pasta, "sintetica.xlsx")
+        gravar_base(gerar_base_bruta(n), caminho)
+        t_sha, _ = cronometrar(file_digest, caminho)
+        cached_file_digest(caminho)
+        t_memo, _ = cronometrar(cached_file_digest, caminho, repeticoes=5)
+        t_stat, _ = cronometrar(file_fingerprint, caminho, repeticoes=5)
+
+    print(f"Consulta ao cache da normalização ({n:,} linhas)")
+    print(f"  st.cache_data (hash do DataFrame): {t_cache_data * 1000:9.2f} ms")
+    print(f"  impressão digital:                 {t_fingerprint * 1000:9.2f} ms  (evita {(t_cache_data - t_fingerprint) * 1000:.2f} ms por consulta)")
+    print(f"  SHA-256 do arquivo:                {t_sha * 1000:9.2f} ms")
+    print(f"  hash reaproveitado (stat):         {t_memo * 1000:9.2f} ms  (stat puro {t_stat * 1000:.3f} ms)")
+    return {"linhas": n, "cache_data_s": t_cache_data, "fingerprint_s": t_fingerprint,
+            "sha256_s": t_sha, "digest_reaproveitado_s": t_memo}
+
+def benchmark_filtros(n=100_000, fator=4):
+    """
+    Latência de aplicar os filtros globais: máscaras sobre a base inteira x índice de filtros,
+    numa base de n e de fator x n linhas (com o índice, o tempo acompanha a seleção).
+    """
+    from utils.filters import build_filter_index, filter_positions
+
+    resultados = {}
+    print(f"Filtros globais (base de {n:,} e {fator * n:,} linhas)")
+    for linhas in (n, fator * n):
+        df = gerar_base_canonica(linhas)
+        t_indice, indice = cronometrar(build_filter_index, df, repeticoes=1)
+        selecoes = {
+            "1 cliente": dict(anos=(2021, 2025), meses=range(1, 13), clientes=["Cliente 7"]),
+            "1 ano, 3 meses, 1 executivo": dict(anos=(2025, 2025), meses=[1, 2, 3], executivos=["Executivo 3"]),
+        }
+        for nome, sel in selecoes.items():
+            emis = indice["emissora"]
+            execs = sel.get("executivos", indice["executivo"])
+            clientes = sel.get("clientes", [])
+
+            def mascaras():
+                r = df[df["ano"].between(*sel["anos"]) & df["emissora"].isin(emis)
+                       & df["executivo"].isin(execs) & df["mes"].isin(list(sel["meses"]))]
+                return r[r["cliente"].isin(clientes)] if clientes else r
+
+            def pelo_indice():
+                selecao = {"periodo": [a * 100 + m for a in range(sel["anos"][0], sel["anos"][1] + 1) for m in sel["meses"]],
+                           "emissora": emis, "executivo": execs}
+                if clientes:
+                    selecao["cliente"] = clientes
+                posicoes = filter_positions(indice, selecao)
+                return df if posicoes is None else df.take(posicoes)
+
+            t_mascara, r_mascara = cronometrar(mascaras, repeticoes=5)
+            t_indice_sel, r_indice = cronometrar(pelo_indice, repeticoes=5)
+            iguais = r_mascara.equals(r_indice)
+            resultados[(linhas, nome)] = {"mascaras_s": t_mascara, "indice_s": t_indice_sel, "iguais": iguais}
+            print(f"  {linhas:>10,} linhas | {nome:<28} máscaras {t_mascara * 1000:8.2f} ms | "
+                  f"índice {t_indice_sel * 1000:7.2f} ms ({len(r_indice):,} linhas, idênticos: {iguais})")
+        print(f"  {linhas:>10,} linhas | construção do índice (uma vez por versão): {t_indice * 1000:.1f} ms")
+    return resultados
+
+def benchmark_cubo(n=100_000):
+    """Agregações das páginas sobre a base x sobre o cubo pré-agregado (utils.cube)."""
+    from utils.cube import build_cube, rollup
+
+    df = gerar_base_canonica(n)
+    # Na base real cada cliente tem um executivo fixo (a base sintética sorteia os dois independentes)
+    codigos = df["cliente"].cat.codes.to_numpy() % len(df["executivo"].cat.categories)
+    df["executivo"] = pd.Categorical.from_codes(codigos, categories=df["executivo"].cat.categories)
+    t_cubo, cubo = cronometrar(build_cube, df, repeticoes=1)
+    print(f"Cubo de agregação ({n:,} linhas -> {len(cubo):,} células, construção {t_cubo * 1000:.1f} ms)")
+    resultados = {"linhas": n, "celulas": len(cubo), "construcao_s": t_cubo}
+    for dims in (["cliente"], ["emissora", "ano"], ["ano", "meslabel", "mes"]):
+        t_base, r_base = cronometrar(
+            lambda: df.groupby(dims, as_index=False, observed=True)[["faturamento", "insercoes"]].sum(), repeticoes=5)
+        t_rollup, r_rollup = cronometrar(rollup, cubo, dims, repeticoes=5)
+        iguais = np.allclose(r_base["faturamento"], r_rollup["faturamento"]) and r_base["insercoes"].equals(r_rollup["insercoes"])
+        resultados[",".join(dims)] = {"base_s": t_base, "cubo_s": t_rollup, "iguais": iguais}
+        print(f"  {','.join(dims):<20} base {t_base * 1000:8.2f} ms | cubo {t_rollup * 1000:7.2f} ms  (iguais: {iguais})")
+    return resultados
+
+def benchmark_backends(n=1_000_000):
+    """
+    Agregações das páginas (tabelas dimensão x ano) em cada motor de utils.backend, na base
+    inteira e num recorte de período. A paridade dos motores fica em tests/test_backend_parity.py.
+    """
+    from analytics.base import period
+    from utils.backend import BACKENDS, arrow_snapshot, pivot_by_year
+
+    df = gerar_base_canonica(n)
+    t_snapshot, _ = cronometrar(arrow_snapshot, df, repeticoes=1)
+    print(f"Motores de agregação ({n:,} linhas, snapshot Arrow {t_snapshot * 1000:.1f} ms uma vez por base)")
+    resultados = {"snapshot_s": t_snapshot}
+    configurado = os.environ.get("ANALYTICS_BACKEND")
+    try:
+        for dimensao in ("cliente", "emissora", "executivo"):
+            tempos = {}
+            for b in BACKENDS:
+                # period() só registra o recorte para o motor configurado
+                os.environ["ANALYTICS_BACKEND"] = b
+                tempos[b] = cronometrar(pivot_by_year, df, dimensao, "faturamento", b, repeticoes=5)[0]
+                # Recorte novo a cada consulta, como nas reexecuções das páginas
+                tempos[f"{b} (período)"] = cronometrar(
+                    lambda: pivot_by_year(period(df, 1, 6), dimensao, "faturamento", b), repeticoes=5)[0]
+            resultados[dimensao] = tempos
+            print(f"  {dimensao:<10} x ano | " + " | ".join(f"{b} {t * 1000:8.2f} ms" for b, t in tempos.items()))
+    finally:
+        if configurado is None:
+            os.environ.pop("ANALYTICS_BACKEND", None)
+        else:
+            os.environ["ANALYTICS_BACKEND"] = configurado
+    return resultados
+
+def _zip_em_memoria(data_dict, filter_info):
+    """Exportação como era antes do streaming: planilha inteira num BytesIO, copiada para o ZIP."""
+    import zipfile
+    planilha = io.BytesIO()
+    with pd.ExcelWriter(planilha, engine="xlsxwriter") as writer:
+        pd.DataFrame([{"Filtros Aplicados": filter_info}]).to_excel(writer, sheet_name="Filtros", index=False)
+        for nome, valor in data_dict.items():
+            valor["df"].to_excel(writer, sheet_name=nome, index=False)
+    zip_buffer = io.BytesIO()
+    with zipfile.ZipFile(zip_buffer, "a", zipfile.ZIP_DEFLATED, False) as zip_file:
+        zip_file.writestr("Relatorio.xlsx", planilha.getvalue())
+    return zip_buffer.getvalue()
+
+def benchmark_exportacao(n=200_000, folga=16 * 1024 * 1024):
+    """
+    Pico de memória (tracemalloc) da exportação de uma tabela de clientes com n linhas:
+    planilha em memória + cópia para o ZIP x create_zip_package (constant_memory, direto no ZIP).
+    Limite do streaming: tamanho do ZIP + folga fixa (não cresce com o número de linhas).
+    """
+    import tracemalloc
+    from utils.export import create_zip_package
+
+    dados = {"Clientes": {"df": gerar_tabela_clientes(n)}}
+
+    resultados = {}
+    for nome, exportar in (("em_memoria", _zip_em_memoria), ("streaming", create_zip_package)):
+        tracemalloc.start()
+        inicio = time.perf_counter()
+        pacote = exportar(dados, "benchmark")
+        segundos = time.perf_counter() - inicio
+        pico = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        tamanho = len(pacote) if isinstance(pacote, bytes) else len(pacote.getbuffer())
+        resultados[nome] = {"pico_bytes": pico, "zip_bytes": tamanho, "segundos": segundos}
+        del pacote
+
+    limite = resultados["streaming"]["zip_bytes"] + folga
+    dentro = resultados["streaming"]["pico_bytes"] <= limite
+    print(f"Exportação ({n:,} linhas, tempos com tracemalloc ligado)")
+    for nome, r in resultados.items():
+        print(f"  {nome:<11} pico {r['pico_bytes'] / 1e6:8.1f} MB | ZIP {r['zip_bytes'] / 1e6:6.1f} MB | {r['segundos']:6.1f} s")
+    print(f"  limite do streaming {limite / 1e6:.1f} MB: {'OK' if dentro else 'EXCEDIDO'}")
+    resultados.update({"linhas": n, "limite_bytes": limite, "dentro_do_limite": dentro})
+    return resultados
+
+if __name__ == "__main__":
+    linhas = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    benchmark_datas(linhas)
+    benchmark_moeda(linhas)
+    benchmark_memoria(linhas)
+    benchmark_excel(linhas)
+    benchmark_formatos(linhas)
+    benchmark_cache(linhas)
+    benchmark_filtros(linhas)
+    benchmark_cubo(linhas)
+    benchmark_backends(linhas)
+    benchmark_exportacao(linhas)
@@ -0,0 +1,164 @@
+# utils/benchmark_suite.py
+# Suíte de escala: para cada tamanho de base sintética (utils.synthetic) mede a normalização,
+# os filtros globais e os cálculos de cada página (analytics/), e grava um relatório JSON
+# com ordem de chaves fixa, para comparar entre commits.
+# Uso: python -m utils.benchmark_suite saida.json [10000,100000,1000000,5000000]
+#      python -m utils.benchmark_suite --comparar antes.json depois.json
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from utils.benchmark import cronometrar
+from utils.synthetic import gerar_base_bruta
+from utils.format import normalize_frame
+from utils.dataset import publish_dataset, dataset_artifact
+from utils.filters import build_filter_index, filter_positions
+from utils.cube import build_cube
+from utils.backend import analytics_backend
+from analytics import (
+    visao_geral, clientes_faturamento, perdas_ganhos, cruzamentos_intersecoes,
+    top10, relatorio_abc, eficiencia,
+)
+
+TAMANHOS = [10_000, 100_000, 1_000_000, 5_000_000]
+
+# Parâmetros da base sintética (os mesmos em todos os tamanhos)
+PARAMETROS = {"clientes": 2000, "emissoras": 4, "executivos": 25, "anos": (2022, 2025), "seed": 0}
+
+# Cálculo de cada página com as opções padrão, sobre o ano inteiro
+PAGINAS = {
+    "visao_geral": lambda df: visao_geral.compute(df, 1, 12),
+    "clientes_faturamento": lambda df: clientes_faturamento.compute(df, 1, 12),
+    "perdas_ganhos": lambda df: perdas_ganhos.compute(df, 1, 12),
+    "cruzamentos_intersecoes": lambda df: cruzamentos_intersecoes.compute(df, 1, 12),
+    "top10": lambda df: top10.compute(df, 1, 12),
+    "relatorio_abc": lambda df: relatorio_abc.compute(df, 1, 12),
+    "eficiencia": lambda df: (eficiencia.compute(df, 1, 12), eficiencia.efficiency_matrix(df, 1, 12)),
+}
+
+def _selecoes(indice):
+    """Seleções típicas dos filtros globais: último ano, um executivo, um cliente."""
+    ultimo = int(max(indice["anos"]))
+    return {
+        "ultimo_ano": {"periodo": [ultimo * 100 + m for m in range(1, 13)]},
+        "1_executivo": {"executivo": indice["executivo"][:1]},
+        "1_cliente": {"cliente": indice["cliente"][:1]},
+    }
+
+def _commit():
+    """Commit atual do repositório (None fora de um checkout git)."""
+    raiz = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=raiz, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+# ==================== MEDIÇÃO ====================
+
+def medir_tamanho(linhas, repeticoes=3):
+    """Tempos (s) de um tamanho de base. A normalização roda uma vez a partir de 1 milhão de linhas."""
+    t_geracao, bruto = cronometrar(lambda: gerar_base_bruta(linhas, **PARAMETROS), repeticoes=1)
+    t_normalizacao, df = cronometrar(normalize_frame, bruto, False, repeticoes=1 if linhas >= 1_000_000 else repeticoes)
+    del bruto
+    gc.collect()
+
+    # Publicada como no app: índice de filtros e cubo construídos uma vez por versão
+    publish_dataset(df, "benchmark", chave=("benchmark_suite", linhas))
+    t_indice, indice = cronometrar(lambda: dataset_artifact(df, "indice_filtros", build_filter_index), repeticoes=1)
+    t_cubo, cubo = cronometrar(lambda: dataset_artifact(df, "cubo", build_cube), repeticoes=1)
+
+    # Filtros: o recorte que aplicar_filtros monta quando a seleção não está no cache
+    filtros = {}
+    for nome, selecao in _selecoes(indice).items():
+        t, recorte = cronometrar(lambda: df.take(filter_positions(indice, selecao)), repeticoes=repeticoes)
+        filtros[nome] = {"segundos": t, "linhas": len(recorte)}
+
+    paginas = {nome: cronometrar(calcular, df, repeticoes=repeticoes)[0] for nome, calcular in PAGINAS.items()}
+
+    resultado = {
+        "linhas_normalizadas": len(df),
+        "geracao_s": t_geracao,
+        "normalizacao_s": t_normalizacao,
+        "indice_filtros_s": t_indice,
+        "cubo_s": t_cubo,
+        "celulas_cubo": len(cubo),
+        "filtros": filtros,
+        "paginas": paginas,
+    }
+    print(f"{linhas:>10,} linhas | normalização {t_normalizacao:7.3f} s | índice {t_indice * 1000:7.1f} ms | "
+          f"cubo {t_cubo * 1000:7.1f} ms ({len(cubo):,} células)")
+    print("             filtros: " + " | ".join(f"{n} {r['segundos'] * 1000:.2f} ms" for n, r in filtros.items()))
+    print("             páginas: " + " | ".join(f"{n} {t * 1000:.1f} ms" for n, t in paginas.items()))
+    return resultado
+
+def executar_suite(tamanhos=TAMANHOS, saida=None, repeticoes=3):
+    """Mede todos os tamanhos e devolve (e grava em 'saida', se informado) o relatório."""
+    relatorio = {
+        "gerado_em": datetime.now().isoformat(timespec="seconds"),
+        "commit": _commit(),
+        "ambiente": {
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "numpy": np.__version__,
+            "pyarrow": pa.__version__,
+            "motor": analytics_backend(),
+            "cpus": os.cpu_count(),
+        },
+        "parametros": dict(PARAMETROS, anos=list(PARAMETROS["anos"]), repeticoes=repeticoes),
+        "resultados": {},
+    }
+    for linhas in tamanhos:
+        relatorio["resultados"][str(linhas)] = medir_tamanho(linhas, repeticoes=repeticoes)
+        gc.collect()
+
+    if saida:
+        with open(saida, "w", encoding="utf-8") as f:
+            json.dump(relatorio, f, indent=2, ensure_ascii=False)
+            f.write("\n")
+        print(f"Relatório: {saida}")
+    return relatorio
+
+# ==================== COMPARAÇÃO ====================
+
+def _tempos(resultados, prefixo=""):
+    """Achata os tempos do relatório: {'100000/paginas/top10': segundos}."""
+    tempos = {}
+    for chave, valor in resultados.items():
+        caminho = f"{prefixo}{chave}"
+        if isinstance(valor, dict):
+            tempos.update(_tempos(valor, caminho + "/"))
+        elif chave.endswith("_s") or chave == "segundos" or prefixo.endswith("paginas/"):
+            tempos[caminho] = valor
+    return tempos
+
+def comparar(antes, depois, limiar=1.10):
+    """Razão depois/antes de cada tempo presente nos dois relatórios; marca quem passou do limiar."""
+    t_antes, t_depois = _tempos(antes["resultados"]), _tempos(depois["resultados"])
+    razoes = {}
+    print(f"{antes.get('commit') or '?'} -> {depois.get('commit') or '?'}")
+    for chave in t_antes:
+        if chave not in t_depois:
+            continue
+        razao = t_depois[chave] / max(t_antes[chave], 1e-9)
+        razoes[chave] = razao
+        marca = "  <-- mais lento" if razao > limiar else ""
+        print(f"  {chave:<45} {t_antes[chave] * 1000:10.2f} ms -> {t_depois[chave] * 1000:10.2f} ms  ({razao:5.2f}x){marca}")
+    return razoes
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 4 and sys.argv[1] == "--comparar":
+        with open(sys.argv[2], encoding="utf-8") as a, open(sys.argv[3], encoding="utf-8") as b:
+            comparar(json.load(a), json.load(b))
+    else:
+        saida = sys.argv[1] if len(sys.argv) > 1 else "benchmark.json"
+        tamanhos = [int(t) for t in sys.argv[2].split(",")] if len(sys.argv) > 2 else TAMANHOS
+        executar_suite(tamanhos, saida)
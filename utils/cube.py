@@ -0,0 +1,82 @@
+# utils/cube.py
+# Cubo de agregação da base: uma linha por (ano, mes, meslabel, emissora, executivo, cliente)
+# com as somas de faturamento e inserções e a contagem de linhas. As páginas agregam o cubo
+# (dezenas a centenas de vezes menor que a base) em vez das linhas originais.
+# O cubo é construído uma vez por versão (utils.dataset); o de um recorte do cache de
+# filtros é o cubo da versão filtrado pela mesma seleção.
+import numpy as np
+import pandas as pd
+
+from utils.backend import register_rows
+from utils.dataset import dataset_artifact, dataset_version_of
+from utils.filters import build_filter_index, filter_positions, filtered_origin
+
+# Granularidade do cubo (meslabel depende só de ano/mes; entra para as páginas agruparem por ela)
+CUBE_DIMENSIONS = ["ano", "mes", "meslabel", "emissora", "executivo", "cliente"]
+
+# Medidas: somas de todas as linhas e só das linhas com faturamento > 0 (página Eficiência)
+CUBE_MEASURES = ["faturamento", "insercoes", "linhas", "faturamento_pos", "insercoes_pos", "linhas_pos"]
+
+# ==================== CONSTRUÇÃO ====================
+
+def build_cube(df):
+    """Agrega a base (esquema canônico) na granularidade do cubo. Chaves nulas viram células próprias."""
+    positivo = df["faturamento"] > 0
+    linhas = df[CUBE_DIMENSIONS + ["faturamento", "insercoes"]].assign(
+        linhas=1,
+        faturamento_pos=df["faturamento"].where(positivo),
+        insercoes_pos=df["insercoes"].where(positivo),
+        linhas_pos=positivo.astype(np.int64),
+    )
+    cubo = linhas.groupby(CUBE_DIMENSIONS, observed=True, sort=True, dropna=False)[CUBE_MEASURES].sum()
+    return cubo.reset_index()
+
+def _filtered_cube(base, selecao):
+    """Cubo da versão filtrado pela seleção que gerou o recorte (mesmas regras de aplicar_filtros)."""
+    cubo = dataset_artifact(base, "cubo", build_cube)
+    indice = dataset_artifact(base, "indice_cubo", lambda df: build_filter_index(cubo))
+    posicoes = filter_positions(indice, selecao)
+    if posicoes is None:
+        return cubo
+    recorte = cubo.take(posicoes).reset_index(drop=True)
+    register_rows(recorte, cubo, posicoes)
+    return recorte
+
+def cube_for(df):
+    """
+    Cubo do DataFrame recebido pelas páginas:
+    - base publicada: construído uma vez por versão;
+    - recorte do cache de filtros: cubo da versão filtrado pela mesma seleção (guardado com o recorte);
+    - qualquer outro DataFrame: agregado na hora.
+    """
+    if dataset_version_of(df) is not None:
+        return dataset_artifact(df, "cubo", build_cube)
+
+    origem = filtered_origin(df)
+    if origem is not None:
+        base, selecao, artefatos = origem
+        if "cubo" not in artefatos:
+            artefatos.setdefault("cubo", _filtered_cube(base, selecao))
+        return artefatos["cubo"]
+    return build_cube(df)
+
+# ==================== CONSULTA ====================
+
+def rollup(cubo, dimensoes, medidas=("faturamento", "insercoes"), **filtros):
+    """
+    Agrega o cubo para qualquer subconjunto das dimensões (lista vazia = total geral).
+    'filtros' restringe antes de agregar: dimensão=valor, dimensão=lista de valores ou,
+    para ano/mes, dimensão=(início, fim) como intervalo fechado.
+    """
+    for dim, valor in filtros.items():
+        if isinstance(valor, tuple) and dim in ("ano", "mes"):
+            cubo = cubo[cubo[dim].between(*valor)]
+        elif isinstance(valor, (list, set)):
+            cubo = cubo[cubo[dim].isin(valor)]
+        else:
+            cubo = cubo[cubo[dim] == valor]
+
+    medidas = list(medidas)
+    if not dimensoes:
+        return cubo[medidas].sum().to_frame().T
+    return cubo.groupby(list(dimensoes), as_index=False, observed=True)[medidas].sum()
@@ -0,0 +1,176 @@
+# utils/dataset.py
+# Registro de bases compartilhado pelo processo inteiro.
+# Cada base publicada vira uma "versão" imutável; as sessões guardam apenas o id
+# da versão em st.session_state, e todas leem o mesmo DataFrame (somente leitura).
+# As sessões sempre seguem a versão atual (o id guardado só serve para avisar que a
+# base mudou). O registro anota qual sessão está com qual versão (bind_session) só
+# para o relatório de memória contar as sessões.
+import sys
+import time
+import threading
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+# Quantas versões antigas ficam disponíveis para sessões que ainda não recarregaram
+MAX_VERSOES = 2
+
+# Sessões sem nenhum rerun há mais que isso (segundos) não contam como ativas
+SESSAO_INATIVA_S = 30 * 60
+
+# ==================== REGISTRO (UM POR PROCESSO) ====================
+
+@st.cache_resource
+def _registro():
+    """Estado global do processo: versões publicadas e versão atual."""
+    return {
+        "lock": threading.Lock(),
+        "versoes": {},      # id -> {"df", "ultima_atualizacao", "chave", "artefatos"}
+        "atual": None,      # id da versão mais recente
+        "sequencia": 0,
+        "sessoes": {},      # id da sessão -> (id da versão, último rerun em time.monotonic())
+    }
+
+def publish_dataset(df, ultima_atualizacao, chave=None):
+    """
+    Publica um DataFrame como nova versão compartilhada e retorna o id da versão.
+    'chave' identifica a origem (ex: caminho + hash do arquivo); publicar de novo a
+    mesma chave reaproveita a versão atual em vez de guardar uma segunda cópia.
+    O DataFrame não deve ser alterado depois de publicado.
+    """
+    reg = _registro()
+    with reg["lock"]:
+        atual = reg["versoes"].get(reg["atual"])
+        if chave is not None and atual is not None and atual["chave"] == chave:
+            return reg["atual"]
+
+        reg["sequencia"] += 1
+        versao = f"v{reg['sequencia']}"
+        reg["versoes"][versao] = {"df": df, "ultima_atualizacao": ultima_atualizacao, "chave": chave}
+        reg["atual"] = versao
+
+        # Descarta as versões mais antigas (as sessões que as usavam passam para a atual)
+        for antiga in list(reg["versoes"])[:-MAX_VERSOES]:
+            del reg["versoes"][antiga]
+        for sessao, (v, visto) in list(reg["sessoes"].items()):
+            if v not in reg["versoes"]:
+                reg["sessoes"][sessao] = (versao, visto)
+        return versao
+
+def bind_session(versao, sessao=None):
+    """
+    Anota que a sessão está com a versão 'versao' (chamada a cada rerun que lê a base).
+    'sessao': id da sessão (padrão: a do script em execução; fora do servidor não faz nada).
+    """
+    if sessao is None:
+        ctx = get_script_run_ctx(suppress_warning=True)
+        if ctx is None:
+            return
+        sessao = ctx.session_id
+    reg = _registro()
+    with reg["lock"]:
+        reg["sessoes"][sessao] = (versao, time.monotonic())
+
+def version_sessions():
+    """Sessões ativas (rerun nos últimos SESSAO_INATIVA_S segundos) por versão: {versao: n}."""
+    reg = _registro()
+    with reg["lock"]:
+        limite = time.monotonic() - SESSAO_INATIVA_S
+        # Sessões fechadas não avisam o registro: saem quando ficam inativas
+        for sessao, (_, visto) in list(reg["sessoes"].items()):
+            if visto < limite:
+                del reg["sessoes"][sessao]
+        contagem = {}
+        for versao, _ in reg["sessoes"].values():
+            contagem[versao] = contagem.get(versao, 0) + 1
+        return contagem
+
+def get_dataset(versao=None):
+    """
+    Retorna (versao, registro) da versão pedida, ou da atual se ela não existir mais.
+    'registro' é um dict com "df", "ultima_atualizacao" e "chave". (None, None) se vazio.
+    """
+    reg = _registro()
+    with reg["lock"]:
+        if versao not in reg["versoes"]:
+            versao = reg["atual"]
+        if versao is None:
+            return None, None
+        return versao, reg["versoes"][versao]
+
+def dataset_version_of(df):
+    """Id da versão publicada a que o DataFrame pertence (None se não for uma base publicada)."""
+    reg = _registro()
+    with reg["lock"]:
+        return next((versao for versao, v in reg["versoes"].items() if v["df"] is df), None)
+
+def published_versions():
+    """Ids das versões ainda em memória."""
+    reg = _registro()
+    with reg["lock"]:
+        return set(reg["versoes"])
+
+def dataset_artifact(df, nome, construir):
+    """
+    Estrutura derivada de uma base publicada (ex: índice de filtros), construída uma única
+    vez por versão com construir(df) e descartada junto com a versão.
+    Para DataFrames que não pertencem a nenhuma versão, apenas constrói (sem guardar).
+    """
+    reg = _registro()
+    with reg["lock"]:
+        registro = next((v for v in reg["versoes"].values() if v["df"] is df), None)
+        if registro is not None and nome in registro.get("artefatos", {}):
+            return registro["artefatos"][nome]
+
+    valor = construir(df)
+    if registro is None:
+        return valor
+    with reg["lock"]:
+        # Outra sessão pode ter construído ao mesmo tempo: fica a primeira
+        return registro.setdefault("artefatos", {}).setdefault(nome, valor)
+
+def current_dataset_key():
+    """Chave de origem da versão atual (None se nada foi publicado)."""
+    reg = _registro()
+    with reg["lock"]:
+        atual = reg["versoes"].get(reg["atual"])
+        return atual["chave"] if atual else None
+
+# ==================== RELATÓRIO DE MEMÓRIA ====================
+
+def frame_bytes(df):
+    """Tamanho em memória do DataFrame (inclui o conteúdo dos textos)."""
+    return int(df.memory_usage(deep=True).sum()) if df is not None else 0
+
+def memory_report(sessoes=None):
+    """
+    Compara o consumo de memória por sessão:
+    - antes: cada sessão guardava sua própria cópia da base em session_state;
+    - depois: as bases ficam uma única vez no processo e a sessão guarda só o id.
+    'sessoes' sobrescreve o número de sessões (padrão: sessões ativas no registro, mínimo 1).
+    """
+    por_versao = version_sessions()
+    reg = _registro()
+    with reg["lock"]:
+        versoes = dict(reg["versoes"])
+        atual = reg["atual"]
+
+    n = sessoes if sessoes is not None else max(sum(por_versao.values()), 1)
+    base_atual = frame_bytes(versoes[atual]["df"]) if atual in versoes else 0
+    compartilhado = sum(frame_bytes(v["df"]) for v in versoes.values())
+    por_sessao_depois = sys.getsizeof(atual or "")
+
+    relatorio = {
+        "sessoes": n,
+        "sessoes_por_versao": por_versao,
+        "versoes_em_memoria": len(versoes),
+        "bytes_por_sessao_antes": base_atual,
+        "bytes_por_sessao_depois": por_sessao_depois,
+        "total_antes": base_atual * n,
+        "total_depois": compartilhado + por_sessao_depois * n,
+    }
+    print(
+        f"Memória ({n} sessões): antes {relatorio['bytes_por_sessao_antes'] / 1e6:.1f} MB/sessão "
+        f"({relatorio['total_antes'] / 1e6:.1f} MB no total) | depois {por_sessao_depois} bytes/sessão "
+        f"+ {compartilhado / 1e6:.1f} MB compartilhados ({relatorio['total_depois'] / 1e6:.1f} MB no total)"
+    )
+    return relatorio
@@ -0,0 +1,17 @@
+# utils/env.py
+# Leitura das variáveis de ambiente de configuração (valores inválidos voltam para o padrão).
+import os
+
+def env_int(nome, padrao, minimo):
+    """Inteiro da variável de ambiente 'nome' (valores inválidos ou abaixo de 'minimo' voltam para o padrão)."""
+    valor = os.environ.get(nome)
+    if valor is None:
+        return padrao
+    try:
+        numero = int(valor)
+        if numero < minimo:
+            raise ValueError
+        return numero
+    except ValueError:
+        print(f"{nome}='{valor}' inválido; usando {padrao}.")
+        return padrao
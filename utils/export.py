@@ -1,9 +1,22 @@
 # utils/export.py
 
 import io
+import os
+import json
+import time
+import hashlib
+import threading
 import zipfile
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 import pandas as pd
 import re
+import xlsxwriter
+import streamlit as st
+from plotly.utils import PlotlyJSONEncoder
+
+from utils.env import env_int
 
 def clean_sheet_name(name):
     """
@@ -35,88 +48,627 @@ def clean_chart_title(title_key):
     
     return s
 
-def to_excel_with_images(data_dict, filter_info):
+# ==================== RENDERIZAÇÃO DOS GRÁFICOS (POOL KALEIDO) ====================
+# Cada worker do pool mantém o próprio PlotlyScope do kaleido (um processo Chromium), aberto
+# uma vez e reaproveitado, quente, nas exportações de todas as sessões. Um scope rasteriza
+# uma figura por vez; com vários, as figuras de uma exportação saem em paralelo.
+
+# Número de workers (processos Chromium) do pool
+EXPORT_RENDER_WORKERS = env_int("EXPORT_RENDER_WORKERS", min(4, os.cpu_count() or 1), 1)
+
+# Tamanho (px) e escala das imagens exportadas
+IMAGE_WIDTH, IMAGE_HEIGHT, IMAGE_SCALE = 1200, 700, 2
+
+_worker = threading.local()
+
+def _kaleido_scope():
+    """PlotlyScope do worker atual, criado na primeira figura (None sem o kaleido 0.x)."""
+    if not hasattr(_worker, "scope"):
+        try:
+            import plotly
+            from kaleido.scopes.plotly import PlotlyScope
+            # Mesma configuração do scope padrão do plotly (plotly.js embutido + MathJax)
+            _worker.scope = PlotlyScope(
+                plotlyjs=os.path.join(os.path.dirname(plotly.__file__), "package_data", "plotly.min.js"),
+                mathjax="https://cdnjs.cloudflare.com/ajax/libs/mathjax/2.7.5/MathJax.js",
+            )
+        except ImportError:
+            _worker.scope = None
+    return _worker.scope
+
+def _render_png(fig_dict):
+    """Rasteriza a figura (dict do plotly) no worker atual. Retorna (bytes PNG, segundos)."""
+    inicio = time.perf_counter()
+    scope = _kaleido_scope()
+    if scope is None:
+        import plotly.io as pio
+        png = pio.to_image(fig_dict, format="png", width=IMAGE_WIDTH, height=IMAGE_HEIGHT,
+                           scale=IMAGE_SCALE, engine="kaleido")
+    else:
+        png = scope.transform(fig_dict, format="png", width=IMAGE_WIDTH, height=IMAGE_HEIGHT, scale=IMAGE_SCALE)
+    return png, time.perf_counter() - inicio
+
+@st.cache_resource
+def _render_pool():
+    """Pool do processo. Na criação, cada worker já abre o seu Chromium com uma figura vazia."""
+    pool = ThreadPoolExecutor(max_workers=EXPORT_RENDER_WORKERS, thread_name_prefix="kaleido")
+    for _ in range(EXPORT_RENDER_WORKERS):
+        pool.submit(_render_png, {"data": [], "layout": {}})
+    return pool
+
+# ==================== CACHE DE IMAGENS ====================
+# PNGs já rasterizados, compartilhados entre sessões. A chave é o hash do JSON da figura
+# (já com o layout de exportação aplicado) + tamanho e escala da imagem: exportar de novo um
+# gráfico que não mudou não passa pelo kaleido. Sai primeiro a imagem menos usada.
+
+# Limites do cache: número de imagens e memória (bytes dos PNGs)
+IMAGE_CACHE_MAX_ENTRIES = 256
+IMAGE_CACHE_MAX_BYTES = 128 * 1024 * 1024
+
+@st.cache_resource
+def _image_cache():
+    """Estado do processo: chave -> PNG (ordem LRU) + contadores."""
+    return {
+        "lock": threading.Lock(),
+        "entradas": OrderedDict(),
+        "bytes": 0,
+        "acertos": 0,
+        "falhas": 0,
+        "descartes": 0,
+    }
+
+def _image_key(fig_dict):
+    """Hash do conteúdo da figura e dos parâmetros de renderização."""
+    conteudo = json.dumps(fig_dict, cls=PlotlyJSONEncoder, sort_keys=True)
+    parametros = f"png|{IMAGE_WIDTH}x{IMAGE_HEIGHT}@{IMAGE_SCALE}|"
+    return hashlib.sha256((parametros + conteudo).encode("utf-8")).hexdigest()
+
+def _cached_image(chave):
+    cache = _image_cache()
+    with cache["lock"]:
+        png = cache["entradas"].get(chave)
+        if png is None:
+            cache["falhas"] += 1
+            return None
+        cache["entradas"].move_to_end(chave)
+        cache["acertos"] += 1
+        return png
+
+def _store_image(chave, png):
+    if len(png) > IMAGE_CACHE_MAX_BYTES:
+        return
+    cache = _image_cache()
+    with cache["lock"]:
+        if chave in cache["entradas"]:
+            return
+        cache["entradas"][chave] = png
+        cache["bytes"] += len(png)
+        while len(cache["entradas"]) > IMAGE_CACHE_MAX_ENTRIES or cache["bytes"] > IMAGE_CACHE_MAX_BYTES:
+            _, antiga = cache["entradas"].popitem(last=False)
+            cache["bytes"] -= len(antiga)
+            cache["descartes"] += 1
+
+def image_cache_stats():
+    """Acertos, falhas, descartes, imagens e bytes do cache de imagens exportadas."""
+    cache = _image_cache()
+    with cache["lock"]:
+        return {
+            "acertos": cache["acertos"],
+            "falhas": cache["falhas"],
+            "descartes": cache["descartes"],
+            "entradas": len(cache["entradas"]),
+            "bytes": cache["bytes"],
+        }
+
+# ==================== ESCRITA EM STREAMING ====================
+# A planilha é gravada no modo constant_memory do xlsxwriter: cada linha vai para um arquivo
+# temporário assim que a próxima começa, então as linhas precisam sair em ordem (o to_excel
+# do pandas grava coluna a coluna e não serve). As tabelas são convertidas em blocos.
+
+# Linhas convertidas para células por vez
+EXPORT_CHUNK_ROWS = 10_000
+
+WORKBOOK_OPTIONS = {
+    "constant_memory": True,
+    "nan_inf_to_errors": True,
+    "default_date_format": "yyyy-mm-dd hh:mm:ss",
+}
+
+# Cabeçalho no mesmo estilo do to_excel do pandas
+HEADER_FORMAT = {"bold": True, "border": 1, "align": "center", "valign": "top"}
+
+def _add_sheet(workbook, sheet_name):
+    """Nova aba; nomes que colidem depois da limpeza ganham sufixo (2), (3)..."""
+    nome, n = sheet_name, 1
+    while workbook.get_worksheet_by_name(nome) is not None:
+        n += 1
+        sufixo = f" ({n})"
+        nome = sheet_name[:31 - len(sufixo)] + sufixo
+    return workbook.add_worksheet(nome)
+
+def _cell_values(serie):
+    """Valores Python da coluna: None no lugar de nulos (célula vazia), infinitos como 'inf' (como o pandas)."""
+    valores = serie.astype(object).where(serie.notna(), None)
+    if pd.api.types.is_float_dtype(serie):
+        valores = valores.mask(np.isposinf(serie), "inf").mask(np.isneginf(serie), "-inf")
+    return valores.tolist()
+
+def _write_frame(workbook, sheet_name, df, cabecalho, index=False):
+    """Cria a aba e grava o DataFrame linha a linha, em blocos de EXPORT_CHUNK_ROWS linhas."""
+    worksheet = _add_sheet(workbook, sheet_name)
+    _write_rows(worksheet, df, cabecalho, index=index)
+    return worksheet
+
+def _write_rows(worksheet, df, cabecalho, index=False):
+    """Grava o DataFrame (cabeçalho + linhas) a partir de A1 numa aba já criada."""
+    inicio_col = 1 if index else 0
+    for j, coluna in enumerate(df.columns):
+        worksheet.write(0, inicio_col + j, coluna, cabecalho)
+
+    for inicio in range(0, len(df), EXPORT_CHUNK_ROWS):
+        bloco = df.iloc[inicio:inicio + EXPORT_CHUNK_ROWS]
+        colunas = [_cell_values(bloco.iloc[:, j]) for j in range(bloco.shape[1])]
+        indice = bloco.index.tolist() if index else None
+        for i, valores in enumerate(zip(*colunas) if colunas else [()] * len(bloco)):
+            linha = inicio + i + 1
+            if index:
+                worksheet.write(linha, 0, indice[i], cabecalho)
+            worksheet.write_row(linha, inicio_col, valores)
+
+def _is_table(value):
+    return 'df' in value and value['df'] is not None and not value['df'].empty
+
+def _prepare_figure(key, fig_to_export):
+    """Aplica o layout de exportação (título limpo e centralizado, fundo transparente) e devolve o dict da figura."""
+    # Limpa o título (Remove "1." e "(Gráfico)")
+    chart_title = clean_chart_title(key)
+
+    # === REGRAS DE LAYOUT ===
+    layout_args = {
+        'title': {
+            'text': chart_title,
+            'y': 0.95,
+            'x': 0.5,
+            'xanchor': 'center',
+            'yanchor': 'top'
+        },
+        'title_font': dict(size=24, color="#003366", family="Arial, sans-serif"),
+        'margin': dict(t=80), 
+        'paper_bgcolor': 'rgba(0,0,0,0)',
+        'plot_bgcolor': 'rgba(0,0,0,0)'
+    }
+
+    # === REGRA EXCLUSIVA PARA EVOLUÇÃO MENSAL ===
+    # Empurra título para cima e gráfico para baixo para não bater na legenda
+    if "Evolução Mensal" in key:
+        layout_args['margin'] = dict(t=150)
+        layout_args['title']['y'] = 0.98
+    
+    fig_to_export.update_layout(**layout_args)
+    return fig_to_export.to_dict()
+
+# ==================== GRÁFICOS NATIVOS DO EXCEL ====================
+# Modo "nativo": as figuras viram gráficos do xlsxwriter ligados a dados gravados na própria
+# aba (editáveis no Excel, sem passar pelo kaleido). Traduzidos: barras (agrupadas ou
+# empilhadas, verticais ou horizontais), barras + linha no eixo secundário, linhas,
+# pizza/rosca e dispersão. O Excel não tem gráfico de mapa de calor: o heatmap sai como a
+# tabela de valores com formatação condicional (escala de cores), sem gráfico. Figuras com
+# outros tipos de trace continuam saindo como imagem.
+
+EXPORT_CHART_MODES = ("imagem", "nativo")
+DEFAULT_EXPORT_CHART_MODE = "imagem"
+
+def export_chart_mode(modo=None):
+    """Modo dos gráficos: o informado ou o de EXPORT_CHART_MODE (valores desconhecidos voltam para o padrão)."""
+    nome = (modo or os.environ.get("EXPORT_CHART_MODE", DEFAULT_EXPORT_CHART_MODE)).strip().lower()
+    if nome not in EXPORT_CHART_MODES:
+        print(f"Modo de gráfico '{nome}' desconhecido; usando '{DEFAULT_EXPORT_CHART_MODE}'.")
+        return DEFAULT_EXPORT_CHART_MODE
+    return nome
+
+def _native_kind(fig):
+    """Tipo de gráfico nativo da figura ("barras", "linhas", "dispersao", "pizza", "calor") ou None."""
+    tipos = [t.type for t in fig.data]
+    if not tipos:
+        return None
+    if tipos == ["pie"]:
+        return "pizza"
+    if tipos == ["heatmap"]:
+        return "calor"
+    if not set(tipos) <= {"bar", "scatter"}:
+        return None
+    if "bar" in tipos:
+        return "barras"
+    return "linhas" if all("lines" in (t.mode or "lines") for t in fig.data) else "dispersao"
+
+def _hex_color(cor):
+    """Cor do plotly ('#abc', '#aabbcc', 'rgb(...)', 'rgba(...)') em '#RRGGBB'; None se não der para converter."""
+    if not isinstance(cor, str):
+        return None
+    cor = cor.strip()
+    if re.fullmatch(r"#[0-9a-fA-F]{6}", cor):
+        return cor
+    if re.fullmatch(r"#[0-9a-fA-F]{3}", cor):
+        return "#" + "".join(c * 2 for c in cor[1:])
+    rgb = re.fullmatch(r"rgba?\(\s*(\d+)\s*,\s*(\d+)\s*,\s*(\d+)\s*(?:,[^)]*)?\)", cor)
+    if rgb:
+        return "#" + "".join(f"{int(c):02x}" for c in rgb.groups())
+    return None
+
+def _as_list(valores):
+    return [] if valores is None else np.asarray(valores).tolist()
+
+def _axis_title(eixo):
+    return eixo.title.text if eixo is not None and eixo.title is not None else None
+
+def _series_names(traces):
+    """Nome de cada trace como cabeçalho de coluna (sem repetições)."""
+    nomes = []
+    for i, t in enumerate(traces):
+        nome = str(t.name) if t.name else f"Série {i + 1}"
+        while nome in nomes:
+            nome += " "
+        nomes.append(nome)
+    return nomes
+
+def _category_table(fig, traces):
     """
-    Gera um arquivo Excel em memória contendo DataFrames e Imagens (Plots).
+    Tabela categoria x trace (barras e linhas): categorias na ordem em que aparecem,
+    valores repetidos da mesma categoria somados (como o plotly empilha), vazio onde o trace não tem.
     """
-    output = io.BytesIO()
+    colunas = {}
+    for nome, t in zip(_series_names(traces), traces):
+        horizontal = t.type == "bar" and t.orientation == "h"
+        categorias, valores = (t.y, t.x) if horizontal else (t.x, t.y)
+        valores = _as_list(valores)
+        categorias = _as_list(categorias) or list(range(len(valores)))
+        serie = pd.Series(pd.to_numeric(pd.Series(valores), errors="coerce").to_numpy(), index=pd.Index(categorias).astype(str))
+        colunas[nome] = serie.groupby(level=0, sort=False).sum(min_count=1)
+    tabela = pd.concat(colunas, axis=1, sort=False)
+    tabela.index.name = _axis_title(fig.layout.xaxis) or "Categoria"
+    return tabela.reset_index()
+
+def _chart_legend(chart, fig, n_series):
+    if fig.layout.showlegend is False or (fig.layout.showlegend is None and n_series == 1):
+        chart.set_legend({"none": True})
+    else:
+        chart.set_legend({"position": "bottom"})
+
+def _bar_line_chart(workbook, sheet_name, fig, n_linhas, tipo):
+    """Barras (agrupadas/empilhadas) e/ou linhas; linhas em 'y2' vão para o eixo secundário."""
+    barras = [t for t in fig.data if t.type == "bar"]
+    linhas = [t for t in fig.data if t.type == "scatter"]
+    categorias = [sheet_name, 1, 0, n_linhas, 0]
+    nomes = dict(zip(map(id, fig.data), range(1, len(fig.data) + 1)))
+
+    grafico = None
+    if barras:
+        horizontal = any(t.orientation == "h" for t in barras)
+        opcoes = {"type": "bar" if horizontal else "column"}
+        if fig.layout.barmode in ("stack", "relative"):
+            opcoes["subtype"] = "stacked"
+        grafico = workbook.add_chart(opcoes)
+        for t in barras:
+            col = nomes[id(t)]
+            serie = {"name": [sheet_name, 0, col], "categories": categorias, "values": [sheet_name, 1, col, n_linhas, col], "gap": 80}
+            cor = _hex_color(t.marker.color)
+            if cor:
+                serie["fill"] = {"color": cor}
+            if t.text is not None:
+                serie["data_labels"] = {"value": True, "num_format": "#,##0"}
+            grafico.add_series(serie)
+
+    if linhas:
+        grafico_linhas = workbook.add_chart({"type": "line"})
+        for t in linhas:
+            col = nomes[id(t)]
+            serie = {"name": [sheet_name, 0, col], "categories": categorias, "values": [sheet_name, 1, col, n_linhas, col],
+                     "y2_axis": bool(barras) and t.yaxis == "y2"}
+            cor = _hex_color(t.line.color) or _hex_color(t.marker.color)
+            if cor:
+                serie["line"] = {"color": cor, "width": 2.25}
+            if "markers" in (t.mode or ""):
+                serie["marker"] = {"type": "circle", "size": 6, **({"fill": {"color": cor}, "border": {"color": cor}} if cor else {})}
+            grafico_linhas.add_series(serie)
+        if any(t.yaxis == "y2" for t in linhas) and barras:
+            grafico_linhas.set_y2_axis({"name": _axis_title(fig.layout.yaxis2), "num_format": "#,##0", "min": 0})
+        if grafico is None:
+            grafico = grafico_linhas
+        else:
+            grafico.combine(grafico_linhas)
+
+    eixo_valores = {"name": _axis_title(fig.layout.yaxis), "num_format": "#,##0", "major_gridlines": {"visible": True, "line": {"color": "#f0f0f0"}}}
+    eixo_categorias = {"name": _axis_title(fig.layout.xaxis) if tipo == "linhas" else None}
+    if barras and any(t.orientation == "h" for t in barras):
+        grafico.set_x_axis(eixo_valores)
+        grafico.set_y_axis({"reverse": True})
+    else:
+        grafico.set_y_axis(eixo_valores)
+        grafico.set_x_axis(eixo_categorias)
+    _chart_legend(grafico, fig, len(fig.data))
+    return grafico
+
+def _pie_chart(workbook, sheet_name, fig, n_linhas):
+    """Pizza (ou rosca, com 'hole'): uma fatia por rótulo, cores das fatias e rótulos do textinfo."""
+    t = fig.data[0]
+    grafico = workbook.add_chart({"type": "doughnut" if t.hole else "pie"})
+    if t.hole:
+        grafico.set_hole_size(min(max(int(t.hole * 100), 10), 90))
+    serie = {"name": [sheet_name, 0, 1], "categories": [sheet_name, 1, 0, n_linhas, 0], "values": [sheet_name, 1, 1, n_linhas, 1]}
+
+    cores = [_hex_color(c) for c in _as_list(t.marker.colors)]
+    if cores and all(cores):
+        serie["points"] = [{"fill": {"color": c}} for c in cores[:n_linhas]]
+
+    info = t.textinfo or "percent"
+    rotulos = {"percentage": "percent" in info, "value": "value" in info, "category": "label" in info}
+    if any(rotulos.values()):
+        serie["data_labels"] = {k: True for k, v in rotulos.items() if v}
+    grafico.add_series(serie)
+    grafico.set_legend({"none": True} if fig.layout.showlegend is False else {"position": "right"})
+    return grafico
+
+def _scatter_table(fig):
+    """Dispersão: para cada trace, colunas [rótulo (hover), x, y] lado a lado."""
+    blocos = []
+    for nome, t in zip(_series_names(fig.data), fig.data):
+        x, y = _as_list(t.x), _as_list(t.y)
+        bloco = {f"{nome} - {_axis_title(fig.layout.xaxis) or 'x'}": x, f"{nome} - {_axis_title(fig.layout.yaxis) or 'y'}": y}
+        rotulos = _as_list(t.hovertext) or _as_list(t.text)
+        if len(rotulos) == len(x):
+            bloco = {nome: rotulos, **bloco}
+        blocos.append(pd.DataFrame(bloco))
+    return pd.concat(blocos, axis=1)
+
+def _scatter_chart(workbook, sheet_name, fig):
+    grafico = workbook.add_chart({"type": "scatter"})
+    col = 0
+    for t in fig.data:
+        rotulado = len(_as_list(t.hovertext) or _as_list(t.text)) == len(_as_list(t.x))
+        cx = col + 1 if rotulado else col
+        n = len(_as_list(t.x))
+        serie = {"name": t.name or f"Série {cx}", "categories": [sheet_name, 1, cx, n, cx], "values": [sheet_name, 1, cx + 1, n, cx + 1],
+                 "marker": {"type": "circle", "size": 7}}
+        cor = _hex_color(t.marker.color)
+        if cor:
+            serie["marker"].update({"fill": {"color": cor}, "border": {"color": cor}})
+        grafico.add_series(serie)
+        col = cx + 2
+    grafico.set_x_axis({"name": _axis_title(fig.layout.xaxis), "num_format": "#,##0", "min": 0})
+    grafico.set_y_axis({"name": _axis_title(fig.layout.yaxis), "num_format": "#,##0", "min": 0,
+                        "major_gridlines": {"visible": True, "line": {"color": "#f0f0f0"}}})
+    _chart_legend(grafico, fig, len(fig.data))
+    return grafico
+
+def _write_native_chart(workbook, worksheet, key, fig, cabecalho):
+    """
+    Grava os dados da figura na aba recebida e insere o gráfico nativo ao lado. Tabela e
+    gráfico são montados antes da escrita: se algo falhar, a aba fica vazia para a mensagem
+    de erro. Mapa de calor: só a tabela com formatação condicional, sem gráfico.
+    """
+    tipo = _native_kind(fig)
+
+    if tipo == "calor":
+        t = fig.data[0]
+        z = np.asarray(t.z, dtype=float)
+        colunas = _as_list(t.x) or list(range(z.shape[1]))
+        linhas = _as_list(t.y) or list(range(z.shape[0]))
+        tabela = pd.DataFrame(z, index=linhas, columns=colunas)
+        _write_rows(worksheet, tabela, cabecalho, index=True)
+        worksheet.set_column(0, len(colunas), 18)
+        # Escala "Blues" do heatmap: do branco-azulado ao azul escuro
+        worksheet.conditional_format(1, 1, len(linhas), len(colunas), {
+            "type": "2_color_scale", "min_color": "#F7FBFF", "max_color": "#08306B",
+        })
+        return
+
+    if tipo == "pizza":
+        t = fig.data[0]
+        valores = pd.to_numeric(pd.Series(_as_list(t.values)), errors="coerce")
+        fatias = pd.Series(valores.to_numpy(), index=pd.Index(_as_list(t.labels)).astype(str))
+        tabela = fatias.groupby(level=0, sort=False).sum().rename_axis("Categoria").reset_index(name="Valor")
+    elif tipo == "dispersao":
+        tabela = _scatter_table(fig)
+    else:
+        tabela = _category_table(fig, fig.data)
+
+    sheet_name = worksheet.name
+    if tipo == "pizza":
+        grafico = _pie_chart(workbook, sheet_name, fig, len(tabela))
+    elif tipo == "dispersao":
+        grafico = _scatter_chart(workbook, sheet_name, fig)
+    else:
+        grafico = _bar_line_chart(workbook, sheet_name, fig, len(tabela), tipo)
+    grafico.set_title({"name": clean_chart_title(key), "name_font": {"size": 14, "color": "#003366"}})
+
+    _write_rows(worksheet, tabela, cabecalho)
+    worksheet.set_column(0, len(tabela.columns) - 1, 18)
+    worksheet.insert_chart(1, len(tabela.columns) + 1, grafico, {"x_scale": 2, "y_scale": 1.5})
+
+# ==================== PROGRESSO E CANCELAMENTO ====================
+# write_excel aceita um dict 'progresso' (abas e imagens prontas / totais), atualizado
+# enquanto a planilha é montada, e um threading.Event 'cancelar': com ele marcado, a
+# montagem para na próxima aba (ou enquanto espera uma imagem) e os gráficos ainda na
+# fila do pool são descartados. Usados pela fila de exportação (utils.export_jobs).
+
+_progress_lock = threading.Lock()
+
+def _advance(progresso, campo, n=1):
+    if progresso is not None:
+        with _progress_lock:
+            progresso[campo] = progresso.get(campo, 0) + n
+
+def _cancelled(cancelar):
+    return cancelar is not None and cancelar.is_set()
+
+def _wait_render(futuro, cancelar, intervalo=0.25):
+    """Resultado do Future (PNG, segundos); None se a exportação for cancelada antes."""
+    while True:
+        if _cancelled(cancelar):
+            return None
+        try:
+            return futuro.result(timeout=intervalo)
+        except TimeoutError:
+            continue
+
+def _render_done(futuro, chave, progresso):
+    """Ao fim de cada renderização: guarda o PNG no cache (mesmo se a exportação foi cancelada)."""
+    if not futuro.cancelled() and futuro.exception() is None:
+        _store_image(chave, futuro.result()[0])
+    _advance(progresso, "imagens")
+
+def _submit_renders(data_dict, nativos=(), progresso=None):
+    """
+    Envia ao pool os gráficos que não estão no cache de imagens, antes de montar a planilha.
+    Retorna {chave: (hash da imagem, PNG do cache | Future de (PNG, segundos) | exceção do layout)}.
+    Gráficos em 'nativos' não passam pelo kaleido.
+    """
+    renders = {}
+    for key, value in data_dict.items():
+        if _is_table(value) or value.get('fig') is None or key in nativos:
+            continue
+        try:
+            fig_dict = _prepare_figure(key, value['fig'])
+            chave = _image_key(fig_dict)
+            png = _cached_image(chave)
+            if png is None:
+                futuro = _render_pool().submit(_render_png, fig_dict)
+                futuro.add_done_callback(lambda f, chave=chave: _render_done(f, chave, progresso))
+                renders[key] = (chave, futuro)
+            else:
+                renders[key] = (chave, png)
+                _advance(progresso, "imagens")
+        except Exception as e:
+            renders[key] = (None, e)
+            _advance(progresso, "imagens")
+    return renders
+
+def _log_render_times(tempos, total):
+    """Tempo de cada figura (no worker; None = veio do cache), da exportação e acertos do cache."""
+    if not tempos:
+        return
+    renderizados = [s for s in tempos.values() if s is not None]
+    acertos = len(tempos) - len(renderizados)
+    print(f"Exportação: {len(tempos)} gráficos em {total:.2f} s "
+          f"({EXPORT_RENDER_WORKERS} workers, soma das renderizações {sum(renderizados):.2f} s)")
+    for key, segundos in tempos.items():
+        print(f"  {'cache' if segundos is None else f'{segundos:6.2f} s':>8}  {key}")
+
+    stats = image_cache_stats()
+    consultas = stats["acertos"] + stats["falhas"]
+    print(f"Cache de imagens: {acertos}/{len(tempos)} acertos nesta exportação | processo "
+          f"{stats['acertos']}/{consultas} ({stats['acertos'] / max(consultas, 1):.0%}), "
+          f"{stats['entradas']} imagens, {stats['bytes'] / 1e6:.1f} MB, {stats['descartes']} descartes")
+
+def write_excel(destino, data_dict, filter_info, chart_mode=None, progresso=None, cancelar=None):
+    """
+    Grava a planilha (DataFrames e gráficos) no arquivo 'destino' (caminho ou objeto de arquivo).
+    Os gráficos vêm do cache de imagens ou são rasterizados em paralelo no pool kaleido; a
+    planilha é montada na ordem de data_dict à medida que as imagens ficam prontas.
+    chart_mode="nativo" grava gráficos do próprio Excel (ver export_chart_mode).
+    'progresso' e 'cancelar': ver PROGRESSO E CANCELAMENTO.
+    """
+    inicio = time.perf_counter()
+    nativos = set()
+    if export_chart_mode(chart_mode) == "nativo":
+        nativos = {key for key, value in data_dict.items()
+                   if not _is_table(value) and value.get('fig') is not None and _native_kind(value['fig'])}
+    if progresso is not None:
+        progresso.update(abas=0, imagens=0, imagens_total=0)
+        progresso["abas_total"] = 1 + sum(1 for key, value in data_dict.items()
+                                          if _is_table(value) or (value.get('fig') is not None))
+        progresso["imagens_total"] = sum(1 for key, value in data_dict.items()
+                                         if not _is_table(value) and value.get('fig') is not None and key not in nativos)
+    renders = _submit_renders(data_dict, nativos, progresso)
+    tempos = {}
     
-    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-        workbook = writer.book
+    workbook = xlsxwriter.Workbook(destino, WORKBOOK_OPTIONS)
+    try:
+        cabecalho = workbook.add_format(HEADER_FORMAT)
         
         # --- ABA 1: FILTROS ---
         df_info = pd.DataFrame([{"Filtros Aplicados": filter_info}])
-        df_info.to_excel(writer, sheet_name="Filtros", index=False)
-        worksheet_filtros = writer.sheets["Filtros"]
+        worksheet_filtros = _write_frame(workbook, "Filtros", df_info, cabecalho)
         worksheet_filtros.set_column('A:A', 100)
         worksheet_filtros.hide_gridlines(2) 
+        _advance(progresso, "abas")
         
         # --- ABAS DE DADOS E GRÁFICOS ---
         for key, value in data_dict.items():
+            if _cancelled(cancelar):
+                break
             sheet_name = clean_sheet_name(key)
             
             # 1. Se for Tabela
-            if 'df' in value and value['df'] is not None and not value['df'].empty:
-                value['df'].to_excel(writer, sheet_name=sheet_name, index=False)
-                worksheet = writer.sheets[sheet_name]
+            if _is_table(value):
+                worksheet = _write_frame(workbook, sheet_name, value['df'], cabecalho)
                 worksheet.set_column('A:Z', 18)
 
-            # 2. Se for Gráfico
-            elif 'fig' in value and value['fig'] is not None:
-                pd.DataFrame().to_excel(writer, sheet_name=sheet_name)
-                worksheet = writer.sheets[sheet_name]
+            # 2. Se for Gráfico nativo
+            elif key in nativos:
+                worksheet = _add_sheet(workbook, sheet_name)
+                try:
+                    _write_native_chart(workbook, worksheet, key, value['fig'], cabecalho)
+                except Exception as e:
+                    print(f"Erro ao gerar gráfico nativo {key}: {e}")
+                    worksheet.write('A1', f"Erro ao gerar gráfico: {e}")
+
+            # 3. Se for Gráfico (imagem)
+            elif key in renders:
+                worksheet = _add_sheet(workbook, sheet_name)
                 worksheet.hide_gridlines(2)
                 
                 try:
-                    # Limpa o título (Remove "1." e "(Gráfico)")
-                    chart_title = clean_chart_title(key)
-                    fig_to_export = value['fig']
-                    
-                    # === REGRAS DE LAYOUT ===
-                    layout_args = {
-                        'title': {
-                            'text': chart_title,
-                            'y': 0.95,
-                            'x': 0.5,
-                            'xanchor': 'center',
-                            'yanchor': 'top'
-                        },
-                        'title_font': dict(size=24, color="#003366", family="Arial, sans-serif"),
-                        'margin': dict(t=80), 
-                        'paper_bgcolor': 'rgba(0,0,0,0)',
-                        'plot_bgcolor': 'rgba(0,0,0,0)'
-                    }
-
-                    # === REGRA EXCLUSIVA PARA EVOLUÇÃO MENSAL ===
-                    # Empurra título para cima e gráfico para baixo para não bater na legenda
-                    if "Evolução Mensal" in key:
-                        layout_args['margin'] = dict(t=150)
-                        layout_args['title']['y'] = 0.98
-                    
-                    fig_to_export.update_layout(**layout_args)
-
-                    # Geração da Imagem
-                    img_bytes = fig_to_export.to_image(
-                        format="png", 
-                        width=1200, 
-                        height=700, 
-                        scale=2, 
-                        engine="kaleido"
-                    )
+                    chave, render = renders[key]
+                    if isinstance(render, Exception):
+                        raise render
+                    if isinstance(render, bytes):
+                        img_bytes, tempos[key] = render, None
+                    else:
+                        resultado = _wait_render(render, cancelar)
+                        if resultado is None:
+                            break
+                        img_bytes, tempos[key] = resultado
                     
                     image_stream = io.BytesIO(img_bytes)
-                    worksheet.insert_image('A1', f'{sheet_name}.png', {'image_data': image_stream})
+                    worksheet.insert_image('A1', f'{worksheet.name}.png', {'image_data': image_stream})
                 except Exception as e:
                     print(f"Erro ao converter imagem {key}: {e}")
                     worksheet.write('A1', f"Erro ao gerar imagem: {e}")
 
-    return output.getvalue()
+            else:
+                continue
+            _advance(progresso, "abas")
+    finally:
+        workbook.close()
+        # Cancelada: gráficos que ainda não começaram saem da fila do pool
+        for _, render in renders.values():
+            if not isinstance(render, (bytes, Exception)):
+                render.cancel()
+
+    _log_render_times(tempos, time.perf_counter() - inicio)
+
+def to_excel_with_images(data_dict, filter_info, chart_mode=None):
+    """
+    Gera um arquivo Excel em memória contendo DataFrames e Imagens (Plots), devolvido como
+    arquivo (BytesIO posicionado no início), como create_zip_package.
+    """
+    output = io.BytesIO()
+    write_excel(output, data_dict, filter_info, chart_mode=chart_mode)
+    output.seek(0)
+    return output
 
-def create_zip_package(data_dict, filter_info, excel_filename="Relatorio.xlsx"):
-    output_excel = to_excel_with_images(data_dict, filter_info)
+def create_zip_package(data_dict, filter_info, excel_filename="Relatorio.xlsx", chart_mode=None, progresso=None, cancelar=None):
+    """
+    Pacote ZIP com a planilha, devolvido como arquivo (BytesIO, aceito pelo st.download_button).
+    A planilha é gravada direto na entrada do ZIP: o único buffer do tamanho da exportação é o
+    próprio ZIP (as linhas das abas passam por arquivos temporários do xlsxwriter).
+    """
+    if not excel_filename.lower().endswith(".xlsx"):
+        excel_filename += ".xlsx"
     zip_buffer = io.BytesIO()
-    with zipfile.ZipFile(zip_buffer, "a", zipfile.ZIP_DEFLATED, False) as zip_file:
-        if not excel_filename.lower().endswith(".xlsx"):
-            excel_filename += ".xlsx"
-        zip_file.writestr(excel_filename, output_excel)
-    return zip_buffer.getvalue()
\ No newline at end of file
+    with zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_DEFLATED) as zip_file:
+        with zip_file.open(excel_filename, "w") as entrada:
+            write_excel(entrada, data_dict, filter_info, chart_mode=chart_mode, progresso=progresso, cancelar=cancelar)
+    zip_buffer.seek(0)
+    return zip_buffer
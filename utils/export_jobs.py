@@ -0,0 +1,261 @@
+# utils/export_jobs.py
+# Fila de exportação em segundo plano: os diálogos de exportação das páginas enviam o
+# pacote ZIP para um pool de threads e acompanham o progresso (abas escritas, imagens
+# renderizadas) em vez de travar a sessão até create_zip_package terminar.
+# Os ZIPs prontos ficam guardados por pouco tempo, só até o download.
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+import streamlit as st
+
+from utils.env import env_int
+from utils.export import create_zip_package
+
+# Exportações montadas ao mesmo tempo (as demais esperam na fila)
+EXPORT_JOB_WORKERS = env_int("EXPORT_JOB_WORKERS", 2, 1)
+# Por quanto tempo (s) um ZIP pronto fica disponível para download
+EXPORT_RESULT_TTL = env_int("EXPORT_RESULT_TTL", 600, 1)
+# Memória máxima dos ZIPs guardados (sai primeiro o mais antigo)
+EXPORT_RESULT_MAX_BYTES = 256 * 1024 * 1024
+# Intervalo (s) entre as atualizações do progresso no diálogo
+EXPORT_POLL_SECONDS = 0.5
+
+ATIVOS = ("fila", "executando")
+
+# ==================== REGISTRO (UM POR PROCESSO) ====================
+
+@st.cache_resource
+def _registro():
+    """Estado do processo: exportações (ordem de envio), pool de threads e contadores."""
+    return {
+        "lock": threading.Lock(),
+        "jobs": OrderedDict(),  # id -> {"status", "progresso", "cancelar", "resultado", "erro", ...}
+        "pool": ThreadPoolExecutor(max_workers=EXPORT_JOB_WORKERS, thread_name_prefix="exportacao"),
+        "sequencia": 0,
+        "bytes": 0,
+        "concluidos": 0,
+        "cancelados": 0,
+        "erros": 0,
+        "expirados": 0,
+    }
+
+def _purge(reg, agora):
+    """Descarta exportações terminadas há mais de EXPORT_RESULT_TTL e ZIPs além do limite de memória."""
+    for job_id, job in list(reg["jobs"].items()):
+        if job["status"] not in ATIVOS and agora - job["fim"] > EXPORT_RESULT_TTL:
+            _forget(reg, job_id)
+            reg["expirados"] += 1
+    for job_id, job in list(reg["jobs"].items()):
+        if reg["bytes"] <= EXPORT_RESULT_MAX_BYTES:
+            break
+        if job["resultado"] is not None:
+            _forget(reg, job_id)
+            reg["expirados"] += 1
+
+def _forget(reg, job_id):
+    job = reg["jobs"].pop(job_id, None)
+    if job is not None and job["resultado"] is not None:
+        reg["bytes"] -= len(job["resultado"])
+
+def _run(reg, job_id, data_dict, filter_info, excel_filename, chart_mode):
+    with reg["lock"]:
+        job = reg["jobs"].get(job_id)
+        if job is None or job["cancelar"].is_set():
+            return
+        job["status"] = "executando"
+        job["inicio"] = time.time()
+
+    try:
+        zip_buffer = create_zip_package(data_dict, filter_info, excel_filename=excel_filename,
+                                        chart_mode=chart_mode, progresso=job["progresso"],
+                                        cancelar=job["cancelar"])
+        resultado, erro = zip_buffer.getvalue(), None
+    except Exception as e:
+        print(f"Erro na exportação {job_id}: {e}")
+        resultado, erro = None, str(e)
+
+    with reg["lock"]:
+        job["fim"] = time.time()
+        if job["cancelar"].is_set():
+            job["status"] = "cancelado"
+        elif erro is not None:
+            job["status"], job["erro"] = "erro", erro
+            reg["erros"] += 1
+        else:
+            job["status"], job["resultado"] = "concluido", resultado
+            reg["concluidos"] += 1
+            if job_id in reg["jobs"]:
+                reg["bytes"] += len(resultado)
+        _purge(reg, job["fim"])
+    print(f"Exportação {job_id} ({excel_filename}): {job['status']} em {job['fim'] - job['inicio']:.2f} s")
+
+# ==================== API ====================
+
+def submit_export(data_dict, filter_info, excel_filename="Relatorio.xlsx", chart_mode=None):
+    """Enfileira create_zip_package com os mesmos argumentos e retorna o id da exportação."""
+    reg = _registro()
+    agora = time.time()
+    with reg["lock"]:
+        _purge(reg, agora)
+        reg["sequencia"] += 1
+        job_id = f"e{reg['sequencia']}"
+        reg["jobs"][job_id] = {
+            "status": "fila",
+            "progresso": {"abas": 0, "abas_total": 0, "imagens": 0, "imagens_total": 0},
+            "cancelar": threading.Event(),
+            "resultado": None,
+            "erro": None,
+            "criado": agora,
+            "inicio": None,
+            "fim": None,
+        }
+    reg["pool"].submit(_run, reg, job_id, data_dict, filter_info, excel_filename, chart_mode)
+    return job_id
+
+def export_status(job_id):
+    """Cópia do estado da exportação (status, progresso, erro, tempos) ou None se não existe mais."""
+    reg = _registro()
+    with reg["lock"]:
+        job = reg["jobs"].get(job_id)
+        if job is None:
+            return None
+        return {
+            "status": job["status"],
+            "progresso": dict(job["progresso"]),
+            "erro": job["erro"],
+            "criado": job["criado"],
+            "inicio": job["inicio"],
+            "fim": job["fim"],
+        }
+
+def export_result(job_id):
+    """Bytes do ZIP de uma exportação concluída (None se não terminou ou já expirou)."""
+    reg = _registro()
+    with reg["lock"]:
+        job = reg["jobs"].get(job_id)
+        return job["resultado"] if job is not None else None
+
+def cancel_export(job_id):
+    """Pede o cancelamento (a montagem para na próxima aba) e esquece a exportação."""
+    reg = _registro()
+    with reg["lock"]:
+        job = reg["jobs"].get(job_id)
+        if job is None:
+            return
+        if job["status"] in ATIVOS:
+            job["cancelar"].set()
+            reg["cancelados"] += 1
+        _forget(reg, job_id)
+
+def export_queue_stats():
+    """Exportações na fila, em execução e guardadas, bytes dos ZIPs e contadores."""
+    reg = _registro()
+    with reg["lock"]:
+        status = [job["status"] for job in reg["jobs"].values()]
+        return {
+            "fila": status.count("fila"),
+            "executando": status.count("executando"),
+            "guardados": status.count("concluido"),
+            "bytes": reg["bytes"],
+            "concluidos": reg["concluidos"],
+            "cancelados": reg["cancelados"],
+            "erros": reg["erros"],
+            "expirados": reg["expirados"],
+        }
+
+# ==================== DIÁLOGO ====================
+
+def _progress_text(job):
+    p = job["progresso"]
+    if job["status"] == "fila":
+        return 0.0, "Aguardando na fila de exportação..."
+    total = p["abas_total"] + p["imagens_total"]
+    fracao = (p["abas"] + p["imagens"]) / total if total else 0.0
+    texto = f"Abas: {p['abas']}/{p['abas_total']}"
+    if p["imagens_total"]:
+        texto += f" | Imagens: {p['imagens']}/{p['imagens_total']}"
+    return min(fracao, 1.0), texto
+
+def _content_key(valor):
+    """
+    Identifica o conteúdo de um item do pacote. As páginas remontam as tabelas a cada
+    reexecução do diálogo, então o id() do objeto não serve: tabelas pelo hash das linhas,
+    gráficos pelo JSON da figura. Se o hash rápido falhar (ex: células com listas), o
+    SHA-256 do CSV da tabela ou do JSON da figura: mais lento, mas igual entre reexecuções.
+    """
+    df, fig = valor.get("df"), valor.get("fig")
+    if df is not None:
+        try:
+            return ("df", tuple(map(str, df.columns)), int(pd.util.hash_pandas_object(df).sum()))
+        except Exception as e:
+            print(f"Hash da tabela indisponível ({e}); usando o SHA-256 do CSV.")
+            return ("df", hashlib.sha256(df.to_csv().encode("utf-8")).hexdigest())
+    if fig is not None:
+        try:
+            texto = fig.to_json()
+        except Exception as e:
+            print(f"JSON da figura indisponível ({e}); usando o dict da figura.")
+            texto = json.dumps(fig.to_plotly_json(), default=str, sort_keys=True)
+        return ("fig", hashlib.sha256(texto.encode("utf-8")).hexdigest())
+    return ("vazio",)
+
+def export_panel(pagina, data_dict, filter_info, excel_filename, zip_filename, flag,
+                 label="Clique para baixar", chart_mode=None):
+    """
+    Corpo dos diálogos de exportação: envia o pacote à fila (uma vez por conteúdo), mostra o
+    progresso até o ZIP ficar pronto e então o botão de download. 'flag' é a chave de
+    st.session_state que mantém o diálogo aberto.
+    """
+    chave = f"export_job_{pagina}"
+    # Mesmo conteúdo (tabelas e gráficos), filtros e arquivo -> mesma exportação
+    assinatura = (
+        tuple((nome, _content_key(valor)) for nome, valor in data_dict.items()),
+        filter_info, excel_filename, chart_mode,
+    )
+    atual = st.session_state.get(chave)
+    job = export_status(atual["id"]) if atual else None
+    if job is None or atual["assinatura"] != assinatura:
+        if atual:
+            cancel_export(atual["id"])
+        job_id = submit_export(data_dict, filter_info, excel_filename=excel_filename, chart_mode=chart_mode)
+        atual = {"id": job_id, "assinatura": assinatura}
+        st.session_state[chave] = atual
+        job = export_status(job_id)
+
+    def fechar():
+        cancel_export(atual["id"])
+        st.session_state.pop(chave, None)
+        st.session_state[flag] = False
+
+    if job["status"] == "concluido":
+        st.download_button(
+            label=label,
+            data=export_result(atual["id"]),
+            file_name=zip_filename,
+            mime="application/zip",
+            on_click=fechar,
+            type="secondary"
+        )
+    elif job["status"] == "erro":
+        st.error(f"Erro ao gerar ZIP: {job['erro']}")
+    elif job["status"] == "cancelado":
+        st.info("Exportação cancelada.")
+    else:
+        # Só a barra de progresso se atualiza a cada EXPORT_POLL_SECONDS; ao terminar,
+        # uma reexecução completa redesenha o diálogo com o download
+        @st.fragment(run_every=EXPORT_POLL_SECONDS)
+        def acompanhar():
+            andamento = export_status(atual["id"])
+            if andamento is None or andamento["status"] not in ATIVOS:
+                st.rerun()
+            fracao, texto = _progress_text(andamento)
+            st.progress(fracao, text=texto)
+        acompanhar()
+
+    if st.button("Cancelar", key="cancel_export", type="secondary"):
+        fechar()
+        st.rerun()
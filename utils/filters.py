@@ -1,8 +1,199 @@
 # utils/filters.py
 import streamlit as st
+import numpy as np
 import pandas as pd
 import json 
+import threading
+from collections import OrderedDict
 from datetime import datetime 
+from utils.dataset import dataset_artifact, dataset_version_of, published_versions
+from utils.backend import register_rows
+from utils.format import emissora_label
+
+# ==================== ÍNDICE DE FILTROS (UM POR VERSÃO DA BASE) ====================
+# Para cada dimensão (período ano/mês, emissora, executivo, cliente) o índice guarda o
+# código de cada linha e as posições das linhas agrupadas por valor (ordem + início de
+# cada valor). Um filtro parte do menor conjunto de posições selecionado e confere as
+# demais dimensões só nessas linhas: o custo acompanha o tamanho da seleção, não da base.
+
+FILTER_DIMENSIONS = ["emissora", "executivo", "cliente"]
+
+def _dimensao(codigos, n_valores):
+    """Posições das linhas agrupadas por código (código -1 = nulo, fica fora dos grupos)."""
+    nulos = int((codigos < 0).sum())
+    contagem = np.bincount(codigos[codigos >= 0], minlength=n_valores)
+    return {
+        "codigos": codigos,
+        "ordem": np.argsort(codigos, kind="stable").astype(np.int32),
+        "inicio": np.concatenate([[0], np.cumsum(contagem)]) + nulos,
+        "presentes": set(np.flatnonzero(contagem).tolist()),
+        "tem_nulos": nulos > 0,
+    }
+
+def build_filter_index(df):
+    """Índice de filtros da base: opções ordenadas dos widgets + posições das linhas por valor."""
+    indice = {
+        "anos": sorted(df["ano"].dropna().unique()),
+        "meses": sorted(df[df["mes"].between(1, 12)]["mes"].dropna().unique()),
+        "dimensoes": {},
+    }
+    for col in FILTER_DIMENSIONS:
+        serie = df[col] if isinstance(df[col].dtype, pd.CategoricalDtype) else df[col].astype("category")
+        categorias = serie.cat.categories
+        dim = _dimensao(serie.cat.codes.to_numpy(), len(categorias))
+        dim["valores"] = {v: i for i, v in enumerate(categorias)}
+        indice["dimensoes"][col] = dim
+        indice[col] = sorted(categorias[sorted(dim["presentes"])])
+
+    # Período: ano * 100 + mês, um grupo por ano/mês presente na base
+    periodos, codigos = np.unique(df["ano"].to_numpy(np.int64) * 100 + df["mes"].to_numpy(np.int64), return_inverse=True)
+    dim = _dimensao(codigos.reshape(-1), len(periodos))
+    dim["valores"] = {int(p): i for i, p in enumerate(periodos)}
+    indice["dimensoes"]["periodo"] = dim
+    return indice
+
+def _restricoes(indice, selecao):
+    """
+    Dimensões da seleção que de fato restringem a base: lista de (linhas, dimensão, códigos).
+    Valores fora da base são ignorados; dimensões com todos os valores marcados ficam de fora.
+    """
+    restricoes = []
+    for nome, valores in selecao.items():
+        dim = indice["dimensoes"][nome]
+        codigos = sorted({dim["valores"][v] for v in valores if v in dim["valores"]})
+        if dim["presentes"] <= set(codigos) and not dim["tem_nulos"]:
+            continue
+        tamanho = sum(int(dim["inicio"][c + 1] - dim["inicio"][c]) for c in codigos)
+        restricoes.append((tamanho, nome, codigos))
+    return restricoes
+
+def filter_positions(indice, selecao, restricoes=None):
+    """
+    Posições (em ordem crescente) das linhas que atendem a {dimensão: valores aceitos}.
+    Dimensões fora de 'selecao', ou com todos os valores marcados, não restringem.
+    Retorna None quando nenhuma dimensão restringe (todas as linhas).
+    """
+    restricoes = list(_restricoes(indice, selecao) if restricoes is None else restricoes)
+    if not restricoes:
+        return None
+
+    # Menor conjunto de posições primeiro; as demais dimensões só conferem essas linhas
+    restricoes.sort(key=lambda r: r[0])
+    _, nome, codigos = restricoes[0]
+    dim = indice["dimensoes"][nome]
+    fatias = [dim["ordem"][dim["inicio"][c]:dim["inicio"][c + 1]] for c in codigos]
+    posicoes = np.concatenate(fatias) if fatias else np.empty(0, dtype=np.int32)
+
+    for _, nome, codigos in restricoes[1:]:
+        dim = indice["dimensoes"][nome]
+        aceitos = np.zeros(len(dim["valores"]) + 1, dtype=bool)  # última posição: código -1 (nulo)
+        aceitos[codigos] = True
+        posicoes = posicoes[aceitos[dim["codigos"][posicoes]]]
+    return np.sort(posicoes)
+
+# ==================== CACHE DE BASES FILTRADAS (LRU) ====================
+# Compartilhado entre sessões: a mesma seleção na mesma versão da base (ex: navegar
+# entre páginas) devolve o recorte já pronto. A chave usa a seleção normalizada
+# (códigos ordenados, valores inexistentes descartados), então a ordem dos itens nos
+# widgets não importa. Os recortes devolvidos são somente leitura.
+
+# Limites do cache: número de recortes e memória (bytes dos arrays copiados da base)
+FILTER_CACHE_MAX_ENTRIES = 32
+FILTER_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+@st.cache_resource
+def _filter_cache():
+    """Estado do processo: chave -> {"df", "bytes", "base", "selecao", "artefatos"} + contadores."""
+    return {
+        "lock": threading.Lock(),
+        "entradas": OrderedDict(),
+        "bytes": 0,
+        "acertos": 0,
+        "falhas": 0,
+        "descartes": 0,
+    }
+
+def _guardar_recorte(cache, chave, recorte, base, selecao):
+    tamanho = int(recorte.memory_usage(deep=False).sum())
+    if tamanho > FILTER_CACHE_MAX_BYTES:
+        return
+    vivas = published_versions()
+    with cache["lock"]:
+        if chave in cache["entradas"]:
+            return
+        cache["entradas"][chave] = {"df": recorte, "bytes": tamanho, "base": base, "selecao": selecao, "artefatos": {}}
+        cache["bytes"] += tamanho
+        # Recortes de versões descartadas saem primeiro; depois os menos usados
+        antigas = [k for k in cache["entradas"] if k[0] not in vivas]
+        while antigas or len(cache["entradas"]) > FILTER_CACHE_MAX_ENTRIES or cache["bytes"] > FILTER_CACHE_MAX_BYTES:
+            k = antigas.pop() if antigas else next(iter(cache["entradas"]))
+            cache["bytes"] -= cache["entradas"].pop(k)["bytes"]
+            cache["descartes"] += 1
+
+def filter_frame(df, indice, selecao):
+    """
+    Recorte da base para a seleção, reaproveitando o cache LRU quando a base é uma versão
+    publicada. Sem restrição nenhuma, devolve a própria base (somente leitura), sem cópia.
+    """
+    restricoes = _restricoes(indice, selecao)
+    if not restricoes:
+        return df
+
+    versao = dataset_version_of(df)
+    if versao is None:
+        posicoes = filter_positions(indice, selecao, restricoes)
+        recorte = df.take(posicoes)
+        register_rows(recorte, df, posicoes)
+        return recorte
+
+    chave = (versao,) + tuple(sorted((nome, tuple(codigos)) for _, nome, codigos in restricoes))
+    cache = _filter_cache()
+    with cache["lock"]:
+        entrada = cache["entradas"].get(chave)
+        if entrada is not None:
+            cache["entradas"].move_to_end(chave)
+            cache["acertos"] += 1
+            return entrada["df"]
+        cache["falhas"] += 1
+
+    posicoes = filter_positions(indice, selecao, restricoes)
+    recorte = df.take(posicoes)
+    register_rows(recorte, df, posicoes)
+    _guardar_recorte(cache, chave, recorte, df, selecao)
+    _log_filter_cache(len(recorte))
+    return recorte
+
+def filtered_origin(df):
+    """
+    Para um recorte do cache: (base da versão, seleção que o gerou, dict de estruturas
+    derivadas guardadas junto com o recorte). None se o DataFrame não veio do cache.
+    """
+    cache = _filter_cache()
+    with cache["lock"]:
+        for entrada in cache["entradas"].values():
+            if entrada["df"] is df:
+                return entrada["base"], entrada["selecao"], entrada["artefatos"]
+    return None
+
+def filter_cache_stats():
+    """Acertos, falhas, descartes, entradas e bytes do cache de bases filtradas."""
+    cache = _filter_cache()
+    with cache["lock"]:
+        return {
+            "acertos": cache["acertos"],
+            "falhas": cache["falhas"],
+            "descartes": cache["descartes"],
+            "entradas": len(cache["entradas"]),
+            "bytes": cache["bytes"],
+        }
+
+def _log_filter_cache(linhas):
+    """Estado do cache de bases filtradas após cada recorte novo (falha do cache)."""
+    stats = filter_cache_stats()
+    consultas = stats["acertos"] + stats["falhas"]
+    print(f"Cache de filtros: recorte novo com {linhas:,} linhas | processo "
+          f"{stats['acertos']}/{consultas} ({stats['acertos'] / max(consultas, 1):.0%}), "
+          f"{stats['entradas']} recortes, {stats['bytes'] / 1e6:.1f} MB, {stats['descartes']} descartes")
 
 def aplicar_filtros(df, cookies):
     """
@@ -10,46 +201,17 @@ def aplicar_filtros(df, cookies):
     Retorna os dados filtrados e as flags de configuração (Rótulos e Totalizador).
     """
 
-    # ==================== NORMALIZAÇÃO ====================
-    df.columns = df.columns.str.strip().str.lower()
-
-    if "mes" not in df.columns: 
-        possiveis = ["mês", "month", "mês referência", "mes_ref", "data", "date"]
-        for c in possiveis:
-            if c in df.columns:
-                if pd.api.types.is_datetime64_any_dtype(df[c]):
-                    df["mes"] = df[c].dt.month
-                else:
-                    df["mes"] = pd.to_numeric(df[c], errors="coerce")
-                break
-        else:
-            df["mes"] = 1
-
-    if "ano" not in df.columns:
-        possiveis_ano = ["ano_ref", "ano referência", "year", "data", "date"]
-        for c in possiveis_ano:
-            if c in df.columns:
-                if pd.api.types.is_datetime64_any_dtype(df[c]):
-                    df["ano"] = df[c].dt.year
-                else:
-                    df["ano"] = pd.to_numeric(df[c], errors="coerce")
-                break
-        else:
-            df["ano"] = 2024
-
-    for col in ["emissora", "executivo", "cliente"]:
-        if col not in df.columns:
-            df[col] = ""
-
-    df["ano"] = pd.to_numeric(df["ano"], errors="coerce").fillna(0).astype(int)
-    df["mes"] = pd.to_numeric(df["mes"], errors="coerce").fillna(0).astype(int)
+    # A base já chega no esquema canônico (utils.format.normalize_frame) e é compartilhada
+    # entre sessões (utils.dataset): nada é renomeado nem convertido aqui.
 
 
     # ==================== DADOS BASE PARA FILTROS ====================
-    anos_disponiveis = sorted(df["ano"].dropna().unique())
-    emisoras = sorted(df["emissora"].dropna().unique())
-    execs = sorted(df["executivo"].dropna().unique())
-    clientes = sorted(df["cliente"].dropna().unique())
+    # Opções e posições vêm do índice da versão (construído uma vez, compartilhado)
+    indice = dataset_artifact(df, "indice_filtros", build_filter_index)
+    anos_disponiveis = indice["anos"]
+    emisoras = indice["emissora"]
+    execs = indice["executivo"]
+    clientes = indice["cliente"]
     
     mes_map = {
         1: "Jan", 2: "Fev", 3: "Mar", 4: "Abr", 5: "Mai", 6: "Jun",
@@ -57,7 +219,7 @@ def aplicar_filtros(df, cookies):
     }
     mes_map_inverso = {v: k for k, v in mes_map.items()}
     
-    meses_disponiveis_num = sorted(df[df["mes"].between(1, 12)]["mes"].dropna().unique())
+    meses_disponiveis_num = indice["meses"]
     meses_disponiveis_nomes = [mes_map.get(m, m) for m in meses_disponiveis_num]
 
 
@@ -77,6 +239,16 @@ def aplicar_filtros(df, cookies):
 
     if "filtro_emis" not in st.session_state:
         st.session_state["filtro_emis"] = emisoras
+    else:
+        # Cookies salvos quando a base guardava os rótulos da Visão Geral (Title Case + apelidos,
+        # ex: 'Th+ Prime'): cada rótulo volta para as emissoras da base que ele representa
+        por_rotulo = {}
+        for e in emisoras:
+            por_rotulo.setdefault(emissora_label(e), []).append(e)
+        salvas = list(st.session_state["filtro_emis"] or [])
+        migradas = list(dict.fromkeys(e for s in salvas for e in ([s] if s in emisoras else por_rotulo.get(s, [s]))))
+        if migradas != salvas:
+            st.session_state["filtro_emis"] = migradas
 
     if "filtro_execs" not in st.session_state:
         st.session_state["filtro_execs"] = execs
@@ -206,15 +378,15 @@ def aplicar_filtros(df, cookies):
     show_labels = st.session_state["filtro_show_labels"]
     show_total = st.session_state["filtro_show_total"]
     
-    df_filtrado = df[
-        (df["ano"].between(ano_1, ano_2)) &
-        (df["emissora"].isin(emis_sel)) &
-        (df["executivo"].isin(exec_sel)) &
-        (df["mes"].isin(meses_sel_num))
-    ]
-
+    selecao = {
+        "periodo": [int(a) * 100 + m for a in range(int(ano_1), int(ano_2) + 1) for m in meses_sel_num],
+        "emissora": emis_sel,
+        "executivo": exec_sel,
+    }
     if cli_sel:
-        df_filtrado = df_filtrado[df_filtrado["cliente"].isin(cli_sel)]
+        selecao["cliente"] = cli_sel
+
+    df_filtrado = filter_frame(df, indice, selecao)
     
     # Salva os filtros no Cookie (silencioso)
     try:
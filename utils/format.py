@@ -1,151 +1,491 @@
-# utils/format.py
-import pandas as pd
-import re
-import streamlit as st
-import numpy as np
-
-PALETTE = ["#007dc3", "#00a8e0", "#7ad1e6", "#004b8d", "#0095d9"]
-
-# Mapeamento de sinônimos para colunas (Normalização)
-COLUMN_ALIASES = {
-    # Data
-    "ref.": "data_ref", "ref": "data_ref", "competencia": "data_ref", "competência": "data_ref", "data": "data_ref", "mês/ano": "data_ref",
-    # Cliente
-    "descrição": "Cliente", "descricao": "Cliente", "cliente": "Cliente", "agência": "Agencia", "agencia": "Agencia", "nome fantasia": "Cliente", "razao social": "Cliente",
-    # Emissora
-    "empresa": "Emissora", "veículo": "Emissora", "veiculo": "Emissora", "radio": "Emissora", "rádio": "Emissora", "emissora": "Emissora",
-    # Executivo
-    "contato coml.": "Executivo", "contato coml": "Executivo", "vendedor": "Executivo", "executivo": "Executivo", "contato": "Executivo",
-    # Faturamento
-    "valor": "Faturamento", "venda": "Faturamento", "faturamento": "Faturamento", "vlr total": "Faturamento", "valor líquido": "Faturamento", "valor liquido": "Faturamento",
-    # Inserções
-    "inserções": "Insercoes", "insercoes": "Insercoes", "inserts": "Insercoes", "qtd": "Insercoes"
-}
-
-def brl(valor):
-    """Formata número para Real (R$)."""
-    try:
-        if pd.isna(valor): return "—"
-        return f"R$ {float(valor):,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
-    except Exception: return str(valor)
-
-def parse_currency_br(valor):
-    """Converte string monetária BR ou suja para float de forma robusta."""
-    if pd.isna(valor) or str(valor).strip() == "": return 0.0
-    if isinstance(valor, (int, float)): return float(valor)
-    
-    s = str(valor).strip().replace("R$", "").replace(" ", "").replace("\u00a0", "")
-    neg = s.startswith("-") or s.startswith("(")
-    s = re.sub(r"[\(\)]", "", s)
-    s = s.replace(".", "").replace(",", ".")
-    
-    try:
-        v = float(s)
-        return -v if neg and v > 0 else v
-    except Exception:
-        return 0.0
-
-def normalize_text(texto):
-    """Normaliza nomes para Título (Primeira Letra Maiúscula) mantendo siglas."""
-    if pd.isna(texto): return ""
-    texto = str(texto).strip()
-    if texto == "": return ""
-    if texto.isupper() and len(texto) <= 3:
-        return texto
-    return " ".join(p.capitalize() for p in texto.split())
-
-def consolidate_executives(name):
-    """
-    Padroniza nomes de executivos e filtra Vendas Externas.
-    """
-    if not isinstance(name, str): return name
-    name_upper = name.upper()
-    
-    # REGRA ATUALIZADA: Vendas Externas são removidas e viram N/A
-    if "VENDA EXTERNA" in name_upper: return None 
-
-    # Regras de Aglomeração
-    if "EDUARDO" in name_upper: return "Eduardo Notomi"
-    if "JULIA" in name_upper: return "Julia Bergo"
-    if "OLGA" in name_upper: return "Olga Luiza"
-    if "WALNER" in name_upper: return "Walner Francisco"
-    
-    return name
-
-@st.cache_data(ttl=600)
-def normalize_dataframe(df_raw: pd.DataFrame) -> pd.DataFrame:
-    """Normaliza estrutura de planilhas de vendas (Novabrasil) com alias robustos."""
-    df = df_raw.copy()
-    
-    # 1. Renomear colunas
-    new_cols = {}
-    for col in df.columns:
-        col_lower = str(col).strip().lower()
-        if col_lower in COLUMN_ALIASES:
-            new_cols[col] = COLUMN_ALIASES[col_lower]
-        else:
-            new_cols[col] = col
-            
-    df = df.rename(columns=new_cols)
-
-    # 2. Garante colunas básicas
-    required = ["Emissora", "Cliente", "Executivo", "Faturamento"]
-    for col in required:
-        if col not in df.columns:
-            df[col] = "" 
-
-    # 3. Normaliza Textos (Capitalização)
-    for col in ["Emissora", "Cliente", "Executivo"]:
-        df[col] = df[col].apply(normalize_text)
-
-    # 4. Consolidação de Executivos (Aglomeração e Filtro)
-    df["Executivo"] = df["Executivo"].apply(consolidate_executives)
-    
-    # Substitui vazios e None (incluindo as Vendas Externas removidas) por "N/A"
-    df["Executivo"] = df["Executivo"].replace(["", "nan", "None"], np.nan).fillna("N/A")
-
-    # 5. Detecção e Conversão de Datas
-    if "data_ref" in df.columns:
-        df["data_ref"] = df["data_ref"].astype(str).str.strip().str.replace("'", "", regex=False)
-        
-        def try_parse_date(val):
-            if not isinstance(val, str): return pd.to_datetime(val, errors="coerce")
-            if re.match(r"^\d{4}-\d{2}-\d{2}$", val): return pd.to_datetime(val, format="%Y-%m-%d", errors="coerce")
-            if re.match(r"^\d{1,2}/\d{1,2}/\d{2,4}$", val): return pd.to_datetime(val, dayfirst=True, errors="coerce")
-            if re.match(r"^\d{1,2}/\d{4}$", val): return pd.to_datetime("01/" + val, dayfirst=True, errors="coerce")
-            if val.replace(".", "").isdigit() and len(val) >= 4:
-                try: return pd.to_datetime(float(val), unit="D", origin="1899-12-30")
-                except: pass
-            return pd.to_datetime(val, errors="coerce")
-
-        df["data_ref"] = df["data_ref"].apply(try_parse_date)
-
-    elif "Ano" in df.columns and "Mês" in df.columns:
-        df["data_ref"] = pd.to_datetime(dict(year=df["Ano"], month=df["Mês"], day=1), errors="coerce")
-
-    df = df.dropna(subset=["data_ref"])
-    
-    if df.empty:
-        return pd.DataFrame()
-
-    # 6. Colunas derivadas de tempo
-    df["Ano"] = df["data_ref"].dt.year
-    df["Mes"] = df["data_ref"].dt.month
-    df["MesLabel"] = df["data_ref"].dt.strftime("%b/%y")
-
-    # 7. Faturamento
-    df["Faturamento"] = df["Faturamento"].apply(parse_currency_br)
-
-    # 8. Tratamento de Inserções e Custo Unitário
-    if "Insercoes" in df.columns:
-        df["Insercoes"] = pd.to_numeric(df["Insercoes"], errors='coerce')
-        insercoes_para_custo = df["Insercoes"].fillna(1).replace(0, 1)
-        df["Custo_Unitario"] = df["Faturamento"] / insercoes_para_custo
-    else:
-        df["Insercoes"] = np.nan
-        df["Custo_Unitario"] = df["Faturamento"]
-
-    df.columns = df.columns.map(str)
-    df = df.reset_index(drop=True)
-
-    return df
\ No newline at end of file
+# utils/format.py
+import pandas as pd
+import re
+import time
+import threading
+from collections import OrderedDict
+import streamlit as st
+import numpy as np
+import pyarrow as pa
+
+PALETTE = ["#007dc3", "#00a8e0", "#7ad1e6", "#004b8d", "#0095d9"]
+
+# Versão das regras de normalize_dataframe.
+# Incrementar sempre que a saída mudar (invalida os snapshots em disco).
+NORMALIZER_VERSION = 4
+
+# Mapeamento de sinônimos para colunas (Normalização)
+COLUMN_ALIASES = {
+    # Data
+    "ref.": "data_ref", "ref": "data_ref", "competencia": "data_ref", "competência": "data_ref", "data": "data_ref", "mês/ano": "data_ref",
+    # Cliente
+    "descrição": "Cliente", "descricao": "Cliente", "cliente": "Cliente", "agência": "Agencia", "agencia": "Agencia", "nome fantasia": "Cliente", "razao social": "Cliente",
+    # Emissora
+    "empresa": "Emissora", "veículo": "Emissora", "veiculo": "Emissora", "radio": "Emissora", "rádio": "Emissora", "emissora": "Emissora",
+    # Executivo
+    "contato coml.": "Executivo", "contato coml": "Executivo", "vendedor": "Executivo", "executivo": "Executivo", "contato": "Executivo",
+    # Faturamento
+    "valor": "Faturamento", "venda": "Faturamento", "faturamento": "Faturamento", "vlr total": "Faturamento", "valor líquido": "Faturamento", "valor liquido": "Faturamento",
+    # Inserções
+    "inserções": "Insercoes", "insercoes": "Insercoes", "inserts": "Insercoes", "qtd": "Insercoes"
+}
+
+def brl(valor):
+    """Formata número para Real (R$)."""
+    try:
+        if pd.isna(valor): return "—"
+        return f"R$ {float(valor):,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+    except Exception: return str(valor)
+
+def parse_currency_br(valor):
+    """Converte string monetária BR ou suja para float de forma robusta."""
+    if pd.isna(valor) or str(valor).strip() == "": return 0.0
+    if isinstance(valor, (int, float)): return float(valor)
+    
+    s = str(valor).strip().replace("R$", "").replace(" ", "").replace("\u00a0", "")
+    neg = s.startswith("-") or s.startswith("(")
+    s = re.sub(r"[\(\)]", "", s)
+    s = s.replace(".", "").replace(",", ".")
+    
+    try:
+        v = float(s)
+        return -v if neg and v > 0 else v
+    except Exception:
+        return 0.0
+
+def normalize_text(texto):
+    """Normaliza nomes para Título (Primeira Letra Maiúscula) mantendo siglas."""
+    if pd.isna(texto): return ""
+    texto = str(texto).strip()
+    if texto == "": return ""
+    if texto.isupper() and len(texto) <= 3:
+        return texto
+    return " ".join(p.capitalize() for p in texto.split())
+
+# Regras de aglomeração de executivos (trecho do nome em maiúsculas -> nome padronizado)
+EXECUTIVE_RULES = [
+    ("EDUARDO", "Eduardo Notomi"),
+    ("JULIA", "Julia Bergo"),
+    ("OLGA", "Olga Luiza"),
+    ("WALNER", "Walner Francisco"),
+]
+
+def consolidate_executives(name):
+    """
+    Padroniza nomes de executivos e filtra Vendas Externas.
+    """
+    if not isinstance(name, str): return name
+    name_upper = name.upper()
+    
+    # REGRA ATUALIZADA: Vendas Externas são removidas e viram N/A
+    if "VENDA EXTERNA" in name_upper: return None 
+
+    # Regras de Aglomeração
+    for trecho, nome_padrao in EXECUTIVE_RULES:
+        if trecho in name_upper: return nome_padrao
+    
+    return name
+
+def try_parse_date(val):
+    """Converte um valor de data_ref (já em texto) para Timestamp, detectando o formato."""
+    if not isinstance(val, str): return pd.to_datetime(val, errors="coerce")
+    if re.match(r"^\d{4}-\d{2}-\d{2}$", val): return pd.to_datetime(val, format="%Y-%m-%d", errors="coerce")
+    if re.match(r"^\d{1,2}/\d{1,2}/\d{2,4}$", val): return pd.to_datetime(val, dayfirst=True, errors="coerce")
+    if re.match(r"^\d{1,2}/\d{4}$", val): return pd.to_datetime("01/" + val, dayfirst=True, errors="coerce")
+    if val.replace(".", "").isdigit() and len(val) >= 4:
+        try: return pd.to_datetime(float(val), unit="D", origin="1899-12-30")
+        except: pass
+    return pd.to_datetime(val, errors="coerce")
+
+# ==================== VERSÕES VETORIZADAS (COLUNA INTEIRA) ====================
+# Produzem exatamente a mesma saída das funções escalares acima, mas operando
+# sobre a Series inteira (métodos .str do pandas e máscaras NumPy) em vez de
+# chamar uma função Python por linha via .apply.
+
+# Número decimal "simples" (sem '_', 'inf', 'nan', dígitos não-ASCII...)
+_DECIMAL_RE = r"[+-]?(\d+\.?\d*|\.\d+)([eE][+-]?\d+)?"
+
+def _parse_float_exact(serie):
+    """
+    Equivalente vetorizado de float(x) para uma Series de textos.
+    Retorna (valores, ok), onde ok indica se float(x) teria funcionado.
+    Obs: pd.to_numeric não é bit a bit idêntico a float(); o cast do Arrow
+    (arredondamento correto, igual ao Python) cobre os decimais simples e o
+    resto passa por float() linha a linha, normalmente poucas linhas.
+    """
+    valores = np.full(len(serie), np.nan)
+    ok = np.zeros(len(serie), dtype=bool)
+    if len(serie) == 0:
+        return valores, ok
+
+    texto = serie.astype("string[pyarrow]")
+    decimal = texto.str.fullmatch(_DECIMAL_RE).fillna(False).to_numpy(dtype=bool)
+    if decimal.any():
+        valores[decimal] = pa.array(texto[decimal]).cast(pa.float64()).to_numpy(zero_copy_only=False)
+        ok[decimal] = True
+
+    brutos = serie.to_numpy(dtype=object)
+    for i in np.flatnonzero(~decimal):
+        try:
+            valores[i] = float(brutos[i])
+            ok[i] = True
+        except (ValueError, TypeError):
+            pass
+    return valores, ok
+
+def normalize_text_series(serie):
+    """Versão vetorizada de normalize_text."""
+    nulos = serie.isna()
+    texto = serie.astype(str).str.strip()
+    sigla = texto.str.isupper() & (texto.str.len() <= 3)
+
+    titulo = (texto.str.split().str.join(" ")
+                   .str.replace(r"\S+", lambda m: m.group(0).capitalize(), regex=True))
+
+    resultado = titulo.where(~sigla, texto)
+    return resultado.mask(nulos, "").astype(object)
+
+def consolidate_executives_series(serie):
+    """Versão vetorizada de consolidate_executives (valores não-texto passam intactos)."""
+    resultado = serie.astype(object).copy()
+    eh_texto = serie.map(lambda v: isinstance(v, str)).astype(bool)
+    upper = serie.where(eh_texto).str.upper()
+
+    # Aplica na ordem inversa para que a primeira regra tenha prioridade (igual aos 'if' em sequência)
+    for trecho, nome_padrao in reversed(EXECUTIVE_RULES):
+        resultado[upper.str.contains(trecho, regex=False, na=False)] = nome_padrao
+    resultado[upper.str.contains("VENDA EXTERNA", regex=False, na=False)] = None
+    return resultado
+
+def parse_currency_br_series(serie):
+    """
+    Versão vetorizada de parse_currency_br ("R$", NBSP, milhar com ponto,
+    decimal com vírgula, negativos com '-' ou parênteses; inválidos viram 0.0).
+    Colunas já numéricas (o Excel costuma entregar float64) não passam pelo texto.
+    """
+    if pd.api.types.is_numeric_dtype(serie):
+        return serie.astype(float).fillna(0.0)
+
+    brutos = serie.to_numpy(dtype=object)
+    resultado = np.zeros(len(serie))
+
+    texto = serie.astype(str).str.strip()
+    vazio = (serie.isna() | (texto == "")).to_numpy()
+    # Células numéricas soltas numa coluna de texto (float(valor) direto)
+    if pd.api.types.infer_dtype(serie, skipna=True) == "string":
+        numerico = np.zeros(len(serie), dtype=bool)
+    else:
+        numerico = np.array([isinstance(v, (int, float)) for v in brutos], dtype=bool) & ~vazio
+    if numerico.any():
+        resultado[numerico] = brutos[numerico].astype(float)
+
+    pendentes = ~vazio & ~numerico
+    if pendentes.any():
+        # Substituições literais em strings Arrow (laço em C++, não em Python)
+        s = texto[pendentes].astype("string[pyarrow]")
+        for trecho in ["R$", " ", "\u00a0"]:
+            s = s.str.replace(trecho, "", regex=False)
+        neg = (s.str.startswith("-") | s.str.startswith("(")).to_numpy(dtype=bool)
+        for trecho in ["(", ")", "."]:
+            s = s.str.replace(trecho, "", regex=False)
+        s = s.str.replace(",", ".", regex=False)
+
+        valores, ok = _parse_float_exact(s)
+        valores = np.where(neg & (valores > 0), -valores, valores)
+        resultado[pendentes] = np.where(ok, valores, 0.0)
+
+    return pd.Series(resultado, index=serie.index)
+
+# Buckets de formato de data (ordem = prioridade, igual a try_parse_date).
+# (nome, regex que classifica a linha, prefixo adicionado ao texto, formato explícito)
+# Formato None = sem formato fixo; a linha vai direto para o parser genérico.
+DATE_BUCKETS = [
+    ("iso", r"^\d{4}-\d{2}-\d{2}$", "", "%Y-%m-%d"),
+    ("dd/mm/aaaa", r"^\d{1,2}/\d{1,2}/\d{2,4}$", "", "%d/%m/%Y"),
+    ("mm/aaaa", r"^\d{1,2}/\d{4}$", "01/", "%d/%m/%Y"),
+    ("serial", None, "", None),
+    ("iso_hora", r"^\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}$", "", "%Y-%m-%d %H:%M:%S"),
+]
+
+def classify_date_formats(texto):
+    """
+    Classifica cada linha (texto já limpo) em um bucket de DATE_BUCKETS ou 'outros'.
+    Retorna dict nome -> máscara booleana (mutuamente exclusivas).
+    """
+    livres = pd.Series(True, index=texto.index)
+    mascaras = {}
+    for nome, regex, _, _ in DATE_BUCKETS:
+        if nome == "serial":
+            mask = texto.str.replace(".", "", regex=False).str.isdigit() & (texto.str.len() >= 4)
+        else:
+            mask = texto.str.match(regex)
+        mascaras[nome] = livres & mask
+        livres = livres & ~mask
+    mascaras["outros"] = livres
+    return mascaras
+
+def parse_dates_series(serie, relatorio=None):
+    """
+    Versão vetorizada de try_parse_date: classifica a coluna em buckets de
+    formato (máscaras regex) e converte cada bucket numa única chamada
+    pd.to_datetime com formato explícito. Linhas que o formato explícito
+    recusa caem no mesmo parser genérico da versão escalar (mesmo resultado).
+
+    Se 'relatorio' (dict) for informado, recebe a contagem de linhas por
+    bucket, quantas precisaram do fallback e quantas ficaram sem data.
+    """
+    texto = serie.astype(str).str.strip().str.replace("'", "", regex=False)
+    resultado = pd.Series(pd.NaT, index=texto.index, dtype="datetime64[ns]")
+    if texto.empty:
+        if relatorio is not None:
+            relatorio.update({nome: 0 for nome, _, _, _ in DATE_BUCKETS}, outros=0, fallback=0, invalidas=0)
+        return resultado
+
+    mascaras = classify_date_formats(texto)
+    fallback = pd.Series(False, index=texto.index)
+
+    for nome, _, prefixo, formato in DATE_BUCKETS:
+        mask = mascaras[nome]
+        if not mask.any():
+            continue
+        if nome == "serial":
+            dias, _ = _parse_float_exact(texto[mask])
+            resultado[mask] = pd.to_datetime(pd.Series(dias, index=texto[mask].index), unit="D", origin="1899-12-30", errors="coerce")
+        else:
+            resultado[mask] = pd.to_datetime(prefixo + texto[mask], format=formato, errors="coerce")
+        # ISO inválido (ex: mês 13) fica NaT, como na versão escalar
+        if nome != "iso":
+            fallback = fallback | (mask & resultado.isna())
+
+    # Fallback: formato fora do padrão (ex: mês > 12 em dd/mm, ano com 2 dígitos,
+    # serial inválido) -> mesmo parser genérico da versão escalar
+    dayfirst = (mascaras["dd/mm/aaaa"] | mascaras["mm/aaaa"]) & fallback
+    if dayfirst.any():
+        prefixo = pd.Series("", index=texto.index).mask(mascaras["mm/aaaa"], "01/")
+        resultado[dayfirst] = pd.to_datetime((prefixo + texto)[dayfirst], dayfirst=True, format="mixed", errors="coerce")
+    genericos = mascaras["outros"] | (fallback & ~dayfirst)
+    if genericos.any():
+        resultado[genericos] = pd.to_datetime(texto[genericos], format="mixed", errors="coerce")
+
+    if relatorio is not None:
+        relatorio.update({nome: int(mask.sum()) for nome, mask in mascaras.items()})
+        relatorio["fallback"] = int(fallback.sum())
+        relatorio["invalidas"] = int(resultado.isna().sum())
+    return resultado
+
+def normalize_categorical(serie, normalizar):
+    """
+    Aplica 'normalizar' apenas aos valores distintos da coluna e devolve o
+    resultado como Categorical (um código por linha + categorias únicas).
+    Clientes, emissoras e executivos se repetem muito, então a normalização
+    roda sobre algumas centenas de valores em vez de todas as linhas.
+    """
+    nulos = serie.isna()
+    chave = serie if pd.api.types.infer_dtype(serie, skipna=True) in ("string", "empty") else serie.astype(str).mask(nulos)
+    codigos, unicos = pd.factorize(chave, use_na_sentinel=True)
+
+    # Nulos viram um valor extra no fim da lista, normalizado como os demais
+    valores = pd.Series(list(unicos) + [None], dtype=object)
+    codigos = np.where(codigos < 0, len(unicos), codigos)
+
+    # Valores distintos podem convergir para o mesmo texto (ex: 'ANA' / 'ana ').
+    # Categorias ordenadas: groupby/sort ficam na mesma ordem do texto puro.
+    codigos_norm, categorias = pd.factorize(normalizar(valores), sort=True, use_na_sentinel=True)
+    return pd.Series(pd.Categorical.from_codes(codigos_norm[codigos], categories=categorias), index=serie.index)
+
+# Nomes abreviados de emissoras -> nome canônico (após o Title Case). Só para exibição na
+# Visão Geral: a base mantém as emissoras como vieram (com a capitalização de normalize_text),
+# que é o que as demais páginas, os filtros e os cookies usam.
+EMISSORA_ALIASES = {
+    "Thathi": "Thathi Tv",
+    "Th+": "Th+ Prime",
+}
+
+def emissora_label(nome):
+    """Rótulo de exibição da emissora: Title Case + nome canônico (ex: 'TH+' -> 'Th+ Prime')."""
+    rotulo = str(nome).strip().title()
+    return EMISSORA_ALIASES.get(rotulo, rotulo)
+
+def _normalize_executivo(serie):
+    """Capitalização + consolidação de executivos (vazios e Vendas Externas viram 'N/A')."""
+    resultado = consolidate_executives_series(normalize_text_series(serie))
+    return resultado.replace(["", "nan", "None"], np.nan).fillna("N/A")
+
+# ==================== CACHE DA NORMALIZAÇÃO ====================
+# Chaveado pela impressão digital da origem (ex: caminho + tamanho + mtime, ou hash do
+# conteúdo), calculada uma vez por quem lê o arquivo. Diferente do st.cache_data, o
+# DataFrame bruto nunca é hasheado a cada consulta e nada expira por tempo: uma entrada
+# sai por invalidate_normalization_cache ou por ser a menos usada quando passa do limite.
+# O resultado durável é o armazenamento particionado (utils.loaders.sync_store), que
+# descarta a entrada assim que grava as partições: o cache só segura a base entre a
+# leitura e a gravação, sem duplicar as versões publicadas em utils.dataset.
+
+# Memória máxima das bases normalizadas no cache (bases maiores não são guardadas)
+NORMALIZATION_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+@st.cache_resource
+def _normalization_cache():
+    """Estado do processo: impressão digital -> (base normalizada, segundos gastos, bytes) + contadores."""
+    return {
+        "lock": threading.Lock(),
+        "entradas": OrderedDict(),
+        "bytes": 0,
+        "acertos": 0,
+        "falhas": 0,
+        "segundos_evitados": 0.0,  # tempo de normalização economizado pelos acertos
+    }
+
+def cached_normalization(fingerprint):
+    """Base normalizada guardada para a impressão digital, ou None."""
+    cache = _normalization_cache()
+    with cache["lock"]:
+        entrada = cache["entradas"].get(fingerprint)
+        if entrada is None:
+            cache["falhas"] += 1
+            return None
+        cache["entradas"].move_to_end(fingerprint)
+        cache["acertos"] += 1
+        cache["segundos_evitados"] += entrada[1]
+        return entrada[0]
+
+def cache_normalization(fingerprint, df, segundos=0.0):
+    """Guarda a base normalizada (somente leitura daqui em diante) para a impressão digital."""
+    tamanho = int(df.memory_usage(deep=True).sum())
+    cache = _normalization_cache()
+    with cache["lock"]:
+        _drop_normalization(cache, fingerprint)
+        if tamanho > NORMALIZATION_CACHE_MAX_BYTES:
+            return
+        cache["entradas"][fingerprint] = (df, segundos, tamanho)
+        cache["bytes"] += tamanho
+        while cache["bytes"] > NORMALIZATION_CACHE_MAX_BYTES:
+            _, (_, _, antigo) = cache["entradas"].popitem(last=False)
+            cache["bytes"] -= antigo
+
+def _drop_normalization(cache, fingerprint):
+    entrada = cache["entradas"].pop(fingerprint, None)
+    if entrada is not None:
+        cache["bytes"] -= entrada[2]
+
+def invalidate_normalization_cache(fingerprint=None):
+    """
+    Remove a entrada da impressão digital (ou todas, se None). Chamada quando a origem
+    muda ou quando a base já foi gravada no armazenamento particionado.
+    """
+    cache = _normalization_cache()
+    with cache["lock"]:
+        if fingerprint is None:
+            cache["entradas"].clear()
+            cache["bytes"] = 0
+        else:
+            _drop_normalization(cache, fingerprint)
+
+def normalization_cache_stats():
+    """Acertos, falhas, entradas, bytes e segundos de normalização evitados pelo cache."""
+    cache = _normalization_cache()
+    with cache["lock"]:
+        return {
+            "acertos": cache["acertos"],
+            "falhas": cache["falhas"],
+            "entradas": len(cache["entradas"]),
+            "bytes": cache["bytes"],
+            "segundos_evitados": cache["segundos_evitados"],
+        }
+
+def normalize_dataframe(df_raw: pd.DataFrame) -> pd.DataFrame:
+    """
+    Normaliza estrutura de planilhas de vendas (Novabrasil) com alias robustos.
+    O reaproveitamento por origem fica com quem lê o arquivo (utils.loaders), via
+    cached_normalization / cache_normalization.
+    """
+    return normalize_frame(df_raw)
+
+def normalize_frame(df_raw: pd.DataFrame) -> pd.DataFrame:
+    """
+    Mesma normalização de normalize_dataframe, sem o cache do Streamlit (usada pelos workers de ingestão).
+    A contagem de formatos de data fica em df.attrs["formatos_data"]; quem lê o arquivo a imprime.
+    """
+    df = df_raw.copy()
+    
+    # 1. Renomear colunas
+    new_cols = {}
+    for col in df.columns:
+        col_lower = str(col).strip().lower()
+        if col_lower in COLUMN_ALIASES:
+            new_cols[col] = COLUMN_ALIASES[col_lower]
+        else:
+            new_cols[col] = col
+            
+    df = df.rename(columns=new_cols)
+
+    # 2. Garante colunas básicas
+    required = ["Emissora", "Cliente", "Executivo", "Faturamento"]
+    for col in required:
+        if col not in df.columns:
+            df[col] = "" 
+
+    # 3. Normaliza Textos (Capitalização) sobre os valores distintos -> Categorical
+    df["Emissora"] = normalize_categorical(df["Emissora"], normalize_text_series)
+    df["Cliente"] = normalize_categorical(df["Cliente"], normalize_text_series)
+
+    # 4. Consolidação de Executivos (Aglomeração e Filtro)
+    # Vazios e None (incluindo as Vendas Externas removidas) viram "N/A"
+    df["Executivo"] = normalize_categorical(df["Executivo"], _normalize_executivo)
+
+    # 5. Detecção e Conversão de Datas
+    if "data_ref" in df.columns:
+        formatos = {}
+        df["data_ref"] = parse_dates_series(df["data_ref"], relatorio=formatos)
+        df.attrs["formatos_data"] = formatos
+
+    elif "Ano" in df.columns and "Mês" in df.columns:
+        df["data_ref"] = pd.to_datetime(dict(year=df["Ano"], month=df["Mês"], day=1), errors="coerce")
+
+    df = df.dropna(subset=["data_ref"])
+    
+    if df.empty:
+        return pd.DataFrame()
+
+    # Categorias que só existiam em linhas descartadas (sem data) saem da lista
+    for col in ["Emissora", "Cliente", "Executivo"]:
+        df[col] = df[col].cat.remove_unused_categories()
+
+    # 6. Colunas derivadas de tempo
+    df["Ano"] = df["data_ref"].dt.year
+    df["Mes"] = df["data_ref"].dt.month
+    df["MesLabel"] = df["data_ref"].dt.strftime("%b/%y")
+
+    # 7. Faturamento
+    df["Faturamento"] = parse_currency_br_series(df["Faturamento"])
+
+    # 8. Tratamento de Inserções e Custo Unitário
+    if "Insercoes" in df.columns:
+        df["Insercoes"] = pd.to_numeric(df["Insercoes"], errors='coerce')
+        insercoes_para_custo = df["Insercoes"].fillna(1).replace(0, 1)
+        df["Custo_Unitario"] = df["Faturamento"] / insercoes_para_custo
+    else:
+        df["Insercoes"] = np.nan
+        df["Custo_Unitario"] = df["Faturamento"]
+
+    df = df.reset_index(drop=True)
+
+    return canonical_schema(df)
+
+# ==================== ESQUEMA CANÔNICO ====================
+# Formato entregue às páginas: nomes em minúsculas, textos como category, ano/mes
+# int16 e valores float64. Tudo é resolvido na ingestão; as páginas não renomeiam
+# nem convertem nada a cada rerun.
+
+CANONICAL_DTYPES = {
+    "ano": "int16",
+    "mes": "int16",
+    "faturamento": "float64",
+    "custo_unitario": "float64",
+    "insercoes": "float64",
+}
+
+def canonical_schema(df):
+    """Aplica o esquema canônico à base normalizada (colunas repetidas: vale a derivada, a última)."""
+    df.columns = df.columns.map(lambda c: str(c).strip().lower())
+    df = df.loc[:, ~df.columns.duplicated(keep="last")]
+    return df.astype({c: t for c, t in CANONICAL_DTYPES.items() if c in df.columns})
\ No newline at end of file
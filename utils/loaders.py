@@ -1,82 +1,802 @@
-# utils/loaders.py
-import os
-import pandas as pd
-import streamlit as st
-from datetime import datetime
-from .format import normalize_dataframe
-
-def load_main_base():
-    """
-    Carrega a base principal.
-    Prioridade:
-    1. Procura em st.session_state (se o usuário fez upload).
-    2. Procura na pasta /data (arquivo .xlsx).
-    Retorna (df, data_modificação) ou (None, None) se nada for encontrado.
-    """
-    
-    # --- 1. Verifica se o usuário já fez upload de um arquivo nesta sessão ---
-    if "uploaded_dataframe" in st.session_state and st.session_state.uploaded_dataframe is not None:
-        df = st.session_state.uploaded_dataframe
-        data_modificacao = st.session_state.get("uploaded_timestamp", "Sessão Atual")
-        return df, data_modificacao
-
-    # --- 2. Se não houver, procura na pasta /data ---
-    base_dir = os.path.dirname(os.path.dirname(__file__)) 
-    data_dir = os.path.join(base_dir, "data")
-
-    if not os.path.exists(data_dir):
-        os.makedirs(data_dir) # Cria a pasta se não existir
-
-    try:
-        excel_files = [f for f in os.listdir(data_dir) if f.lower().endswith(".xlsx")]
-    except FileNotFoundError:
-        st.error(f"❌ Erro: O diretório '{data_dir}' não foi encontrado.")
-        return None, None
-
-    if excel_files:
-        file_path = os.path.join(data_dir, excel_files[0]) # Pega o primeiro .xlsx que encontrar
-        try:
-            df_raw = pd.read_excel(file_path, engine="openpyxl")
-            df = normalize_dataframe(df_raw)
-            if df.empty:
-                st.warning("⚠️ Base encontrada, mas sem dados válidos.")
-                return None, None
-
-            # --- NOVA LÓGICA: PEGAR ÚLTIMO MÊS/ANO DA BASE ---
-            ultima_atualizacao = "N/A" 
-            if "data_ref" in df.columns and pd.api.types.is_datetime64_any_dtype(df["data_ref"]):
-                
-                # Pega a data mais recente válida
-                latest_date = df["data_ref"].max()
-                
-                if pd.notna(latest_date):
-                    latest_month = latest_date.month
-                    latest_year = latest_date.year
-                    # Formata como MM/YYYY (02d garante o zero à esquerda)
-                    ultima_atualizacao = f"{latest_month:02d}/{latest_year}"
-                else:
-                    ultima_atualizacao = "Data Inválida"
-
-            else:
-                # Fallback para o tempo de modificação do arquivo se data_ref não estiver disponível
-                mod_time = datetime.fromtimestamp(os.path.getmtime(file_path))
-                ultima_atualizacao = mod_time.strftime("%d/%m/%Y")
-            # --- FIM DA NOVA LÓGICA ---
-
-            # Salva no cache da sessão para não precisar ler do disco toda hora
-            st.session_state.uploaded_dataframe = df
-            st.session_state.uploaded_timestamp = ultima_atualizacao
-            
-            return df, ultima_atualizacao
-        
-        except Exception as e:
-            st.error(f"Erro ao ler base {file_path}: {e}")
-            return None, None
-
-    # --- 3. Se não encontrou em nenhum lugar ---
-    return None, None
-
-
-def load_crowley_base():
-    """Placeholder para base Crowley (não usada atualmente)."""
+# utils/loaders.py
+import io
+import os
+import csv
+import json
+import time
+import hashlib
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import streamlit as st
+from datetime import datetime
+from .format import (
+    normalize_frame, NORMALIZER_VERSION, COLUMN_ALIASES,
+    cached_normalization, cache_normalization, invalidate_normalization_cache, normalization_cache_stats,
+)
+from .dataset import publish_dataset, get_dataset, current_dataset_key, bind_session
+
+# Pasta (dentro de /data) do armazenamento particionado: uma partição Parquet por Ano/Mes
+STORE_DIR_NAME = ".store"
+MANIFEST_NAME = "manifest.json"
+
+# Formatos aceitos na pasta /data e no upload (extensão -> leitor)
+DATA_EXTENSIONS = (".xlsx", ".parquet", ".feather", ".arrow", ".csv")
+
+# Planilhas a partir deste tamanho são lidas em blocos (memória limitada)
+STREAMING_MIN_BYTES = 20 * 1024 * 1024
+# Linhas por bloco na leitura em blocos
+EXCEL_CHUNK_ROWS = 10_000
+
+# Máximo de processos para ler planilhas em paralelo
+MAX_INGEST_WORKERS = max(1, min(4, (os.cpu_count() or 1)))
+
+# Uma sincronização do armazenamento por vez (sessões simultâneas no mesmo processo)
+_STORE_LOCK = threading.Lock()
+
+# ==================== HASH DAS PLANILHAS ====================
+
+def file_digest(file_path, chunk_size=1 << 20):
+    """Calcula o hash SHA-256 do conteúdo do arquivo (leitura em blocos)."""
+    h = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+# ==================== IMPRESSÃO DIGITAL DOS ARQUIVOS ====================
+# O hash do conteúdo só é recalculado quando caminho, tamanho ou mtime mudam;
+# a impressão digital (barata, via stat) também é a chave do cache de normalização.
+
+@st.cache_resource
+def _digest_cache():
+    """Estado do processo: caminho -> (impressão digital, hash) + contadores."""
+    return {"lock": threading.Lock(), "arquivos": {}, "acertos": 0, "falhas": 0, "segundos_evitados": 0.0}
+
+def file_fingerprint(file_path):
+    """Impressão digital barata do arquivo: (caminho absoluto, tamanho, mtime em ns)."""
+    info = os.stat(file_path)
+    return (os.path.abspath(file_path), info.st_size, info.st_mtime_ns)
+
+def cached_file_digest(file_path):
+    """
+    file_digest reaproveitado enquanto a impressão digital do arquivo não mudar.
+    Arquivo alterado: a base normalizada da versão anterior sai do cache de normalização.
+    """
+    fingerprint = file_fingerprint(file_path)
+    cache = _digest_cache()
+    with cache["lock"]:
+        anterior = cache["arquivos"].get(fingerprint[0])
+        if anterior is not None and anterior[0] == fingerprint:
+            cache["acertos"] += 1
+            cache["segundos_evitados"] += anterior[2]
+            return anterior[1]
+        cache["falhas"] += 1
+
+    inicio = time.perf_counter()
+    digest = file_digest(file_path)
+    segundos = time.perf_counter() - inicio
+    with cache["lock"]:
+        cache["arquivos"][fingerprint[0]] = (fingerprint, digest, segundos)
+    if anterior is not None:
+        invalidate_normalization_cache(anterior[0])
+    return digest
+
+def cache_report():
+    """
+    Economia dos caches por impressão digital (hash de arquivos e normalização), impressa
+    no log depois de cada carga da pasta e de cada upload.
+    """
+    cache = _digest_cache()
+    with cache["lock"]:
+        hashes = {k: cache[k] for k in ("acertos", "falhas", "segundos_evitados")}
+    normalizacao = normalization_cache_stats()
+    print(
+        f"Hash de arquivos: {hashes['acertos']} reaproveitado(s), {hashes['falhas']} calculado(s), "
+        f"{hashes['segundos_evitados']:.3f} s evitados | Normalização: {normalizacao['acertos']} acerto(s), "
+        f"{normalizacao['falhas']} falha(s), {normalizacao['segundos_evitados']:.3f} s evitados, "
+        f"{normalizacao['entradas']} base(s) guardada(s) ({normalizacao['bytes'] / 1e6:.1f} MB)"
+    )
+    return {"hash_arquivos": hashes, "normalizacao": normalizacao}
+
+# ==================== LEITURA DOS ARQUIVOS ====================
+
+def _arrow_safe(df):
+    """
+    Converte para texto as colunas 'object' com tipos misturados (ex: número e texto na
+    mesma coluna), que o Arrow/Parquet não consegue serializar. Nulos são preservados.
+    Devolve um novo DataFrame (a base recebida pode estar no cache de normalização).
+    """
+    convertidas = {}
+    for col in df.columns[df.dtypes == object]:
+        try:
+            pa.Array.from_pandas(df[col])
+        except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+            convertidas[col] = df[col].where(df[col].isna(), df[col].astype(str))
+    return df.assign(**convertidas) if convertidas else df
+
+def _file_format(nome):
+    """Extensão (minúscula) do arquivo, validada contra DATA_EXTENSIONS."""
+    extensao = os.path.splitext(str(nome))[1].lower()
+    if extensao not in DATA_EXTENSIONS:
+        raise ValueError(f"Formato não suportado: {extensao or nome} (aceitos: {', '.join(DATA_EXTENSIONS)})")
+    return extensao
+
+def _read_arrow_ipc(origem):
+    """Feather v2 / Arrow IPC em formato de arquivo ou de stream."""
+    import pyarrow.ipc as ipc
+    try:
+        return ipc.open_file(origem).read_pandas()
+    except pa.ArrowInvalid:
+        if hasattr(origem, "seek"):
+            origem.seek(0)
+        return ipc.open_stream(origem).read_pandas()
+
+def _read_csv(origem):
+    """
+    CSV exportado por ETL/Excel: detecta separador (',', ';', tab ou '|') e
+    codificação (UTF-8, com ou sem BOM, ou Latin-1, comum no Excel em português).
+    """
+    bruto = origem.read() if hasattr(origem, "read") else open(origem, "rb").read()
+    for encoding in ("utf-8-sig", "latin-1"):
+        try:
+            texto = bruto.decode(encoding)
+            break
+        except UnicodeDecodeError:
+            continue
+    try:
+        separador = csv.Sniffer().sniff(texto[:64 * 1024], delimiters=",;\t|").delimiter
+    except csv.Error:
+        separador = ","
+    return pd.read_csv(io.StringIO(texto), sep=separador)
+
+def _read_raw(origem, extensao):
+    """Lê o arquivo bruto (antes da normalização) conforme o formato."""
+    if extensao == ".xlsx":
+        return pd.read_excel(origem, engine="openpyxl")
+    if extensao == ".parquet":
+        return pd.read_parquet(origem)
+    if extensao in (".feather", ".arrow"):
+        return _read_arrow_ipc(origem)
+    return _read_csv(origem)
+
+def _parse_source(origem, tamanho, extensao, nome):
+    """
+    Lê e normaliza qualquer formato aceito com as mesmas regras de normalize_dataframe.
+    Planilhas Excel grandes (>= STREAMING_MIN_BYTES) usam a leitura em blocos.
+    Imprime uma vez por arquivo a contagem de formatos de data_ref ('nome' identifica a origem).
+    """
+    if extensao == ".xlsx" and tamanho >= STREAMING_MIN_BYTES:
+        df = _arrow_safe(read_excel_streaming(origem))
+    else:
+        df = _arrow_safe(normalize_frame(_read_raw(origem, extensao)))
+    formatos = df.attrs.get("formatos_data")
+    if formatos:
+        print(f"Formatos de data_ref ({nome}): " + ", ".join(f"{k}={v}" for k, v in formatos.items()))
+    return df
+
+def _parse_timed(file_path):
+    """Lê e normaliza o arquivo, devolvendo (base, segundos). Função de módulo: roda nos workers."""
+    inicio = time.perf_counter()
+    extensao = _file_format(file_path)
+    df = _parse_source(file_path, os.path.getsize(file_path), extensao, os.path.basename(file_path))
+    return df, time.perf_counter() - inicio
+
+def parse_file(file_path):
+    """Lê o arquivo do disco e normaliza (reaproveita o cache se o arquivo não mudou)."""
+    return parse_files([file_path])[0]
+
+def parse_buffer(conteudo, nome=".xlsx", digest=None):
+    """
+    Lê o arquivo a partir dos bytes em memória (ex: upload) e normaliza; 'nome' define o formato.
+    'digest' (hash do conteúdo, se já calculado) é a chave do cache de normalização.
+    """
+    extensao = _file_format(nome)
+    fingerprint = ("conteudo", digest, extensao) if digest else None
+    df = cached_normalization(fingerprint) if fingerprint else None
+    if df is None:
+        inicio = time.perf_counter()
+        df = _parse_source(io.BytesIO(conteudo), len(conteudo), extensao, nome)
+        if fingerprint:
+            cache_normalization(fingerprint, df, time.perf_counter() - inicio)
+    return df
+
+# ==================== LEITURA EM BLOCOS (PLANILHAS GRANDES) ====================
+# pd.read_excel monta a planilha inteira como lista de listas de objetos Python
+# antes de criar o DataFrame (pico de várias vezes o tamanho final). Aqui as
+# linhas são lidas em modo read_only e convertidas/normalizadas a cada bloco,
+# então o pico fica perto do tamanho da base normalizada.
+
+def _convert_cell(cell):
+    """Mesma conversão de célula do leitor openpyxl do pandas."""
+    from openpyxl.cell.cell import TYPE_ERROR, TYPE_NUMERIC
+    if cell.value is None:
+        return ""
+    if cell.data_type == TYPE_ERROR:
+        return np.nan
+    if cell.data_type == TYPE_NUMERIC:
+        val = int(cell.value)
+        return val if val == cell.value else float(cell.value)
+    return cell.value
+
+def _parse_chunk(cabecalho, linhas, tipos):
+    """Converte um bloco de linhas em DataFrame com a mesma inferência de tipos do read_excel."""
+    from pandas.io.parsers import TextParser
+    largura = len(cabecalho)
+    linhas = [linha + [""] * (largura - len(linha)) for linha in linhas]
+    return TextParser([cabecalho] + linhas, header=0, dtype=tipos, skip_blank_lines=False).read()
+
+def read_excel_streaming(file_path, chunk_rows=None):
+    """
+    Lê a primeira aba da planilha (caminho ou objeto de arquivo) em blocos de 'chunk_rows' linhas (padrão
+    EXCEL_CHUNK_ROWS), normaliza cada bloco com as regras de normalize_dataframe
+    e concatena no fim. Linhas totalmente vazias são descartadas (a normalização
+    já as removeria por não terem data).
+    """
+    import openpyxl
+    chunk_rows = chunk_rows or EXCEL_CHUNK_ROWS
+
+    wb = openpyxl.load_workbook(file_path, read_only=True, data_only=True, keep_links=False)
+    try:
+        ws = wb.worksheets[0]
+        ws.reset_dimensions()
+        linhas_iter = ws.iter_rows()
+
+        cabecalho = next(([_convert_cell(c) for c in linha] for linha in linhas_iter), [])
+        while cabecalho and cabecalho[-1] == "":
+            cabecalho.pop()
+        # Colunas de texto ficam como objeto (evita '123.0' em blocos só com números)
+        tipos = {
+            nome: object for nome in cabecalho
+            if COLUMN_ALIASES.get(str(nome).strip().lower()) in ("Emissora", "Cliente", "Executivo")
+        }
+
+        blocos, formatos, buffer = [], {}, []
+
+        def processar():
+            df = normalize_frame(_parse_chunk(cabecalho, buffer, tipos))
+            for k, v in df.attrs.get("formatos_data", {}).items():
+                formatos[k] = formatos.get(k, 0) + v
+            if not df.empty:
+                blocos.append(pa.Table.from_pandas(_arrow_safe(df), preserve_index=False))
+            buffer.clear()
+
+        for linha in linhas_iter:
+            valores = [_convert_cell(c) for c in linha]
+            while valores and valores[-1] == "":
+                valores.pop()
+            if not valores:
+                continue
+            if len(valores) > len(cabecalho):
+                cabecalho = cabecalho + [""] * (len(valores) - len(cabecalho))
+            buffer.append(valores)
+            if len(buffer) >= chunk_rows:
+                processar()
+        if buffer:
+            processar()
+    finally:
+        wb.close()
+
+    df = _tables_to_frame(blocos)
+    if formatos:
+        df.attrs["formatos_data"] = formatos
+    return df
+
+def _tables_to_frame(tabelas):
+    """
+    Junta os blocos (tabelas Arrow) num único DataFrame. A conversão libera cada
+    buffer Arrow assim que a coluna é convertida, então a base não fica duplicada.
+    Se algum bloco tiver tipos incompatíveis (ex: coluna bruta só numérica num bloco
+    e texto em outro), converte bloco a bloco e usa concat_bases.
+    """
+    if not tabelas:
+        return pd.DataFrame()
+    try:
+        tabela = pa.concat_tables(tabelas, promote_options="permissive")
+    except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+        return concat_bases([_arrow_safe(t.to_pandas()) for t in tabelas])
+    tabelas.clear()
+    df = tabela.to_pandas(self_destruct=True, split_blocks=True)
+    del tabela
+
+    # Dicionários Arrow unificados ficam em ordem de aparição; a base usa categorias ordenadas
+    for col in df.columns:
+        if isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].cat.set_categories(sorted(df[col].cat.categories))
+    return df
+
+def list_data_files(data_dir):
+    """
+    Arquivos de dados da pasta (DATA_EXTENSIONS), do mais antigo para o mais recente
+    (ignora arquivos de lock '~$' do Excel).
+    """
+    arquivos = [
+        os.path.join(data_dir, f) for f in os.listdir(data_dir)
+        if f.lower().endswith(DATA_EXTENSIONS) and not f.startswith("~$")
+        and os.path.isfile(os.path.join(data_dir, f))
+    ]
+    return sorted(arquivos, key=lambda f: (os.path.getmtime(f), f))
+
+def _parse_many(file_paths):
+    """Lista de (base, segundos), em paralelo (um processo por planilha) quando compensa."""
+    if len(file_paths) <= 1 or MAX_INGEST_WORKERS == 1:
+        return [_parse_timed(f) for f in file_paths]
+
+    try:
+        # 'spawn' evita herdar as threads do servidor do Streamlit no fork
+        contexto = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=min(MAX_INGEST_WORKERS, len(file_paths)), mp_context=contexto) as pool:
+            return list(pool.map(_parse_timed, file_paths))
+    except BrokenProcessPool as e:
+        print(f"Falha no processamento paralelo, lendo planilhas em sequência: {e}")
+        return [_parse_timed(f) for f in file_paths]
+
+def parse_files(file_paths):
+    """
+    Normaliza vários arquivos; só os que não estão no cache de normalização
+    (pela impressão digital) são lidos, em paralelo.
+    Retorna a lista de DataFrames na mesma ordem de file_paths.
+    """
+    fingerprints = [file_fingerprint(f) for f in file_paths]
+    bases = [cached_normalization(fp) for fp in fingerprints]
+    faltando = [i for i, df in enumerate(bases) if df is None]
+
+    for i, (df, segundos) in zip(faltando, _parse_many([file_paths[i] for i in faltando])):
+        cache_normalization(fingerprints[i], df, segundos)
+        bases[i] = df
+    return bases
+
+# ==================== ARMAZENAMENTO PARTICIONADO (ANO/MES) ====================
+# data/.store/ano=2025/mes=05.parquet + manifest.json
+# O manifesto guarda, por planilha, o hash e os meses que ela contém e, por
+# partição, qual planilha é a dona. Cada mês pertence à planilha mais recente
+# que o contém; só as partições afetadas por planilhas novas/alteradas são regravadas.
+
+def _store_dir(data_dir):
+    return os.path.join(data_dir, STORE_DIR_NAME)
+
+def _partition_key(ano, mes):
+    return f"ano={int(ano)}/mes={int(mes):02d}"
+
+def _partition_path(data_dir, chave):
+    return os.path.join(_store_dir(data_dir), chave + ".parquet")
+
+def _empty_manifest():
+    return {"normalizer_version": NORMALIZER_VERSION, "arquivos": {}, "particoes": {}}
+
+def _read_manifest(data_dir):
+    caminho = os.path.join(_store_dir(data_dir), MANIFEST_NAME)
+    try:
+        with open(caminho, encoding="utf-8") as f:
+            manifesto = json.load(f)
+    except FileNotFoundError:
+        return _empty_manifest()
+    except Exception as e:
+        print(f"Manifesto inválido, reconstruindo o armazenamento: {e}")
+        return _empty_manifest()
+
+    # Regras do normalizador mudaram: todas as partições precisam ser refeitas
+    if manifesto.get("normalizer_version") != NORMALIZER_VERSION:
+        return dict(_empty_manifest(), particoes=manifesto.get("particoes", {}), arquivos={})
+    return manifesto
+
+def _write_atomic(caminho, escrever):
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    tmp_path = caminho + ".tmp"
+    escrever(tmp_path)
+    os.replace(tmp_path, caminho)
+
+def _write_manifest(data_dir, manifesto):
+    def escrever(tmp_path):
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifesto, f, ensure_ascii=False, indent=1, sort_keys=True)
+    _write_atomic(os.path.join(_store_dir(data_dir), MANIFEST_NAME), escrever)
+
+def _split_partitions(df):
+    """Divide a base normalizada em {chave da partição: linhas daquele Ano/Mes}."""
+    if df is None or df.empty or "ano" not in df.columns:
+        return {}
+    particoes = {}
+    categoricas = [c for c in df.columns if isinstance(df[c].dtype, pd.CategoricalDtype)]
+    for (ano, mes), parte in df.groupby(["ano", "mes"], sort=True):
+        parte = parte.assign(**{c: parte[c].cat.remove_unused_categories() for c in categoricas})
+        particoes[_partition_key(ano, mes)] = parte.reset_index(drop=True)
+    return particoes
+
+def sync_store(data_dir, file_paths, digests, preparsed=None):
+    """
+    Atualiza o armazenamento particionado a partir das planilhas da pasta.
+    Planilhas com o mesmo hash do manifesto não são lidas; das novas/alteradas,
+    apenas os meses que elas passam a controlar são regravados. Meses que ficaram
+    sem nenhuma planilha (arquivo removido) são apagados.
+    'preparsed' ({nome do arquivo: base normalizada}) evita reler planilhas já
+    normalizadas em memória (ex: upload).
+    Retorna (manifesto atualizado, lista de avisos de meses duplicados).
+    """
+    preparsed = preparsed or {}
+    with _STORE_LOCK:
+        antigo = _read_manifest(data_dir)
+        nomes = [os.path.basename(f) for f in file_paths]
+        caminhos = dict(zip(nomes, file_paths))
+        hashes = dict(zip(nomes, digests))
+        ordem = {nome: i for i, nome in enumerate(nomes)}
+
+        def ler(lista):
+            a_ler = [n for n in lista if n not in preparsed]
+            lidos = dict(zip(a_ler, parse_files([caminhos[n] for n in a_ler])))
+            return {n: _split_partitions(preparsed[n] if n in preparsed else lidos[n]) for n in lista}
+
+        alterados = [n for n in nomes if antigo["arquivos"].get(n, {}).get("digest") != hashes[n]]
+        partes = ler(alterados)
+
+        arquivos = {}
+        for nome in nomes:
+            if nome in partes:
+                arquivos[nome] = {"digest": hashes[nome], "particoes": sorted(partes[nome])}
+            else:
+                arquivos[nome] = antigo["arquivos"][nome]
+
+        # Dona de cada mês = planilha mais recente que o contém
+        donos, avisos = {}, []
+        for nome in sorted(arquivos, key=ordem.get):
+            for chave in arquivos[nome]["particoes"]:
+                if chave in donos:
+                    avisos.append(f"{donos[chave]}: {chave} também aparece em {nome} (mais recente) e foi ignorado.")
+                donos[chave] = nome
+
+        reescrever = [
+            chave for chave, nome in donos.items()
+            if nome in partes
+            or antigo["particoes"].get(chave, {}).get("digest") != hashes[nome]
+            or not os.path.exists(_partition_path(data_dir, chave))
+        ]
+
+        # Planilha inalterada que voltou a ser dona de um mês (ex: a mais nova foi removida)
+        faltantes = sorted({donos[c] for c in reescrever if donos[c] not in partes})
+        partes.update(ler(faltantes))
+
+        particoes = {c: antigo["particoes"][c] for c in donos if c not in reescrever}
+        for chave in reescrever:
+            parte = partes[donos[chave]][chave]
+            _write_atomic(_partition_path(data_dir, chave), lambda tmp, parte=parte: parte.to_parquet(tmp, index=False))
+            particoes[chave] = {"arquivo": donos[chave], "digest": hashes[donos[chave]], "linhas": len(parte)}
+
+        for chave in set(antigo["particoes"]) - set(donos):
+            caminho = _partition_path(data_dir, chave)
+            try:
+                os.remove(caminho)
+            except FileNotFoundError:
+                pass
+            # Último mês do ano removido: apaga também a pasta ano=AAAA
+            try:
+                os.rmdir(os.path.dirname(caminho))
+            except OSError:
+                pass
+
+        manifesto = {"normalizer_version": NORMALIZER_VERSION, "arquivos": arquivos, "particoes": particoes}
+        if alterados or reescrever or set(antigo["particoes"]) != set(particoes):
+            _write_manifest(data_dir, manifesto)
+            print(f"Armazenamento atualizado: {len(alterados) + len(faltantes)} planilha(s) lida(s), {len(reescrever)} partição(ões) regravada(s).")
+
+        # Bases lidas agora estão no armazenamento: saem do cache de normalização
+        for nome in partes:
+            _release_normalized(caminhos[nome], hashes[nome])
+        return manifesto, avisos
+
+def _release_normalized(caminho, digest):
+    """Descarta do cache de normalização a base do arquivo (lido do disco ou do upload em memória)."""
+    invalidate_normalization_cache(("conteudo", digest, _file_format(caminho)))
+    try:
+        invalidate_normalization_cache(file_fingerprint(caminho))
+    except FileNotFoundError:
+        pass
+
+def read_store(data_dir, manifesto):
+    """
+    Lê todas as partições do armazenamento e devolve a base concatenada, em ordem de Ano/Mes.
+    A base publicada guarda o histórico inteiro (os filtros de ano rodam em memória sobre
+    ela), então não há leitura parcial: o ganho incremental está na gravação (sync_store).
+    """
+    chaves = sorted(manifesto["particoes"])
+    return concat_bases([pd.read_parquet(_partition_path(data_dir, c)) for c in chaves])
+
+def concat_bases(bases):
+    """
+    Junta as bases normalizadas. As colunas categóricas recebem a união (ordenada)
+    das categorias antes do concat, para não virarem 'object' no resultado.
+    """
+    bases = [df for df in bases if df is not None and not df.empty]
+    if not bases:
+        return pd.DataFrame()
+    if len(bases) == 1:
+        return bases[0]
+
+    categoricas = [c for c in bases[0].columns if isinstance(bases[0][c].dtype, pd.CategoricalDtype)]
+    for col in categoricas:
+        categorias = sorted(set().union(*(df[col].cat.categories for df in bases if col in df.columns)))
+        bases = [
+            df.assign(**{col: df[col].cat.set_categories(categorias)}) if col in df.columns else df
+            for df in bases
+        ]
+    return pd.concat(bases, ignore_index=True)
+
+# ==================== CARREGAMENTO DA BASE ====================
+
+def _ultima_atualizacao(df, file_path):
+    """Último mês/ano da base (MM/AAAA) ou, sem data_ref, a data de modificação do arquivo."""
+    if "data_ref" in df.columns and pd.api.types.is_datetime64_any_dtype(df["data_ref"]):
+        # Pega a data mais recente válida
+        latest_date = df["data_ref"].max()
+        if pd.notna(latest_date):
+            # Formata como MM/YYYY (02d garante o zero à esquerda)
+            return f"{latest_date.month:02d}/{latest_date.year}"
+        return "Data Inválida"
+
+    # Fallback para o tempo de modificação do arquivo se data_ref não estiver disponível
+    # (upload ainda sendo gravado em segundo plano: horário atual)
+    mod_time = datetime.fromtimestamp(os.path.getmtime(file_path)) if os.path.exists(file_path) else datetime.now()
+    return mod_time.strftime("%d/%m/%Y")
+
+def _data_dir():
+    """Pasta /data do projeto (criada se não existir)."""
+    base_dir = os.path.dirname(os.path.dirname(__file__)) 
+    data_dir = os.path.join(base_dir, "data")
+
+    if not os.path.exists(data_dir):
+        os.makedirs(data_dir) # Cria a pasta se não existir
+    return data_dir
+
+def _publish_files(data_dir, arquivos):
+    """
+    Sincroniza o armazenamento com os arquivos da pasta e publica a base, se o conjunto
+    de arquivos mudou desde a versão atual. Sem chamadas de interface: roda tanto na
+    sessão quanto na thread do monitor da pasta.
+    Retorna (True se há base publicada, avisos de meses duplicados).
+    """
+    digests = [cached_file_digest(f) for f in arquivos]
+    chave = (tuple(zip(arquivos, digests)), NORMALIZER_VERSION)
+
+    # Outra sessão (ou o monitor) já publicou este mesmo conjunto de arquivos
+    if current_dataset_key() == chave:
+        cache_report()
+        return True, []
+
+    manifesto, avisos = sync_store(data_dir, arquivos, digests)
+    for aviso in avisos:
+        print(f"AVISO: período duplicado - {aviso}")
+
+    df = read_store(data_dir, manifesto)
+    cache_report()
+    if df.empty:
+        return False, avisos
+    publish_dataset(df, _ultima_atualizacao(df, arquivos[-1]), chave)
+    return True, avisos
+
+def load_main_base():
+    """
+    Carrega a base principal.
+    A base fica uma única vez no processo (utils.dataset) e é compartilhada, somente
+    leitura, por todas as sessões; a sessão guarda apenas o id da versão.
+    Prioridade:
+    1. Versão atual publicada. Com o monitor da pasta ativo ela já reflete /data; a
+       sessão passa para a versão nova no próximo rerun (sem esperar a leitura).
+    2. Todos os arquivos de dados da pasta /data (.xlsx, .parquet, .feather/.arrow,
+       .csv), via armazenamento particionado por
+       Ano/Mes (só as planilhas novas/alteradas são lidas; reaproveita a versão
+       publicada se nenhum arquivo mudou).
+    Retorna (df, data_modificação) ou (None, None) se nada for encontrado.
+    """
+    data_dir = _data_dir()
+    monitorando = start_data_watcher(data_dir) is not None
+
+    # --- 1. Versão atual já publicada (pela sessão, por outra sessão ou pelo monitor) ---
+    if monitorando or "dataset_version" in st.session_state:
+        versao, registro = get_dataset()
+        if registro is not None:
+            anterior = st.session_state.get("dataset_version")
+            if anterior is not None and anterior != versao:
+                st.toast("🔄 Base de dados atualizada.")
+            st.session_state.dataset_version = versao
+            bind_session(versao)
+            return registro["df"], registro["ultima_atualizacao"]
+
+    # --- 2. Se não houver, procura na pasta /data ---
+    try:
+        excel_files = list_data_files(data_dir)
+    except FileNotFoundError:
+        st.error(f"❌ Erro: O diretório '{data_dir}' não foi encontrado.")
+        return None, None
+
+    if excel_files:
+        try:
+            publicada, avisos = _publish_files(data_dir, excel_files)
+            for aviso in avisos:
+                st.warning(f"⚠️ Período duplicado: {aviso}")
+            if not publicada:
+                st.warning("⚠️ Base encontrada, mas sem dados válidos.")
+                return None, None
+
+            versao, registro = get_dataset()
+            st.session_state.dataset_version = versao
+            bind_session(versao)
+            return registro["df"], registro["ultima_atualizacao"]
+        
+        except Exception as e:
+            st.error(f"Erro ao ler base em {data_dir}: {e}")
+            return None, None
+
+    # --- 3. Se não encontrou em nenhum lugar ---
+    return None, None
+
+# ==================== MONITORAMENTO DA PASTA /data ====================
+# Um observador (watchdog) por processo. Arquivos criados, alterados, removidos ou
+# renomeados disparam, depois de um intervalo sem novos eventos, a releitura numa
+# thread separada; a nova versão é publicada de uma vez em utils.dataset e as
+# sessões a recebem no próximo rerun.
+
+# Segundos sem novos eventos antes de reler a pasta (cópias grandes geram vários eventos)
+WATCH_DEBOUNCE_SECONDS = 2.0
+
+# Eventos que indicam mudança de conteúdo (aberturas/leituras são ignoradas)
+_WATCH_EVENTS = ("created", "modified", "deleted", "moved", "closed")
+
+def _is_data_file(caminho):
+    nome = os.path.basename(caminho)
+    return nome.lower().endswith(DATA_EXTENSIONS) and not nome.startswith("~$")
+
+def _reload_data_dir(data_dir):
+    """Relê a pasta e publica a nova versão (thread do monitor; erros só no log)."""
+    try:
+        arquivos = list_data_files(data_dir)
+        if not arquivos:
+            print(f"Monitor: nenhum arquivo de dados em {data_dir}; versão atual mantida.")
+            return
+        inicio = time.perf_counter()
+        publicada, _ = _publish_files(data_dir, arquivos)
+        if publicada:
+            print(f"Monitor: base recarregada de {data_dir} em {time.perf_counter() - inicio:.1f} s.")
+        else:
+            print(f"Monitor: arquivos de {data_dir} sem dados válidos; versão atual mantida.")
+    except Exception as e:
+        # Ex: planilha ainda sendo copiada; o próximo evento tenta de novo
+        print(f"Monitor: erro ao recarregar {data_dir}: {e}")
+
+@st.cache_resource
+def start_data_watcher(data_dir):
+    """
+    Inicia (uma vez por processo) o monitoramento da pasta de dados.
+    Retorna o observador, ou None se o watchdog não estiver disponível.
+    """
+    try:
+        from watchdog.observers import Observer
+        from watchdog.events import FileSystemEventHandler
+    except ImportError:
+        print("watchdog não instalado: novos arquivos em /data só entram em sessões novas.")
+        return None
+
+    estado = {"lock": threading.Lock(), "timer": None, "recarga": threading.Lock()}
+
+    def recarregar():
+        # Uma releitura por vez; eventos durante a releitura agendam a próxima
+        with estado["recarga"]:
+            _reload_data_dir(data_dir)
+
+    def agendar(event):
+        if event.is_directory or event.event_type not in _WATCH_EVENTS:
+            return
+        caminhos = [event.src_path, getattr(event, "dest_path", "")]
+        if not any(_is_data_file(os.fsdecode(c)) for c in caminhos if c):
+            return
+        with estado["lock"]:
+            if estado["timer"] is not None:
+                estado["timer"].cancel()
+            estado["timer"] = threading.Timer(WATCH_DEBOUNCE_SECONDS, recarregar)
+            estado["timer"].daemon = True
+            estado["timer"].start()
+
+    handler = FileSystemEventHandler()
+    handler.on_any_event = agendar
+    observer = Observer()
+    observer.daemon = True
+    try:
+        observer.schedule(handler, data_dir, recursive=False)
+        observer.start()
+    except Exception as e:
+        print(f"Não foi possível monitorar {data_dir}: {e}")
+        return None
+    return observer
+
+
+# ==================== UPLOAD ====================
+
+# Nome (sem extensão) com que o arquivo enviado pelo usuário é gravado em /data
+UPLOAD_FILE_STEM = "temp_data_uploaded"
+
+def _is_upload(file_path):
+    return os.path.splitext(os.path.basename(file_path))[0] == UPLOAD_FILE_STEM
+
+def _persist_upload(data_dir, conteudo, file_paths, digests, df):
+    """
+    Grava o arquivo enviado em /data (de forma atômica) e registra seus meses no
+    armazenamento particionado usando a base já normalizada (sem reler o arquivo).
+    Uploads anteriores em outro formato são removidos. Roda em thread separada,
+    fora do caminho crítico do upload.
+    """
+    try:
+        def escrever(tmp_path):
+            with open(tmp_path, "wb") as f:
+                f.write(conteudo)
+        _write_atomic(file_paths[-1], escrever)
+        for antigo in list_data_files(data_dir):
+            if _is_upload(antigo) and antigo != file_paths[-1]:
+                os.remove(antigo)
+        sync_store(data_dir, file_paths, digests, preparsed={os.path.basename(file_paths[-1]): df})
+    except Exception as e:
+        print(f"Erro ao gravar o upload em {data_dir}: {e}")
+
+def ingest_upload(conteudo, nome_arquivo="upload.xlsx"):
+    """
+    Publica o arquivo enviado direto da memória: lê e normaliza os bytes do upload,
+    junta com os meses já armazenados (o upload é o arquivo mais recente, então
+    vence meses repetidos) e vincula a sessão à nova versão. A gravação em disco
+    acontece em segundo plano. 'nome_arquivo' (nome original) define o formato.
+    Retorna (df, ultima_atualizacao) ou (None, None) se o arquivo não tiver dados válidos.
+    """
+    data_dir = _data_dir()
+    upload_name = UPLOAD_FILE_STEM + _file_format(nome_arquivo)
+    upload_path = os.path.join(data_dir, upload_name)
+    digest = hashlib.sha256(conteudo).hexdigest()
+    df = parse_buffer(conteudo, upload_name, digest)
+
+    outros = [f for f in list_data_files(data_dir) if not _is_upload(f)]
+    file_paths = outros + [upload_path]
+    digests = [cached_file_digest(f) for f in outros] + [digest]
+    chave = (tuple(zip(file_paths, digests)), NORMALIZER_VERSION)
+
+    # Meses das demais planilhas: aproveitados do armazenamento se ele estiver em dia
+    manifesto = _read_manifest(data_dir)
+    novos = _split_partitions(df)
+    donos = {}
+    for f, d in zip(outros, digests):
+        info = manifesto["arquivos"].get(os.path.basename(f))
+        if info is None or info["digest"] != d:
+            donos = None
+            break
+        for c in info["particoes"]:
+            donos[c] = os.path.basename(f)
+
+    em_dia = donos is not None and all(
+        manifesto["particoes"].get(c, {}).get("arquivo") == n for c, n in donos.items() if c not in novos
+    )
+    if em_dia:
+        for aviso in (f"{donos[c]}: {c} também aparece em {upload_name} (mais recente) e foi ignorado." for c in novos if c in donos):
+            print(f"AVISO: período duplicado - {aviso}")
+        donos.update({c: upload_name for c in novos})
+        base = concat_bases([
+            novos[c] if n == upload_name else pd.read_parquet(_partition_path(data_dir, c))
+            for c, n in sorted(donos.items())
+        ])
+        threading.Thread(target=_persist_upload, args=(data_dir, conteudo, file_paths, digests, df), daemon=False).start()
+    else:
+        # Armazenamento desatualizado (arquivos mudaram em disco): grava e sincroniza agora
+        print("Armazenamento desatualizado; sincronizando o upload antes de publicar.")
+        _persist_upload(data_dir, conteudo, file_paths, digests, df)
+        base = read_store(data_dir, _read_manifest(data_dir))
+
+    cache_report()
+    if base.empty:
+        return None, None
+    publish_dataset(base, _ultima_atualizacao(base, upload_path), chave)
+    versao, registro = get_dataset()
+    st.session_state.dataset_version = versao
+    bind_session(versao)
+    return registro["df"], registro["ultima_atualizacao"]
+
+
+def load_crowley_base():
+    """Placeholder para base Crowley (não usada atualmente)."""
     return None, None
\ No newline at end of file
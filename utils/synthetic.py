@@ -0,0 +1,161 @@
+# utils/synthetic.py
+# Gerador de bases de vendas sintéticas no formato das exportações (cabeçalhos reconhecidos
+# por COLUMN_ALIASES), para medir o desempenho com bases de qualquer tamanho. Também gera
+# colunas com os formatos sujos das exportações (datas, valores em texto), a base já no
+# esquema canônico e tabelas de clientes para exportar, usadas por utils.benchmark e pelos testes.
+# Uso: python -m utils.synthetic saida.xlsx|.csv|.parquet [linhas]
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+# Cabeçalhos das exportações (todos em COLUMN_ALIASES)
+COLUNAS = {
+    "emissora": "EMPRESA",
+    "data_ref": "REF.",
+    "cliente": "DESCRIÇÃO",
+    "faturamento": "VALOR LÍQUIDO",
+    "executivo": "CONTATO COML.",
+    "insercoes": "INSERÇÕES",
+}
+
+EMISSORAS_CONHECIDAS = ["NOVABRASIL", "TH+ PRIME", "THATHI TV", "DIFUSORA"]
+
+def _nomes(prefixo, quantidade, conhecidos=()):
+    """Nomes em caixa alta como nas exportações; completa os conhecidos com 'PREFIXO n'."""
+    nomes = list(conhecidos)[:quantidade]
+    nomes += [f"{prefixo} {i:05d}" for i in range(len(nomes), quantidade)]
+    return np.array(nomes, dtype=object)
+
+def gerar_base_bruta(linhas, clientes=2000, emissoras=4, executivos=25, anos=(2022, 2025), seed=0):
+    """
+    Base bruta (antes de normalize_dataframe) com 'linhas' lançamentos.
+    - clientes com participação desigual (poucos clientes concentram o faturamento, como na curva ABC);
+    - cada cliente atendido por um executivo fixo;
+    - REF. no formato 'mm/aaaa' entre aspas, de anos[0] a anos[1];
+    - VALOR LÍQUIDO numérico e INSERÇÕES inteiras.
+    Os textos se repetem (mesmos objetos), então a memória cresce pouco com o número de linhas.
+    """
+    rng = np.random.default_rng(seed)
+    nomes_clientes = _nomes("CLIENTE", clientes)
+    nomes_emissoras = _nomes("EMISSORA", emissoras, EMISSORAS_CONHECIDAS)
+    nomes_executivos = _nomes("EXECUTIVO", executivos)
+
+    # Participação decrescente (lei de potência) sorteada uma vez por cliente
+    pesos = 1.0 / np.arange(1, clientes + 1) ** 0.9
+    cliente = rng.choice(clientes, linhas, p=pesos / pesos.sum())
+    executivo_do_cliente = rng.integers(0, executivos, clientes)
+
+    # Períodos 'mm/aaaa' de todos os anos, sorteados por código
+    periodos = [(a, m) for a in range(anos[0], anos[1] + 1) for m in range(1, 13)]
+    rotulos = np.array([f"'{m:02d}/{a}'" for a, m in periodos], dtype=object)
+    periodo = rng.integers(0, len(periodos), linhas)
+
+    return pd.DataFrame({
+        COLUNAS["emissora"]: nomes_emissoras[rng.integers(0, emissoras, linhas)],
+        COLUNAS["data_ref"]: rotulos[periodo],
+        COLUNAS["cliente"]: nomes_clientes[cliente],
+        COLUNAS["faturamento"]: rng.lognormal(8.0, 1.0, linhas).round(2),
+        COLUNAS["executivo"]: nomes_executivos[executivo_do_cliente[cliente]],
+        COLUNAS["insercoes"]: rng.integers(1, 300, linhas),
+    })
+
+def gerar_datas(n, seed=0):
+    """Coluna data_ref com a mistura de formatos vista nas exportações (ISO, dd/mm/aaaa, mm/aaaa, serial, lixo)."""
+    rng = np.random.default_rng(seed)
+    anos = rng.integers(2020, 2027, n)
+    meses = rng.integers(1, 13, n)
+    dias = rng.integers(1, 29, n)
+    tipo = rng.choice(["iso", "dmy", "my", "serial", "iso_hora", "outros"], n, p=[0.15, 0.2, 0.35, 0.1, 0.15, 0.05])
+
+    valores = np.empty(n, dtype=object)
+    for i in range(n):
+        a, m, d, t = anos[i], meses[i], dias[i], tipo[i]
+        if t == "iso":
+            valores[i] = f"{a}-{m:02d}-{d:02d}"
+        elif t == "dmy":
+            valores[i] = f"{d:02d}/{m:02d}/{a}"
+        elif t == "my":
+            valores[i] = f"'{m:02d}/{a}'"
+        elif t == "serial":
+            valores[i] = str(int(rng.integers(43000, 46000)))
+        elif t == "iso_hora":
+            valores[i] = f"{a}-{m:02d}-{d:02d} 00:00:00"
+        else:
+            valores[i] = rng.choice(["", "sem data", f"{m}-{a}", "31/02/2024"])
+    return pd.Series(valores)
+
+def gerar_valores(n, seed=0):
+    """Coluna Faturamento em texto BR ("R$ 1.234,56", "(500,00)", "-12", NBSP, vazios)."""
+    rng = np.random.default_rng(seed)
+    numeros = rng.uniform(0, 500_000, n)
+    formatos = rng.choice(["R$ {}", "{}", "({})", "-{}", "R$\u00a0{}", ""], n, p=[0.4, 0.3, 0.1, 0.1, 0.05, 0.05])
+    valores = np.empty(n, dtype=object)
+    for i in range(n):
+        txt = f"{numeros[i]:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+        valores[i] = formatos[i].format(txt)
+    return pd.Series(valores)
+
+def gerar_base_formatos(n, seed=0):
+    """Base bruta com cabeçalhos alternativos (Empresa, Cliente, Vendedor, Valor, Ref) e valores/datas em texto misturado."""
+    return pd.DataFrame({
+        "Empresa": np.random.default_rng(seed).choice(["Novabrasil", "Th+ Prime", "Thathi Tv"], n),
+        "Cliente": [f"Cliente {i % 800}" for i in range(n)],
+        "Vendedor": [f"Executivo {i % 25}" for i in range(n)],
+        "Valor": gerar_valores(n, seed),
+        "Ref": gerar_datas(n, seed),
+    })
+
+def gerar_base_canonica(n, seed=0):
+    """Base já no esquema canônico (como chega em aplicar_filtros), n linhas."""
+    rng = np.random.default_rng(seed)
+    categoria = lambda valores: pd.Categorical(rng.choice(valores, n), categories=sorted(valores))
+    df = pd.DataFrame({
+        "ano": rng.integers(2021, 2026, n).astype("int16"),
+        "mes": rng.integers(1, 13, n).astype("int16"),
+        "emissora": categoria(["Difusora", "Novabrasil", "Th+ Prime", "Thathi Tv"]),
+        "executivo": categoria([f"Executivo {i}" for i in range(25)]),
+        "cliente": categoria([f"Cliente {i}" for i in range(2000)]),
+        "faturamento": rng.uniform(100, 50_000, n),
+        "insercoes": rng.integers(0, 200, n).astype("float64"),
+    })
+    df["meslabel"] = df["mes"].astype(str).str.zfill(2) + "/" + df["ano"].astype(str)
+    return df
+
+def gerar_tabela_clientes(n, seed=0):
+    """Tabela de clientes como as exportadas pelas páginas (texto, faturamento por ano, inserções, share), n linhas."""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "Cliente": [f"Cliente {i}" for i in rng.integers(0, 20_000, n)],
+        "Emissora": rng.choice(["Novabrasil", "Th+ Prime", "Thathi Tv", "Difusora"], n),
+        "Faturamento 2024": rng.uniform(0, 100_000, n).round(2),
+        "Faturamento 2025": rng.uniform(0, 100_000, n).round(2),
+        "Inserções": rng.integers(0, 500, n),
+        "Share %": rng.uniform(0, 1, n),
+    })
+
+def gravar_base(df, caminho):
+    """Grava a base bruta no formato da extensão (.xlsx, .csv com ';' ou .parquet), como na pasta /data."""
+    extensao = os.path.splitext(caminho)[1].lower()
+    if extensao == ".xlsx":
+        import xlsxwriter
+        wb = xlsxwriter.Workbook(caminho, {"constant_memory": True})
+        ws = wb.add_worksheet()
+        ws.write_row(0, 0, list(df.columns))
+        for i, linha in enumerate(df.itertuples(index=False, name=None), start=1):
+            ws.write_row(i, 0, linha)
+        wb.close()
+    elif extensao == ".csv":
+        df.to_csv(caminho, index=False, sep=";")
+    elif extensao == ".parquet":
+        df.to_parquet(caminho, index=False)
+    else:
+        raise ValueError(f"Formato não suportado: {extensao}")
+    return caminho
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Uso: python -m utils.synthetic saida.xlsx|.csv|.parquet [linhas]")
+        sys.exit(1)
+    linhas = int(sys.argv[2]) if len(sys.argv) > 2 else 100_000
+    print(f"{gravar_base(gerar_base_bruta(linhas), sys.argv[1])}: {linhas:,} linhas")